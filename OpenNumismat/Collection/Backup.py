@@ -0,0 +1,184 @@
+import os
+import pathlib
+import sqlite3
+
+from PySide6.QtCore import Qt, QDateTime, QDir, QDirIterator, QFileInfo, QThread
+from PySide6.QtCore import Signal as pyqtSignal
+
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+
+class BackupCanceled(Exception):
+    pass
+
+
+# Makes backup of collection file by SQLite online backup API. Unlike
+# copying file it gives consistent copy even when collection is changed
+# meanwhile. Pages are copied by steps in background thread.
+class BackupThread(QThread):
+    PAGES_STEP = 1024
+
+    progress = pyqtSignal(int, int)  # copied pages, total pages
+    succeeded = pyqtSignal()  # emitted in GUI thread
+
+    _threads = []  # running threads
+
+    def __init__(self, fileName, backupFileName, parent=None):
+        super().__init__(parent)
+
+        self.fileName = fileName
+        self.backupFileName = backupFileName
+        self.error = None
+        self.canceled = False
+
+        self.finished.connect(self.__finished)
+
+    def start(self):
+        self._threads.append(self)
+        super().start()
+
+    def __finished(self):
+        # Thread could still be running right after emitting finished
+        self.wait()
+        if not self.canceled and not self.error:
+            self.succeeded.emit()
+        self._threads.remove(self)
+
+    @staticmethod
+    def waitAll():
+        # Application shouldn't exit until backups are done
+        for thread in list(BackupThread._threads):
+            thread.wait()
+
+    def run(self):
+        src = None
+        dst = None
+        try:
+            uri = pathlib.Path(self.fileName).absolute().as_uri() + '?mode=ro'
+            src = sqlite3.connect(uri, uri=True)
+            dst = sqlite3.connect(self.backupFileName)
+            src.backup(dst, pages=self.PAGES_STEP, progress=self.__progress)
+        except BackupCanceled:
+            self.canceled = True
+        except (sqlite3.Error, OSError) as error:
+            self.error = str(error)
+        finally:
+            if dst:
+                dst.close()
+            if src:
+                src.close()
+
+        if (self.canceled or self.error) and os.path.exists(self.backupFileName):
+            os.remove(self.backupFileName)
+
+    def __progress(self, _status, remaining, total):
+        self.progress.emit(total - remaining, total)
+        if remaining and self.isInterruptionRequested():
+            raise BackupCanceled()
+
+
+# Catalog of backups kept in collection itself. Deciding whether
+# autobackup is needed requires only time of the latest backup instead of
+# scanning backup folder. Catalog is created by updating collection to
+# version 10, before it backups aren't registered and autobackup is always
+# needed.
+class BackupCatalog():
+    TABLE = 'backups'
+
+    def __init__(self, db):
+        self.db = db
+
+    def create(self, backupDir, collectionName):
+        query = SqlQuery("SELECT 1 FROM sqlite_master WHERE name='%s'" % self.TABLE,
+                         self.db)
+        if query.first():
+            return
+
+        SqlQuery("CREATE TABLE %s (id INTEGER PRIMARY KEY, file TEXT,"
+                 " createdat TEXT, size INTEGER, coins_count INTEGER,"
+                 " updatedat TEXT, auto INTEGER)" % self.TABLE, self.db)
+        SqlQuery("CREATE INDEX %s_createdat ON %s (createdat)" %
+                 (self.TABLE, self.TABLE), self.db)
+
+        self.__scan(backupDir, collectionName)
+
+    def __scan(self, backupDir, collectionName):
+        # Backups made before catalog, only time is known from file name
+        query = SqlQuery(self.db)
+        query.prepare("INSERT INTO %s (file, createdat, size, auto)"
+                      " VALUES (?, ?, ?, 0)" % self.TABLE)
+
+        filter_ = ('%s_????????????.db' % collectionName,)
+        files = QDirIterator(backupDir, filter_, QDir.Files)
+        while files.hasNext():
+            file_info = files.nextFileInfo()
+
+            file_date = file_info.baseName()[-12:]
+            date_time = QDateTime.fromString(file_date, 'yyMMddhhmmss')
+            if date_time.isValid():
+                if date_time.date().year() < 2000:
+                    date_time = date_time.addYears(100)
+                date_time = date_time.toUTC()
+
+                query.addBindValue(file_info.absoluteFilePath())
+                query.addBindValue(date_time.toString(Qt.ISODateWithMs))
+                query.addBindValue(file_info.size())
+                query.exec_()
+
+    def add(self, fileName, auto):
+        # Size of backup equals to size of collection, count of coins and
+        # time of their last change give content of backup. Returns id of
+        # backup or None without catalog.
+        query = SqlQuery(self.db)
+        query.prepare("INSERT INTO %s (file, createdat, size, coins_count, updatedat, auto)"
+                      " SELECT ?, ?,"
+                      " (SELECT page_count * page_size FROM pragma_page_count(),"
+                      " pragma_page_size()),"
+                      " count(*), MAX(updatedat), ? FROM coins" % self.TABLE)
+        query.addBindValue(fileName)
+        query.addBindValue(QDateTime.currentDateTimeUtc().toString(Qt.ISODateWithMs))
+        query.addBindValue(int(auto))
+        if not query.exec_():
+            return None
+
+        return query.lastInsertId()
+
+    def remove(self, backup_id):
+        if backup_id is None:
+            return
+
+        query = SqlQuery(self.db)
+        query.prepare("DELETE FROM %s WHERE id=?" % self.TABLE)
+        query.addBindValue(backup_id)
+        query.exec_()
+
+    def latest(self):
+        # Returns time of latest existing backup or None
+        query = SqlQuery("SELECT file, createdat FROM %s ORDER BY createdat DESC" %
+                         self.TABLE, self.db)
+        while query.next():
+            record = query.record()
+            if QFileInfo.exists(record.value('file')):
+                return record.value('createdat')
+
+        return None
+
+    def prune(self, keep):
+        # Removes autobackups except latest ones
+        query = SqlQuery(self.db)
+        query.prepare("SELECT id, file FROM %s WHERE auto=1"
+                      " ORDER BY createdat DESC LIMIT -1 OFFSET ?" % self.TABLE)
+        query.addBindValue(keep)
+        query.exec_()
+
+        backups = []
+        while query.next():
+            record = query.record()
+            backups.append((record.value('id'), record.value('file')))
+
+        for backup_id, fileName in backups:
+            if os.path.exists(fileName):
+                os.remove(fileName)
+            self.remove(backup_id)
+
+        return len(backups)
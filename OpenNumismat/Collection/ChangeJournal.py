@@ -0,0 +1,114 @@
+import uuid
+
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+# Merge uses changes of coins only: coin is identified in other collection
+# files by createdat and updated when its updatedat is later, so changes of
+# other columns (like sort_id changed by moving coins) aren't journaled
+JOURNALED_COLUMNS = ('createdat', 'updatedat')
+# Count of latest changes kept in journal. Peer which has seen older
+# change is merged without journal.
+CHANGES_LIMIT = 50000
+
+
+# Log of changes in collection maintained by triggers. Time of change has
+# the same format as updatedat of coins (ISO with ms in UTC), so they are
+# compared as strings. Collection files
+# synchronized with this one are remembered in sync_peers with id of last
+# seen change in their journal, so next synchronization processes only
+# changes made after it. Copies of collection file share uuid, so the
+# fingerprint of last seen change is kept too and watermark is valid only
+# for file which has the same change under this id.
+class ChangeJournal():
+
+    def __init__(self, db, schema='main'):
+        self.db = db
+        self.schema = schema
+
+    @staticmethod
+    def create(db):
+        sql = """CREATE TABLE IF NOT EXISTS changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            row_id INTEGER,
+            key TEXT,
+            op TEXT,
+            changedat TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')))"""
+        SqlQuery(sql, db)
+        sql = """CREATE TABLE IF NOT EXISTS sync_peers (
+            uuid TEXT PRIMARY KEY,
+            watermark INTEGER,
+            fingerprint TEXT)"""
+        SqlQuery(sql, db)
+        SqlQuery("CREATE TABLE IF NOT EXISTS sync_info (uuid TEXT)", db)
+
+        query = SqlQuery("SELECT uuid FROM sync_info", db)
+        if not query.first():
+            query = SqlQuery(db)
+            query.prepare("INSERT INTO sync_info (uuid) VALUES (?)")
+            query.addBindValue(str(uuid.uuid4()))
+            query.exec_()
+
+        for event, op, row in (('INSERT', 'I', 'new'),
+                               ('UPDATE OF %s' % ', '.join(JOURNALED_COLUMNS), 'U', 'new'),
+                               ('DELETE', 'D', 'old')):
+            sql = "CREATE TRIGGER IF NOT EXISTS coins_journal_{0}"\
+                  " AFTER {1} ON coins BEGIN"\
+                  " INSERT INTO changes (row_id, key, op)"\
+                  " VALUES ({2}.id, {2}.createdat, '{3}'); END".format(
+                      op.lower(), event, row, op)
+            SqlQuery(sql, db)
+        SqlQuery("CREATE TRIGGER IF NOT EXISTS changes_limit"
+                 " AFTER INSERT ON changes BEGIN"
+                 " DELETE FROM changes WHERE id<=new.id-%d; END" % CHANGES_LIMIT, db)
+
+    def isAvailable(self):
+        # Journal is created by updating collection to version 10
+        query = SqlQuery("SELECT count(*) FROM %s.sqlite_master WHERE name IN"
+                         " ('changes', 'sync_peers', 'sync_info')" % self.schema,
+                         self.db)
+        query.first()
+        return query.record().value(0) == 3
+
+    def uuid(self):
+        query = SqlQuery("SELECT uuid FROM %s.sync_info" % self.schema, self.db)
+        if query.first():
+            return query.record().value(0)
+        return None
+
+    def lastChange(self):
+        query = SqlQuery("SELECT ifnull(MAX(id), 0) FROM %s.changes" % self.schema,
+                         self.db)
+        query.first()
+        return query.record().value(0)
+
+    def fingerprint(self, change_id):
+        query = SqlQuery(self.db)
+        query.prepare("SELECT row_id || '|' || ifnull(key, '') || '|' || op || '|' ||"
+                      " changedat FROM %s.changes WHERE id=?" % self.schema)
+        query.addBindValue(change_id)
+        query.exec_()
+        if query.first():
+            return query.record().value(0)
+        return None
+
+    def watermark(self, peer):
+        # Returns id of last seen change in journal of peer and its
+        # fingerprint
+        query = SqlQuery(self.db)
+        query.prepare("SELECT watermark, fingerprint FROM %s.sync_peers WHERE uuid=?" %
+                      self.schema)
+        query.addBindValue(peer)
+        query.exec_()
+        if query.first():
+            record = query.record()
+            return record.value(0), record.value(1)
+        return None, None
+
+    def setWatermark(self, peer, watermark, fingerprint):
+        query = SqlQuery(self.db)
+        query.prepare("INSERT OR REPLACE INTO %s.sync_peers (uuid, watermark, fingerprint)"
+                      " VALUES (?, ?, ?)" % self.schema)
+        query.addBindValue(peer)
+        query.addBindValue(watermark)
+        query.addBindValue(fingerprint)
+        query.exec_()
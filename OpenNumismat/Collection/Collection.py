@@ -9,10 +9,10 @@ import shutil
 from PySide6 import QtCore
 from PySide6.QtWidgets import *
 from PySide6.QtGui import QImage, QPainter, QAction
-from PySide6.QtCore import Qt, QCryptographicHash, QLocale
+from PySide6.QtCore import Qt, QLocale, QEventLoop
 from PySide6.QtCore import QT_TRANSLATE_NOOP
 from PySide6.QtCore import Signal as pyqtSignal
-from PySide6.QtSql import QSqlTableModel, QSqlDatabase, QSqlQuery, QSqlField
+from PySide6.QtSql import QSqlTableModel, QSqlDatabase, QSqlQuery, QSqlField, QSqlRecord
 
 from OpenNumismat.Collection.CollectionFields import CollectionFieldsBase
 from OpenNumismat.Collection.CollectionFields import FieldTypes as Type
@@ -21,6 +21,20 @@ from OpenNumismat.Collection.CollectionFields import ImageFields
 from OpenNumismat.Collection.CollectionPages import CollectionPages
 from OpenNumismat.Collection.Password import cryptPassword, PasswordDialog
 from OpenNumismat.Collection.Description import CollectionDescription
+from OpenNumismat.Collection.ImageCache import ImageCache
+from OpenNumismat.Collection.DisplayCache import DisplayCache
+from OpenNumismat.Collection.Duplicates import Duplicates
+from OpenNumismat.Collection.Backup import BackupThread, BackupCatalog
+from OpenNumismat.Collection.ChangeJournal import ChangeJournal
+from OpenNumismat.Collection.FilterCompiler import FilterCompiler
+from OpenNumismat.Collection.FullTextSearch import FullTextSearch
+from OpenNumismat.Collection.Merge import Merge
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+from OpenNumismat.Collection.QuickSearch import QuickSearch
+from OpenNumismat.Collection.ReadPool import ReadPool
+from OpenNumismat.Collection.StorageProfile import StorageProfile, Profiles
+from OpenNumismat.Collection.ImageStorage import ImageStorage
+from OpenNumismat.Collection.IndexAdvisor import IndexAdvisor
 from OpenNumismat.Reference.Reference import Reference
 from OpenNumismat.Reference.Reference import CrossReferenceSection
 from OpenNumismat.Reference.ReferenceDialog import AllReferenceDialog
@@ -39,8 +53,10 @@ from OpenNumismat.Tools.Converters import numberWithFraction, htmlToPlainText
 class CollectionModel(QSqlTableModel):
     rowInserted = pyqtSignal(object)
     modelChanged = pyqtSignal()
+    searchChanged = pyqtSignal()
     tagsChanged = pyqtSignal()
     IMAGE_FORMAT = 'jpg'
+    SORT_ID_STEP = 1024  # gap between positions of neighbour coins
     SQLITE_READONLY = '8'
 
     def __init__(self, collection, parent=None):
@@ -54,9 +70,26 @@ class CollectionModel(QSqlTableModel):
         self.fields = collection.fields
         self.description = collection.description
         self.settings = collection.settings
+        self.imageCache = collection.imageCache
+        self.imageStorage = collection.imageStorage
+        self.indexAdvisor = collection.indexAdvisor
+        self.filterCompiler = FilterCompiler(collection.db)
+        self.fullTextSearch = collection.fullTextSearch
+        self.duplicates = collection.duplicates
+        self.readPool = collection.readPool
+        self.quickSearch = QuickSearch(collection.db)
+        self._searching = False
+        self._rowHeight = None
+        self._formatters = None
+        self._cachedColumns = None
+        self.displayCache = DisplayCache(Settings()['display_cache_size'] * 1024 * 1024)
         self.proxy = None
 
         self.rowsInserted.connect(self.rowsInsertedEvent)
+        self.dataChanged.connect(self._dataChangedEvent)
+        self.rowsInserted.connect(self._rowsInsertedEvent)
+        for signal in (self.modelReset, self.layoutChanged, self.rowsRemoved):
+            signal.connect(self._clearDisplayCache)
 
     def supportedDropActions(self):
         return Qt.MoveAction
@@ -67,74 +100,22 @@ class CollectionModel(QSqlTableModel):
     def data(self, index, role=Qt.DisplayRole):
         if role == Qt.DisplayRole:
             # Localize values
+            row = index.row()
+            column = index.column()
+            text = self.displayCache.get(row, column)
+            if text is not None:
+                return text
+
             data = super().data(index, role)
-            field = self.fields.fields[index.column()]
+            if not self._formatters:
+                self._createFormatters()
             try:
-                if field.name == 'status':
-                    text = Statuses[data]
-                elif field.name == 'year':
-                    year = str(data)
-                    if year and year[0] == '-':
-                        text = "%s BC" % year[1:]
-                    else:
-                        text = year
-                elif field.name == 'axis':
-                    if self.settings['axis_in_hours']:
-                        value = int(data)
-                        value += 360 / 12 / 2
-                        value /= 360 / 12
-                        value = int(value)
-                        if value == 0:
-                            value = 12
-                        text = str(value) + self.tr("h")
-                    else:
-                        return data
-                elif field.name == 'rating':
-                    maxStarCount = self.settings['stars_count']
-                    star_count = math.ceil(data.count('*') / (10 / maxStarCount))
-                    # text = '★' * star_count  # black star
-                    text = '⭐' * star_count  # white medium star
-                elif field.type == Type.BigInt:
-                    text = QLocale.system().toString(int(data))
-                elif field.type == Type.Text:
-                    text = htmlToPlainText(data)
-                elif field.type == Type.Money:
-                    text = QLocale.system().toString(float(data), 'f', precision=2)
-                    dp = QLocale.system().decimalPoint()
-                    text = text.rstrip('0').rstrip(dp)
-                elif field.type == Type.Denomination:
-                    text, converted = numberWithFraction(data, self.settings['convert_fraction'])
-                    if not converted:
-                        text = QLocale.system().toString(float(data), 'f', precision=2)
-                        dp = QLocale.system().decimalPoint()
-                        text = text.rstrip('0').rstrip(dp)
-                elif field.type == Type.Value:
-                    text = QLocale.system().toString(float(data), 'f', precision=3)
-                    dp = QLocale.system().decimalPoint()
-                    text = text.rstrip('0').rstrip(dp)
-                elif field.type == Type.PreviewImage:
-                    if data:
-                        return self.getPreviewImage(data)
-                    else:
-                        return None
-                elif field.type == Type.Image:
-                    if data:
-                        return self.getImage(data)
-                    else:
-                        return None
-                elif field.type == Type.Date:
-                    date = QtCore.QDate.fromString(data, Qt.ISODate)
-                    text = QLocale.system().toString(date, QLocale.ShortFormat)
-                elif field.type == Type.DateTime:
-                    date = QtCore.QDateTime.fromString(data, Qt.ISODate)
-                    # Timestamp in DB stored in UTC
-                    date.setTimeSpec(Qt.UTC)
-                    date = date.toLocalTime()
-                    text = QLocale.system().toString(date, QLocale.ShortFormat)
-                else:
-                    return data
+                text = self._formatters[column](data)
             except (ValueError, TypeError):
                 return data
+
+            if self._cachedColumns[column] and isinstance(text, str):
+                self.displayCache.set(row, column, text)
             return text
         elif role == Qt.UserRole:
             field = self.fields.fields[index.column()]
@@ -160,6 +141,124 @@ class CollectionModel(QSqlTableModel):
 
         return super().data(index, role)
 
+    def resetFormatters(self):
+        self._formatters = None
+        self.displayCache.clear()
+
+    def _clearDisplayCache(self, *_args):
+        self.displayCache.clear()
+
+    def _dataChangedEvent(self, topLeft, bottomRight, _roles=None):
+        self.displayCache.removeRows(topLeft.row(), bottomRight.row())
+
+    def _rowsInsertedEvent(self, _parent, first, last):
+        # Fetching appends rows to the end, so cached rows are not shifted
+        if last < self.rowCount() - 1:
+            self.displayCache.clear()
+
+    def _createFormatters(self):
+        # Functions for localizing values of each column, created once with
+        # current locale and settings
+        locale = QLocale.system()
+        decimalPoint = locale.decimalPoint()
+        axisInHours = self.settings['axis_in_hours']
+        maxStarCount = self.settings['stars_count']
+        convertFraction = self.settings['convert_fraction']
+
+        def noFormat(data):
+            return data
+
+        def formatStatus(data):
+            return Statuses[data]
+
+        def formatYear(data):
+            year = str(data)
+            if year and year[0] == '-':
+                return "%s BC" % year[1:]
+            return year
+
+        def formatAxis(data):
+            value = int(data)
+            value += 360 / 12 / 2
+            value /= 360 / 12
+            value = int(value)
+            if value == 0:
+                value = 12
+            return str(value) + self.tr("h")
+
+        def formatRating(data):
+            star_count = math.ceil(data.count('*') / (10 / maxStarCount))
+            # return '★' * star_count  # black star
+            return '⭐' * star_count  # white medium star
+
+        def formatBigInt(data):
+            return locale.toString(int(data))
+
+        def formatMoney(data):
+            text = locale.toString(float(data), 'f', precision=2)
+            return text.rstrip('0').rstrip(decimalPoint)
+
+        def formatDenomination(data):
+            text, converted = numberWithFraction(data, convertFraction)
+            if not converted:
+                text = locale.toString(float(data), 'f', precision=2)
+                text = text.rstrip('0').rstrip(decimalPoint)
+            return text
+
+        def formatValue(data):
+            text = locale.toString(float(data), 'f', precision=3)
+            return text.rstrip('0').rstrip(decimalPoint)
+
+        def formatPreviewImage(data):
+            if data:
+                return self.getPreviewImage(data)
+            return None
+
+        def formatImage(data):
+            if data:
+                return self.getImage(data)
+            return None
+
+        def formatDate(data):
+            date = QtCore.QDate.fromString(data, Qt.ISODate)
+            return locale.toString(date, QLocale.ShortFormat)
+
+        def formatDateTime(data):
+            date = QtCore.QDateTime.fromString(data, Qt.ISODate)
+            # Timestamp in DB stored in UTC
+            date.setTimeSpec(Qt.UTC)
+            date = date.toLocalTime()
+            return locale.toString(date, QLocale.ShortFormat)
+
+        formattersByName = {'status': formatStatus, 'year': formatYear,
+                            'rating': formatRating}
+        if axisInHours:
+            formattersByName['axis'] = formatAxis
+        else:
+            formattersByName['axis'] = noFormat
+        formattersByType = {Type.BigInt: formatBigInt,
+                            Type.Text: htmlToPlainText,
+                            Type.Money: formatMoney,
+                            Type.Denomination: formatDenomination,
+                            Type.Value: formatValue,
+                            Type.PreviewImage: formatPreviewImage,
+                            Type.Image: formatImage,
+                            Type.Date: formatDate,
+                            Type.DateTime: formatDateTime}
+
+        # Cache only results of expensive formatting
+        notCached = (noFormat, formatPreviewImage, formatImage)
+
+        self._formatters = []
+        self._cachedColumns = []
+        for field in self.fields.fields:
+            if field.name in formattersByName:
+                formatter = formattersByName[field.name]
+            else:
+                formatter = formattersByType.get(field.type, noFormat)
+            self._formatters.append(formatter)
+            self._cachedColumns.append(formatter not in notCached)
+
     def dataDisplayRole(self, index):
         return super().data(index, Qt.DisplayRole)
 
@@ -184,12 +283,12 @@ class CollectionModel(QSqlTableModel):
 
         # query = self.query()
         # print(query.lastInsertId())
-        query = QSqlQuery(self.database())
+        query = SqlQuery(self.database())
         query.exec_('SELECT last_insert_rowid()')
         if query.first():
             coin_id = query.value(0)
             for tag_id in tag_ids:
-                query = QSqlQuery(self.database())
+                query = SqlQuery(self.database())
                 query.prepare("INSERT INTO coins_tags(coin_id, tag_id) VALUES(?, ?)")
                 query.addBindValue(coin_id)
                 query.addBindValue(tag_id)
@@ -204,24 +303,93 @@ class CollectionModel(QSqlTableModel):
         record.setNull('id')  # remove ID value from record
         record.setValue('createdat', record.value('updatedat'))
 
-        query = QSqlQuery("SELECT MAX(sort_id) FROM coins", self.database())
+        query = SqlQuery("SELECT MAX(sort_id) FROM coins", self.database())
         query.first()
         sort_id = query.record().value(0)
         if not sort_id:
             sort_id = 0
-        record.setValue('sort_id', sort_id + 1)
+        record.setValue('sort_id', sort_id + self.SORT_ID_STEP)
 
         self.database().transaction()
+        self._storeImages(record)
+        self.database().commit()
+
+        return super().insertRecord(row, record)
+
+    def appendRecords(self, records, batch_size=1000):
+        # Bulk insert: statements are prepared once and committed in chunks,
+        # the view is refreshed only when all records are stored
+        db = self.database()
+
+        query = SqlQuery("SELECT MAX(sort_id) FROM coins", db)
+        query.first()
+        sort_id = query.record().value(0)
+        if not sort_id:
+            sort_id = 0
+
+        fields = [field.name for field in self.fields.fields if field.name != 'id']
+        coin_query = SqlQuery(db)
+        coin_query.prepare("INSERT INTO coins (%s) VALUES (%s)" %
+                           (', '.join(fields), ', '.join('?' * len(fields))))
+        tag_query = SqlQuery(db)
+        tag_query.prepare("INSERT INTO coins_tags(coin_id, tag_id) VALUES(?, ?)")
+
+        count = 0
+        db.transaction()
+        try:
+            for record in records:
+                tag_ids = record.value('tags')
+                if record.indexOf('tags') >= 0:
+                    record.remove(record.indexOf('tags'))
+
+                self._updateRecord(record)
+                record.setValue('createdat', record.value('updatedat'))
+                sort_id += self.SORT_ID_STEP
+                record.setValue('sort_id', sort_id)
+                self._storeImages(record)
+
+                for field in fields:
+                    coin_query.addBindValue(record.value(field))
+                if not coin_query.exec_():
+                    db.rollback()
+                    QMessageBox.critical(
+                        self.parent(), self.tr("Saving"),
+                        self.tr("Can't save data: %s") % coin_query.lastError().databaseText())
+                    break
+
+                coin_id = coin_query.lastInsertId()
+                for tag_id in tag_ids or []:
+                    tag_query.addBindValue(coin_id)
+                    tag_query.addBindValue(tag_id)
+                    tag_query.exec_()
+
+                count += 1
+                if count % batch_size == 0:
+                    db.commit()
+                    db.transaction()
+            else:
+                db.commit()
+        except Exception:
+            # Keep records stored before failure in source, as it was with
+            # appending one by one
+            db.commit()
+            self.select()
+            raise
+
+        self.select()
+
+        if self.proxy:
+            self.proxy.setDynamicSortFilter(True)
+
+        return count
+
+    def _storeImages(self, record):
+        # Replace image data in record with ids of stored photos and preview
         for field in ImageFields:
             value = record.value(field)
             if value:
-                query = QSqlQuery(self.database())
-                query.prepare("INSERT INTO photos (title, image) VALUES (?, ?)")
-                query.addBindValue(record.value(field + '_title'))
-                query.addBindValue(value)
-                query.exec_()
-
-                img_id = query.lastInsertId()
+                img_id = self.imageStorage.addPhoto(
+                    record.value(field + '_title'), value)
             else:
                 img_id = None
 
@@ -231,53 +399,29 @@ class CollectionModel(QSqlTableModel):
 
         value = record.value('image')
         if value:
-            query = QSqlQuery(self.database())
-            query.prepare("INSERT INTO images (image) VALUES (?)")
-            query.addBindValue(value)
-            query.exec_()
-
-            img_id = query.lastInsertId()
+            img_id = self.imageStorage.addImage(value)
         else:
             img_id = None
-        self.database().commit()
 
         record.setValue('image', img_id)
         record.remove(record.indexOf('image_id'))
 
-        return super().insertRecord(row, record)
-
     def setRecord(self, row, record):
         self._updateRecord(record)
 
         self.database().transaction()
-        # TODO : check that images was realy changed
+        # Photos are shared between coins, so a changed photo is stored as
+        # a new row and the old one is released
         for field in ImageFields:
-            img_id = record.value(field + '_id')
+            old_img_id = record.value(field + '_id')
             value = record.value(field)
-            if not value:
-                if img_id:
-                    query = QSqlQuery(self.database())
-                    query.prepare("DELETE FROM photos WHERE id=?")
-                    query.addBindValue(img_id)
-                    query.exec_()
-
-                    img_id = None
+            if value:
+                img_id = self.imageStorage.addPhoto(
+                    record.value(field + '_title'), value)
             else:
-                if img_id:
-                    query = QSqlQuery(self.database())
-                    query.prepare("UPDATE photos SET title=?, image=? WHERE id=?")
-                    query.addBindValue(record.value(field + '_title'))
-                    query.addBindValue(record.value(field))
-                    query.addBindValue(img_id)
-                    query.exec_()
-                else:
-                    query = QSqlQuery(self.database())
-                    query.prepare("INSERT INTO photos (title, image) VALUES (?, ?)")
-                    query.addBindValue(record.value(field + '_title'))
-                    query.addBindValue(record.value(field))
-                    query.exec_()
-
-                    img_id = query.lastInsertId()
+                img_id = None
+            if old_img_id:
+                self.imageStorage.removePhoto(old_img_id)
 
             if img_id:
                 record.setValue(field, img_id)
@@ -286,40 +430,24 @@ class CollectionModel(QSqlTableModel):
             record.remove(record.indexOf(field + '_id'))
             record.remove(record.indexOf(field + '_title'))
 
-        img_id = record.value('image_id')
+        old_img_id = record.value('image_id')
         value = record.value('image')
-        if not value:
-            if img_id:
-                query = QSqlQuery(self.database())
-                query.prepare("DELETE FROM images WHERE id=?")
-                query.addBindValue(img_id)
-                query.exec_()
-
-                img_id = None
+        if value:
+            img_id = self.imageStorage.addImage(value)
         else:
-            if img_id:
-                query = QSqlQuery(self.database())
-                query.prepare("UPDATE images SET image=? WHERE id=?")
-                query.addBindValue(record.value('image'))
-                query.addBindValue(img_id)
-                query.exec_()
-            else:
-                query = QSqlQuery(self.database())
-                query.prepare("INSERT INTO images (image) VALUES (?)")
-                query.addBindValue(record.value('image'))
-                query.exec_()
-
-                img_id = query.lastInsertId()
+            img_id = None
+        if old_img_id:
+            self.imageStorage.removeImage(old_img_id)
 
         coin_id = record.value('id')
 
-        query = QSqlQuery(self.database())
+        query = SqlQuery(self.database())
         query.prepare("DELETE FROM coins_tags WHERE coin_id=?")
         query.addBindValue(coin_id)
         query.exec_()
 
         for tag_id in record.value('tags'):
-            query = QSqlQuery(self.database())
+            query = SqlQuery(self.database())
             query.prepare("INSERT INTO coins_tags(coin_id, tag_id) VALUES(?, ?)")
             query.addBindValue(coin_id)
             query.addBindValue(tag_id)
@@ -337,38 +465,59 @@ class CollectionModel(QSqlTableModel):
 
         return super().setRecord(row, record)
 
-    def record(self, row=-1):
+    def record(self, row=-1, with_images=True):
+        # Without images only ids of photos are filled (in *_id fields), they
+        # can be loaded later with loadImages(). Such record can't be saved
         if row >= 0:
             record = super().record(row)
         else:
             record = super().record()
 
+        return self.__fillRecord(record, with_images)
+
+    def records(self, with_images=False):
+        # Iterate over filtered and sorted records without fetching rows
+        # into model, so bulk operations keep constant memory footprint
+        query = SqlQuery(self.database())
+        query.setForwardOnly(True)
+        query.exec_(self.selectStatement())
+        try:
+            while query.next():
+                yield self.__fillRecord(query.record(), with_images)
+        finally:
+            query.finish()
+
+    def filteredCount(self):
+        sql = "SELECT count(*) FROM coins"
+        if self.filter():
+            sql += " WHERE " + self.filter()
+        query = SqlQuery(sql, self.database())
+        query.first()
+        return query.record().value(0)
+
+    def __fillRecord(self, record, with_images):
         for field in ImageFields:
             record.append(QSqlField(field + '_title'))
             record.append(QSqlField(field + '_id'))
 
             img_id = record.value(field)
             if img_id:
-                data = self.getImage(img_id)
-                record.setValue(field, data)
-                record.setValue(field + '_title', self.getImageTitle(img_id))
                 record.setValue(field + '_id', img_id)
-            else:
-                record.setValue(field, None)
+            record.setValue(field, None)
 
         record.append(QSqlField('image_id'))
         img_id = record.value('image')
         if img_id:
-            data = self.getPreviewImage(img_id)
-            record.setValue('image', data)
             record.setValue('image_id', img_id)
-        else:
-            record.setValue('image', None)
+        record.setValue('image', None)
+
+        if with_images:
+            self.loadImages(record)
 
         tag_ids = []
         coin_id = record.value('id')
         if coin_id:
-            query = QSqlQuery(self.database())
+            query = SqlQuery(self.database())
             query.prepare("SELECT tag_id FROM coins_tags WHERE coin_id=?")
             query.addBindValue(coin_id)
             query.exec_()
@@ -382,71 +531,319 @@ class CollectionModel(QSqlTableModel):
 
         return record
 
+    def loadImages(self, record, fields=None):
+        if fields is None:
+            fields = ImageFields + ('image',)
+
+        for field in fields:
+            img_id = record.value(field + '_id')
+            if not img_id:
+                continue
+
+            if field == 'image':
+                record.setValue('image', self.getPreviewImage(img_id))
+            else:
+                record.setValue(field, self.getImage(img_id))
+                record.setValue(field + '_title', self.getImageTitle(img_id))
+
     def removeRow(self, row):
         record = super().record(row)
 
-        ids = []
         for field in ImageFields:
             value = record.value(field)
             if value:
-                ids.append(value)
-
-        if ids:
-            ids_sql = '(' + ','.join('?' * len(ids)) + ')'
-
-            query = QSqlQuery(self.database())
-            query.prepare("DELETE FROM photos WHERE id IN " + ids_sql)
-            for id_ in ids:
-                query.addBindValue(id_)
-            query.exec_()
+                self.imageStorage.removePhoto(value)
 
         value = record.value('image')
         if value:
-            query = QSqlQuery(self.database())
-            query.prepare("DELETE FROM images WHERE id=?")
-            query.addBindValue(value)
-            query.exec_()
+            self.imageStorage.removeImage(value)
 
         coin_id = record.value('id')
         if coin_id:
-            query = QSqlQuery(self.database())
+            query = SqlQuery(self.database())
             query.prepare("DELETE FROM coins_tags WHERE coin_id=?")
             query.addBindValue(coin_id)
             query.exec_()
 
         return super().removeRow(row)
 
+    @waitCursorDecorator
+    def removeRecords(self, ids):
+        # Bulk delete: coins, their tags and unreferenced photos are removed
+        # with a few statements in one transaction
+        db = self.database()
+        db.transaction()
+
+        self._fillSelectedCoins(ids)
+
+        sqls = []
+        for table, fields in (('photos', ImageFields), ('images', ('image',))):
+            for field in fields:
+                sqls.append(self._releaseImagesSql(table, field))
+            sqls.append("DELETE FROM %s WHERE refs<=0" % table)
+        sqls.append("DELETE FROM coins_tags WHERE coin_id IN (SELECT id FROM selected_coins)")
+        sqls.append("DELETE FROM coins WHERE id IN (SELECT id FROM selected_coins)")
+
+        query = self._execBulk(sqls)
+        if query is None:
+            return 0
+        removed = query.numRowsAffected()
+
+        db.commit()
+
+        SqlQuery("DROP TABLE selected_coins", db)
+
+        self.imageCache.clear()
+        self.select()
+
+        return removed
+
+    @waitCursorDecorator
+    def multiRecord(self, ids):
+        # Record with values common for all given coins and states of
+        # fields for multi edit dialog
+        db = self.database()
+        db.transaction()
+        self._fillSelectedCoins(ids)
+
+        record = self.record()
+        usedFields = [Qt.Unchecked] * record.count()
+
+        columns = ["count(*)"]
+        for field in self.fields.fields:
+            columns.append("count(DISTINCT %s), count(%s), min(%s)" %
+                           (field.name, field.name, field.name))
+        query = SqlQuery(db)
+        query.exec_("SELECT %s FROM coins WHERE id IN (SELECT id FROM selected_coins)" %
+                    ', '.join(columns))
+        query.first()
+        common = {}
+        total = query.value(0)
+        for i, field in enumerate(self.fields.fields):
+            distinct = query.value(i * 3 + 1)
+            count = query.value(i * 3 + 2)
+            value = query.value(i * 3 + 3)
+            if distinct == 1 and count == total and value is not None:
+                common[field.name] = value
+        query.finish()
+
+        for field in self.fields.fields:
+            if field.name not in common:
+                continue
+
+            value = common[field.name]
+            if field.name in ImageFields:
+                record.setValue(field.name, self.getImage(value))
+                record.setValue(field.name + '_title', self.getImageTitle(value))
+                record.setValue(field.name + '_id', value)
+                usedFields[record.indexOf(field.name + '_title')] = Qt.Checked
+                usedFields[record.indexOf(field.name + '_id')] = Qt.Checked
+            elif field.name == 'image':
+                record.setValue('image', self.getPreviewImage(value))
+                record.setValue('image_id', value)
+                usedFields[record.indexOf('image_id')] = Qt.Checked
+            else:
+                record.setValue(field.name, value)
+            usedFields[record.indexOf(field.name)] = Qt.Checked
+
+        tags = {}
+        query = SqlQuery(db)
+        query.exec_("SELECT tag_id, count(*) FROM coins_tags\
+            WHERE coin_id IN (SELECT id FROM selected_coins) GROUP BY tag_id")
+        while query.next():
+            if query.value(1) == total:
+                tags[query.value(0)] = Qt.Checked
+            else:
+                tags[query.value(0)] = Qt.PartiallyChecked
+        record.setValue('tags', tags)
+
+        SqlQuery("DROP TABLE selected_coins", db)
+        db.commit()
+
+        return record, usedFields
+
+    @waitCursorDecorator
+    def updateRecords(self, ids, record, usedFields):
+        # Bulk update of coins by checked fields of multi edit record
+        db = self.database()
+        db.transaction()
+        self._fillSelectedCoins(ids)
+        total = len(set(ids))
+
+        currentTime = QtCore.QDateTime.currentDateTimeUtc()
+        columns = ["updatedat=?"]
+        values = [currentTime.toString(Qt.ISODateWithMs)]
+        sqls = []
+        for field in self.fields.userFields:
+            if usedFields[record.indexOf(field.name)] != Qt.Checked:
+                continue
+            if field.name in ('id', 'image', 'sort_id', 'createdat', 'updatedat'):
+                continue
+
+            if record.isNull(field.name):
+                value = None
+            else:
+                value = record.value(field.name)
+            if field.type == Type.Image:
+                value = self._convertImage(value)
+                if value:
+                    img_id = self.imageStorage.addPhoto(
+                        record.value(field.name + '_title'), value)
+                    # Photo acquired for all coins at once
+                    query = SqlQuery(db)
+                    query.prepare("UPDATE photos SET refs=refs+? WHERE id=?")
+                    query.addBindValue(total - 1)
+                    query.addBindValue(img_id)
+                    query.exec_()
+                    value = img_id
+                sqls.append(self._releaseImagesSql('photos', field.name))
+
+            if value is None:
+                columns.append("%s=NULL" % field.name)
+            else:
+                columns.append("%s=?" % field.name)
+                values.append(value)
+
+        if sqls and self._execBulk(sqls) is None:
+            return
+
+        query = SqlQuery(db)
+        query.prepare("UPDATE coins SET %s WHERE id IN (SELECT id FROM selected_coins)" %
+                      ', '.join(columns))
+        for value in values:
+            query.addBindValue(value)
+        if self._execBulk((query,)) is None:
+            return
+
+        tags = record.value('tags')
+        if tags:
+            for tag_id, state in tags.items():
+                query = SqlQuery(db)
+                if state == Qt.Checked:
+                    query.prepare("INSERT INTO coins_tags (coin_id, tag_id)\
+                        SELECT id, ? FROM selected_coins WHERE id NOT IN\
+                        (SELECT coin_id FROM coins_tags WHERE tag_id=?)")
+                    query.addBindValue(tag_id)
+                    query.addBindValue(tag_id)
+                elif state == Qt.Unchecked:
+                    query.prepare("DELETE FROM coins_tags WHERE tag_id=? AND\
+                        coin_id IN (SELECT id FROM selected_coins)")
+                    query.addBindValue(tag_id)
+                else:
+                    continue
+                query.exec_()
+
+        for field in ('obverseimg', 'reverseimg'):
+            if usedFields[record.indexOf(field)] == Qt.Checked:
+                self.__recalculatePreviews()
+                break
+
+        SqlQuery("DELETE FROM photos WHERE refs<=0", db)
+
+        db.commit()
+
+        SqlQuery("DROP TABLE selected_coins", db)
+
+        self.imageCache.clear()
+        self.select()
+
+    def __recalculatePreviews(self):
+        # Coins with the same obverse and reverse share preview image
+        db = self.database()
+        previews = {}
+        query = SqlQuery(db)
+        query.setForwardOnly(True)
+        query.exec_("SELECT id, obverseimg, reverseimg, image FROM coins\
+            WHERE id IN (SELECT id FROM selected_coins)")
+        while query.next():
+            coin_id = query.value(0)
+            key = (query.value(1), query.value(2))
+            old_img_id = query.value(3)
+
+            if key not in previews:
+                record = QSqlRecord()
+                for field in ('obverseimg', 'reverseimg', 'image'):
+                    record.append(QSqlField(field))
+                for field, img_id in zip(('obverseimg', 'reverseimg'), key):
+                    if img_id:
+                        record.setValue(field, self.getImage(img_id))
+                self._recalculateImage(record)
+                previews[key] = record.value('image')
+
+            value = previews[key]
+            if value:
+                img_id = self.imageStorage.addImage(value)
+            else:
+                img_id = None
+            if old_img_id:
+                self.imageStorage.removeImage(old_img_id)
+
+            update_query = SqlQuery(db)
+            if img_id:
+                update_query.prepare("UPDATE coins SET image=? WHERE id=?")
+                update_query.addBindValue(img_id)
+            else:
+                update_query.prepare("UPDATE coins SET image=NULL WHERE id=?")
+            update_query.addBindValue(coin_id)
+            update_query.exec_()
+
+    def _fillSelectedCoins(self, ids):
+        db = self.database()
+        SqlQuery("DROP TABLE IF EXISTS selected_coins", db)
+        SqlQuery("CREATE TEMP TABLE selected_coins (id INTEGER PRIMARY KEY)", db)
+        query = SqlQuery(db)
+        query.prepare("INSERT OR IGNORE INTO selected_coins (id) VALUES (?)")
+        for coin_id in ids:
+            query.addBindValue(coin_id)
+            query.exec_()
+
+    @staticmethod
+    def _releaseImagesSql(table, field):
+        # Decrease references from selected coins to images in field
+        return "UPDATE %s SET refs=refs-(SELECT count(*) FROM coins\
+            WHERE coins.%s=%s.id AND coins.id IN (SELECT id FROM selected_coins))\
+            WHERE id IN (SELECT %s FROM coins WHERE id IN (SELECT id FROM selected_coins))"\
+            % (table, field, table, field)
+
+    def _execBulk(self, sqls):
+        # Execute statements of bulk operation, rollback it on first error
+        db = self.database()
+        query = None
+        for sql in sqls:
+            if isinstance(sql, QSqlQuery):
+                query = sql
+                res = query.exec_()
+            else:
+                query = SqlQuery(db)
+                res = query.exec_(sql)
+
+            if not res:
+                error = query.lastError()
+                db.rollback()
+                SqlQuery("DROP TABLE IF EXISTS selected_coins", db)
+
+                if error.nativeErrorCode() == self.SQLITE_READONLY:
+                    message = self.tr("file is readonly")
+                else:
+                    message = error.databaseText()
+                QMessageBox.critical(
+                    self.parent(), self.tr("Saving"),
+                    self.tr("Can't save data: %s") % message)
+                return None
+
+        return query
+
     def _updateRecord(self, record):
         if self.proxy:
             self.proxy.setDynamicSortFilter(False)
 
         for field in self.fields.userFields:
             if field.type == Type.Image:
-                # Convert image to DB format
                 image = record.value(field.name)
                 if isinstance(image, str):
-                    # Copying record as text (from Excel) store missed images
-                    # as string
                     record.setNull(field.name)
-                elif isinstance(image, QImage):
-                    ba = QtCore.QByteArray()
-                    buffer = QtCore.QBuffer(ba)
-                    buffer.open(QtCore.QIODevice.WriteOnly)
-
-                    # Resize big images for storing in DB
-                    sideLen = self.settings['ImageSideLen']
-                    if sideLen > 0:
-                        maxWidth = sideLen
-                        maxHeight = sideLen
-                        if image.width() > maxWidth or image.height() > maxHeight:
-                            image = image.scaled(maxWidth, maxHeight,
-                                    Qt.KeepAspectRatio, Qt.SmoothTransformation)
-
-                    image.save(buffer, self.IMAGE_FORMAT)
-                    record.setValue(field.name, ba)
-                elif isinstance(image, bytes):
-                    ba = QtCore.QByteArray(image)
-                    record.setValue(field.name, ba)
+                elif isinstance(image, (QImage, bytes)):
+                    record.setValue(field.name, self._convertImage(image))
 
         # Creating preview image for list
         self._recalculateImage(record)
@@ -455,15 +852,44 @@ class CollectionModel(QSqlTableModel):
         # currentTime.setTimeSpec(Qt.LocalTime)
         record.setValue('updatedat', currentTime.toString(Qt.ISODateWithMs))
 
+    def _convertImage(self, image):
+        # Convert image to DB format
+        if isinstance(image, str):
+            # Copying record as text (from Excel) store missed images
+            # as string
+            return None
+        elif isinstance(image, QImage):
+            ba = QtCore.QByteArray()
+            buffer = QtCore.QBuffer(ba)
+            buffer.open(QtCore.QIODevice.WriteOnly)
+
+            # Resize big images for storing in DB
+            sideLen = self.settings['ImageSideLen']
+            if sideLen > 0:
+                maxWidth = sideLen
+                maxHeight = sideLen
+                if image.width() > maxWidth or image.height() > maxHeight:
+                    image = image.scaled(maxWidth, maxHeight,
+                            Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+            image.save(buffer, self.IMAGE_FORMAT)
+            return ba
+        elif isinstance(image, bytes):
+            return QtCore.QByteArray(image)
+
+        return image
+
     def _recalculateImage(self, record):
         # Creating preview image for list
         if record.isNull('obverseimg') and record.isNull('reverseimg'):
             record.setNull('image')
         else:
             # Get height of list view for resizing images
-            tmp = QTableView()
+            if not self._rowHeight:
+                tmp = QTableView()
+                self._rowHeight = tmp.verticalHeader().defaultSectionSize()
             height_multiplex = self.settings['image_height']
-            height = int(tmp.verticalHeader().defaultSectionSize() * height_multiplex - 1)
+            height = int(self._rowHeight * height_multiplex - 1)
 
             obverseImage = QImage()
             reverseImage = QImage()
@@ -505,45 +931,116 @@ class CollectionModel(QSqlTableModel):
             sort_column_id = self.fields.sort_id.id
             self.sort(sort_column_id, Qt.AscendingOrder)
 
-        row_rang = []
-        if row2 == -1:
-            row_rang = range(row1 + 1, self.rowCount())
-        elif row1 > row2:
-            row_rang = range(row1 - 1, row2 - 1, -1)
-        elif row1 < row2:
-            row_rang = range(row1 + 1, row2 + 1)
-
-        if row_rang:
-            record = super().record(row1)
-            old_sort_id = record.value('sort_id')
-            for row in row_rang:
-                record1 = super().record(row)
-                sort_id = record1.value('sort_id')
-                record1.setValue('sort_id', old_sort_id)
-                super().setRecord(row, record1)
-                old_sort_id = sort_id
-            record.setValue('sort_id', old_sort_id)
-            super().setRecord(row1, record)
+        if row1 != row2:
+            # Rows aren't valid after renumbering, so coins are taken by ids
+            id_column = self.fields.id.id
+            coin_id = self.index(row1, id_column).data(Qt.UserRole)
+            if row2 == -1:
+                dest_id = None
+            else:
+                dest_id = self.index(row2, id_column).data(Qt.UserRole)
+            up = row2 != -1 and row1 > row2
+
+            sort_id = self.__sortIdForMove(coin_id, dest_id, up)
+            if sort_id is None:
+                # No free position between neighbours - spread all coins
+                # and try again
+                self.renumberSortIds()
+                sort_id = self.__sortIdForMove(coin_id, dest_id, up)
+
+            query = SqlQuery(self.database())
+            query.prepare("UPDATE coins SET sort_id=? WHERE id=?")
+            query.addBindValue(sort_id)
+            query.addBindValue(coin_id)
+            query.exec_()
 
-        self.submitAll()
+            self.select()
 
         if self.proxy:
             self.sort(-1, Qt.AscendingOrder)
 
+    def __sortIdForMove(self, coin_id, dest_id, up):
+        # Position between destination coin and its neighbour in whole
+        # collection (including coins hidden by filter), so only moved
+        # coin is updated
+        db = self.database()
+        if dest_id is None:
+            query = SqlQuery("SELECT MAX(sort_id) FROM coins", db)
+            query.first()
+            return query.record().value(0) + self.SORT_ID_STEP
+
+        query = SqlQuery(db)
+        query.prepare("SELECT sort_id FROM coins WHERE id=?")
+        query.addBindValue(dest_id)
+        query.exec_()
+        query.first()
+        dest_sort_id = query.record().value(0)
+
+        query = SqlQuery(db)
+        if up:
+            query.prepare("SELECT MAX(sort_id) FROM coins WHERE sort_id<? AND id<>?")
+        else:
+            query.prepare("SELECT MIN(sort_id) FROM coins WHERE sort_id>? AND id<>?")
+        query.addBindValue(dest_sort_id)
+        query.addBindValue(coin_id)
+        query.exec_()
+        query.first()
+        # Aggregate of no rows is NULL
+        has_neighbour = not query.isNull(0)
+        neighbour_sort_id = query.record().value(0)
+
+        if up:
+            upper = dest_sort_id
+            if has_neighbour:
+                lower = neighbour_sort_id
+            else:
+                lower = upper - self.SORT_ID_STEP * 2
+        else:
+            lower = dest_sort_id
+            if has_neighbour:
+                upper = neighbour_sort_id
+            else:
+                upper = lower + self.SORT_ID_STEP * 2
+
+        if upper - lower < 2:
+            return None
+
+        return (lower + upper) // 2
+
+    def renumberSortIds(self):
+        db = self.database()
+        db.transaction()
+        SqlQuery("CREATE TEMP TABLE sort_positions AS SELECT id,\
+            ROW_NUMBER() OVER (ORDER BY sort_id, id) AS pos FROM coins", db)
+        SqlQuery("UPDATE coins SET sort_id=(SELECT pos FROM sort_positions\
+            WHERE sort_positions.id=coins.id) * %d" % self.SORT_ID_STEP, db)
+        SqlQuery("DROP TABLE sort_positions", db)
+        db.commit()
+
     @waitCursorDecorator
     def setRowsPos(self, indexes):
+        id_column = self.fields.id.id
         sorted_ids = sorted([index.data(Qt.UserRole) for index in indexes])
+
+        db = self.database()
+        db.transaction()
+        SqlQuery("CREATE TEMP TABLE sort_positions (id INTEGER PRIMARY KEY, sort_id INTEGER)", db)
+        query = SqlQuery(db)
+        query.prepare("INSERT INTO sort_positions (id, sort_id) VALUES (?, ?)")
         for index, sort_id in zip(indexes, sorted_ids):
-            record = super().record(index.row())
-            record.setValue('sort_id', sort_id)
-            super().setRecord(index.row(), record)
+            query.addBindValue(index.siblingAtColumn(id_column).data(Qt.UserRole))
+            query.addBindValue(sort_id)
+            query.exec_()
 
-        self.submitAll()
+        SqlQuery("UPDATE coins SET sort_id=(SELECT sort_id FROM sort_positions\
+            WHERE sort_positions.id=coins.id) WHERE id IN (SELECT id FROM sort_positions)", db)
+        SqlQuery("DROP TABLE sort_positions", db)
+        db.commit()
+
+        self.select()
 
     def recalculateAllImages(self, parent=None):
-        while self.canFetchMore():
-            self.fetchMore()
-        rowCount = self.rowCount()
+        rowCount = self.filteredCount()
 
         if not parent:
             parent = self.parent()
@@ -553,26 +1050,32 @@ class CollectionModel(QSqlTableModel):
 
         self.database().transaction()
 
-        for row in range(rowCount):
+        records = self.records(with_images=True)
+        for record in records:
             progressDlg.step()
             if progressDlg.wasCanceled():
                 break
 
-            record = self.record(row)
             self._recalculateImage(record)
-            img_id = record.value('image_id')
+            old_img_id = record.value('image_id')
             value = record.value('image')
-            if value and img_id:
-                query = QSqlQuery(self.database())
-                query.prepare("UPDATE images SET image=? WHERE id=?")
-                query.addBindValue(record.value('image'))
-                query.addBindValue(img_id)
-                query.exec_()
+            if value and old_img_id:
+                img_id = self.imageStorage.addImage(value)
+                self.imageStorage.removeImage(old_img_id)
+                if img_id != old_img_id:
+                    query = SqlQuery(self.database())
+                    query.prepare("UPDATE coins SET image=? WHERE id=?")
+                    query.addBindValue(img_id)
+                    query.addBindValue(record.value('id'))
+                    query.exec_()
+        records.close()
 
         progressDlg.setLabelText(self.tr("Saving..."))
 
         self.database().commit()
 
+        self.imageCache.clear('images')
+
         progressDlg.reset()
 
     def submitAll(self):
@@ -592,9 +1095,15 @@ class CollectionModel(QSqlTableModel):
         return ret
 
     def select(self):
+        self.quickSearch.update()
+
         ret = super().select()
 
-        self.modelChanged.emit()
+        # Changing of search text doesn't affect tree
+        if self._searching:
+            self.searchChanged.emit()
+        else:
+            self.modelChanged.emit()
 
         return ret
 
@@ -610,33 +1119,55 @@ class CollectionModel(QSqlTableModel):
 
         return self.fields.fields[column].name
 
-    def getImage(self, img_id):
-        query = QSqlQuery(self.database())
-        query.prepare("SELECT image FROM photos WHERE id=?")
+    def __getPhoto(self, img_id):
+        photo = self.imageCache.get('photos', img_id)
+        if photo:
+            return photo
+
+        query = SqlQuery(self.database())
+        query.prepare("SELECT image, title FROM photos WHERE id=?")
         query.addBindValue(img_id)
         query.exec_()
         if query.first():
-            return query.record().value(0)
+            image = query.record().value(0)
+            title = query.record().value(1)
+            photo = (image, title)
+
+            size = len(title or '')
+            if image:
+                size += len(image)
+            self.imageCache.set('photos', img_id, photo, size)
+
+            return photo
+
+        return (None, None)
+
+    def getImage(self, img_id):
+        return self.__getPhoto(img_id)[0]
 
     def getPreviewImage(self, img_id):
-        query = QSqlQuery(self.database())
+        image = self.imageCache.get('images', img_id)
+        if image:
+            return image
+
+        query = SqlQuery(self.database())
         query.prepare("SELECT image FROM images WHERE id=?")
         query.addBindValue(img_id)
         query.exec_()
         if query.first():
-            return query.record().value(0)
+            image = query.record().value(0)
+            if image:
+                self.imageCache.set('images', img_id, image, len(image))
+
+            return image
 
     def getImageTitle(self, img_id):
-        query = QSqlQuery(self.database())
-        query.prepare("SELECT title FROM photos WHERE id=?")
-        query.addBindValue(img_id)
-        query.exec_()
-        if query.first():
-            return query.record().value(0)
+        return self.__getPhoto(img_id)[1]
 
     def clearFilters(self):
         self.intFilter = ''
         self.searchFilter = ''
+        self.quickSearch.reset()
         self.__applyFilter()
 
     def setFilter(self, filter_):
@@ -649,7 +1180,18 @@ class CollectionModel(QSqlTableModel):
 
     def setSearchFilter(self, filter_):
         self.searchFilter = filter_
+        self.quickSearch.reset()
+        self._searching = True
         self.__applyFilter()
+        self._searching = False
+
+    def setQuickSearch(self, text, fields, filter_):
+        # Filter must find text in fields, result is narrowed while text
+        # is extended
+        self.searchFilter = self.quickSearch.search(text, fields, filter_)
+        self._searching = True
+        self.__applyFilter()
+        self._searching = False
 
     def __applyFilter(self):
         filters = []
@@ -671,31 +1213,12 @@ class CollectionModel(QSqlTableModel):
         super().setFilter(combinedFilter)
 
     def isExist(self, record):
-        fields = ('title', 'value', 'unit', 'country', 'period', 'ruler',
-                  'year', 'mint', 'mintmark', 'type', 'series', 'subjectshort',
-                  'status', 'material', 'quality', 'paydate', 'payprice',
-                  'saller', 'payplace', 'saledate', 'saleprice', 'buyer',
-                  'saleplace', 'variety', 'obversevar', 'reversevar',
-                  'edgevar')
-        filterParts = [field + '=?' for field in fields]
-        sqlFilter = ' AND '.join(filterParts)
-
-        db = self.database()
-        query = QSqlQuery(db)
-        query.prepare("SELECT 1 FROM coins WHERE id<>? AND " + sqlFilter + " LIMIT 1")
-        query.addBindValue(record.value('id'))
-        for field in fields:
-            query.addBindValue(record.value(field))
-        query.exec_()
-        if query.first():
-            return True
-
-        return False
+        return self.duplicates.isExist(record)
 
 
 class CollectionSettings(BaseSettings):
     Default = {
-            'Version': 9,
+            'Version': 10,
             'Type': version.AppName,
             'Password': cryptPassword(),
             'ImageSideLen': 1024,
@@ -758,6 +1281,7 @@ class CollectionSettings(BaseSettings):
             'axis_in_hours': False,
             'stars_count': 10,
             'tags_used': True,
+            'fts_search': False,
     }
 
     def __init__(self, db):
@@ -767,7 +1291,7 @@ class CollectionSettings(BaseSettings):
         if 'settings' not in self.db.tables():
             self.create(self.db)
 
-        query = QSqlQuery("SELECT * FROM settings", self.db)
+        query = SqlQuery("SELECT * FROM settings", self.db)
         while query.next():
             record = query.record()
             title = record.value('title')
@@ -779,7 +1303,8 @@ class CollectionSettings(BaseSettings):
                     value = float(record.value('value'))
                 elif title in ('free_numeric', 'convert_fraction',
                                'images_at_bottom', 'enable_bc', 'rich_text',
-                               'relative_url', 'axis_in_hours', 'tags_used'):
+                               'relative_url', 'axis_in_hours', 'tags_used',
+                               'fts_search'):
                     value = record.value('value').lower() in ('true', '1')
                 elif '_status_used' in title:
                     value = record.value('value').lower() in ('true', '1')
@@ -809,7 +1334,7 @@ class CollectionSettings(BaseSettings):
         self.db.transaction()
 
         for key, value in self.items():
-            query = QSqlQuery(self.db)
+            query = SqlQuery(self.db)
             query.prepare("INSERT OR REPLACE INTO settings (title, value)"
                           " VALUES (?, ?)")
             query.addBindValue(key)
@@ -825,10 +1350,10 @@ class CollectionSettings(BaseSettings):
         sql = """CREATE TABLE settings (
             title CHAR NOT NULL UNIQUE,
             value CHAR)"""
-        QSqlQuery(sql, db)
+        SqlQuery(sql, db)
 
         for key, value in CollectionSettings.Default.items():
-            query = QSqlQuery(db)
+            query = SqlQuery(db)
             query.prepare("INSERT INTO settings (title, value)"
                           " VALUES (?, ?)")
             query.addBindValue(key)
@@ -845,13 +1370,30 @@ class Collection(QtCore.QObject):
         self.db = QSqlDatabase.addDatabase('QSQLITE')
         self._pages = None
         self.fileName = None
+        self.readPool = None
+        self.reference = None
 
     def isOpen(self):
         return self.db.isValid() and self.fileName
 
-    def open(self, fileName):
+    def close(self):
+        if self.readPool:
+            self.readPool.close()
+            self.readPool = None
+
+        if self.reference:
+            self.reference.close()
+            self.reference = None
+
+        if self.db.isOpen():
+            StorageProfile.close(self.db)
+            self.db.close()
+
         self.fileName = None
 
+    def open(self, fileName):
+        self.close()
+
         file = QtCore.QFileInfo(fileName)
         if file.isFile():
             self.db.setDatabaseName(fileName)
@@ -898,6 +1440,9 @@ class Collection(QtCore.QObject):
 
         self.fileName = fileName
 
+        # Updater makes backup before updating
+        self.backupCatalog = BackupCatalog(self.db)
+
         if not updateCollection(self):
             self.fileName = None
             return False
@@ -906,12 +1451,32 @@ class Collection(QtCore.QObject):
 
         self.description = CollectionDescription(self)
 
+        self.imageCache = ImageCache(Settings()['image_cache_size'] * 1024 * 1024)
+        self.imageStorage = ImageStorage(self.db, self.imageCache)
+        self.indexAdvisor = IndexAdvisor(self.db)
+        self.fullTextSearch = FullTextSearch(self.db, self.fields)
+        if not self.fullTextSearch.supported:
+            # Index is built or dropped by changing settings, only triggers
+            # left by SQLite with FTS5 are removed
+            self.fullTextSearch.update(False)
+        elif self.settings['fts_search'] and not self.fullTextSearch.active:
+            # Index was removed by SQLite without FTS5
+            result = QMessageBox.question(
+                self.parent(), self.tr("Full-text search"),
+                self.tr("Full-text search index is missing, quick search"
+                        " will be slower. Rebuild it now?"),
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if result == QMessageBox.Yes:
+                self.fullTextSearch.update(True)
+        self.duplicates = Duplicates(self.db)
+        self.__openReadPool()
+
         self.__speedup()
 
         return True
 
     def create(self, fileName):
-        self.fileName = None
+        self.close()
 
         if QtCore.QFileInfo(fileName).exists():
             QMessageBox.critical(self.parent(),
@@ -933,6 +1498,9 @@ class Collection(QtCore.QObject):
 
         self.createCoinsTable()
         self.createTagsTable()
+        IndexAdvisor.createCoreIndexes(self.db)
+        ChangeJournal.create(self.db)
+        Duplicates.create(self.db)
 
         self.fileName = fileName
 
@@ -940,22 +1508,27 @@ class Collection(QtCore.QObject):
 
         self.description = CollectionDescription(self)
 
+        self.imageCache = ImageCache(Settings()['image_cache_size'] * 1024 * 1024)
+        self.imageStorage = ImageStorage(self.db, self.imageCache)
+        self.indexAdvisor = IndexAdvisor(self.db)
+        self.fullTextSearch = FullTextSearch(self.db, self.fields)
+        self.duplicates = Duplicates(self.db)
+        self.backupCatalog = BackupCatalog(self.db)
+        self.backupCatalog.create(Settings()['backup'], self.getCollectionName())
+        self.__openReadPool()
+
         self.__speedup()
 
         return True
 
+    def __openReadPool(self):
+        if self.readPool:
+            self.readPool.close()
+        self.readPool = ReadPool(self.fileName)
+
     def __speedup(self):
-        settings = Settings()
-        if settings['speedup'] == 1:
-            sql = "PRAGMA synchronous=NORMAL"
-            QSqlQuery(sql, self.db)
-            sql = "PRAGMA journal_mode=MEMORY"
-            QSqlQuery(sql, self.db)
-        elif settings['speedup'] == 2:
-            sql = "PRAGMA synchronous=OFF"
-            QSqlQuery(sql, self.db)
-            sql = "PRAGMA journal_mode=MEMORY"
-            QSqlQuery(sql, self.db)
+        profile = StorageProfile.bySpeedup(Settings()['speedup'])
+        profile.apply(self.db, self.fileName)
 
     def createCoinsTable(self):
         sqlFields = []
@@ -966,13 +1539,9 @@ class Collection(QtCore.QObject):
                 sqlFields.append("%s %s" % (field.name, Type.toSql(field.type)))
 
         sql = "CREATE TABLE coins (" + ", ".join(sqlFields) + ")"
-        QSqlQuery(sql, self.db)
-
-        sql = "CREATE TABLE photos (id INTEGER PRIMARY KEY, title TEXT, image BLOB)"
-        QSqlQuery(sql, self.db)
+        SqlQuery(sql, self.db)
 
-        sql = "CREATE TABLE images (id INTEGER PRIMARY KEY, image BLOB)"
-        QSqlQuery(sql, self.db)
+        ImageStorage.createTables(self.db)
 
     def createTagsTable(self):
         sql = """CREATE TABLE tags (
@@ -980,17 +1549,20 @@ class Collection(QtCore.QObject):
                     tag TEXT,
                     parent_id INTEGER,
                     position INTEGER)"""
-        QSqlQuery(sql, self.db)
+        SqlQuery(sql, self.db)
 
         sql = """CREATE TABLE coins_tags (
                     coin_id INTEGER,
                     tag_id INTEGER)"""
-        QSqlQuery(sql, self.db)
+        SqlQuery(sql, self.db)
 
     def isReferenceAttached(self):
         return ('sections' in self.db.tables())
 
     def loadReference(self, fileName):
+        if self.reference:
+            self.reference.close()
+
         if self.isReferenceAttached():
             self.reference = Reference(self.fields, self.parent(), db=self.db)
         else:
@@ -1040,7 +1612,7 @@ class Collection(QtCore.QObject):
                 for i in range(rel.rowCount()):
                     data = rel.data(rel.index(i, rel.fieldIndex('value')))
                     parentId = rel.data(rel.index(i, rel.fieldIndex('id')))
-                    query = QSqlQuery(self.db)
+                    query = SqlQuery(self.db)
                     sql = "SELECT DISTINCT %s FROM coins WHERE %s<>'' AND %s IS NOT NULL AND %s=?" % (columnName, columnName, columnName, refSection.parent_name)
                     query.prepare(sql)
                     query.addBindValue(data)
@@ -1049,7 +1621,7 @@ class Collection(QtCore.QObject):
                     refSection.reload()
             else:
                 sql = "SELECT DISTINCT %s FROM coins WHERE %s<>'' AND %s IS NOT NULL" % (columnName, columnName, columnName)
-                query = QSqlQuery(sql, self.db)
+                query = SqlQuery(sql, self.db)
                 refSection.fillFromQuery(query)
                 refSection.reload()
 
@@ -1070,7 +1642,7 @@ class Collection(QtCore.QObject):
                 self.tr("Attaching reference"), None,
                 len(self.reference.sections), self.parent())
 
-            query = QSqlQuery(self.db)
+            query = SqlQuery(self.db)
             query.prepare("ATTACH ? AS ref")
             query.addBindValue(self.reference.fileName)
             res = query.exec_()
@@ -1090,7 +1662,7 @@ class Collection(QtCore.QObject):
                 progressDlg.step()
 
                 if res:
-                    query = QSqlQuery(self.db)
+                    query = SqlQuery(self.db)
                     query.prepare("INSERT INTO %s SELECT * FROM ref.%s" %
                                   (section.table_name, section.table_name))
                     res = query.exec_()
@@ -1106,7 +1678,7 @@ class Collection(QtCore.QObject):
                             self.tr("Can't attach reference:\n%s") %
                                     query.lastError().text())
 
-            QSqlQuery("DETACH ref", reference.db)
+            SqlQuery("DETACH ref", reference.db)
 
             self.reference.load()
 
@@ -1130,7 +1702,7 @@ class Collection(QtCore.QObject):
             if not reference.open(fileName, interactive=False):
                 return
 
-            query = QSqlQuery(reference.db)
+            query = SqlQuery(reference.db)
             query.prepare("ATTACH ? AS ref")
             query.addBindValue(self.fileName)
             res = query.exec_()
@@ -1148,7 +1720,7 @@ class Collection(QtCore.QObject):
                 progressDlg.step()
 
                 if res:
-                    query = QSqlQuery(reference.db)
+                    query = SqlQuery(reference.db)
                     query.prepare("INSERT INTO %s SELECT * FROM ref.%s" % (section.table_name, section.table_name))
                     res = query.exec_()
 
@@ -1170,17 +1742,17 @@ class Collection(QtCore.QObject):
             for table_name in self.db.tables():
                 if 'ref_' in table_name:
                     if res:
-                        query = QSqlQuery(self.db)
+                        query = SqlQuery(self.db)
                         query.prepare("DROP TABLE %s" % table_name)
                         res = query.exec_()
 
             if res:
-                query = QSqlQuery(self.db)
+                query = SqlQuery(self.db)
                 query.prepare("DROP TABLE sections")
                 res = query.exec_()
 
             if res:
-                query = QSqlQuery(self.db)
+                query = SqlQuery(self.db)
                 query.prepare("DROP TABLE ref")
                 res = query.exec_()
 
@@ -1194,7 +1766,7 @@ class Collection(QtCore.QObject):
                             self.tr("Can't clear attached reference:\n%s") %
                                     query.lastError().text())
 
-            QSqlQuery("DETACH ref", reference.db)
+            SqlQuery("DETACH ref", reference.db)
 
             self.reference.load()
 
@@ -1233,60 +1805,140 @@ class Collection(QtCore.QObject):
 
         return acts
 
-    @waitCursorDecorator
-    def __make_backup(self, backupFileName):
-        srcFile = QtCore.QFile(self.fileName)
-        return srcFile.copy(backupFileName)
+    def __make_backup(self, thread):
+        progressDlg = Gui.ProgressDialog(self.tr("Backup collection"),
+                                         self.tr("Cancel"), 0, self.parent())
+        progressDlg.canceled.connect(thread.requestInterruption)
+
+        def progress(copied, total):
+            progressDlg.setMaximum(total)
+            progressDlg.setValue(copied)
+        thread.progress.connect(progress)
 
-    def backup(self):
+        loop = QEventLoop()
+        thread.finished.connect(loop.quit)
+        thread.start()
+        loop.exec_()
+
+        progressDlg.reset()
+
+    def backup(self, background=False):
+        # Background backup doesn't block GUI and reports nothing
         backupDir = QtCore.QDir(Settings()['backup'])
         if not backupDir.exists():
             backupDir.mkpath(backupDir.absolutePath())
 
         backupFileName = backupDir.filePath("%s_%s.db" % (self.getCollectionName(), QtCore.QDateTime.currentDateTime().toString('yyMMddhhmmss')))
-        if not self.__make_backup(backupFileName):
+        thread = BackupThread(self.fileName, backupFileName)
+        if background:
+            fileName = self.fileName
+            thread.succeeded.connect(
+                lambda: self.__backupDone(fileName, backupFileName))
+            thread.start()
+
+            return True
+
+        self.__make_backup(thread)
+        if thread.canceled:
+            return False
+        if thread.error:
             QMessageBox.critical(self.parent(),
                             self.tr("Backup collection"),
                             self.tr("Can't make a collection backup at %s") %
                                                                 backupFileName)
             return False
 
+        self.backupCatalog.add(backupFileName, False)
+
         infoMessageBox("backup", self.tr("Backup"),
                        self.tr("Backup saved as %s") % backupFileName,
                        parent=self.parent())
 
         return True
 
+    def __backupDone(self, fileName, backupFileName):
+        # Backup is registered only when it is complete and collection is
+        # still opened
+        if fileName != self.fileName:
+            return
+
+        self.backupCatalog.add(backupFileName, True)
+
+        keep = Settings()['autobackup_keep']
+        if keep:
+            self.backupCatalog.prune(keep)
+
     def isNeedBackup(self):
-        settings = Settings()
-        autobackup_depth = settings['autobackup_depth']
-        filter_ = ('%s_????????????.db' % self.getCollectionName(),)
-        files = QtCore.QDirIterator(settings['backup'], filter_, QtCore.QDir.Files)
-        while files.hasNext():
-            file_info = files.nextFileInfo()
-
-            file_title = file_info.baseName()
-            file_date = file_title[-12:]
-
-            date_time = QtCore.QDateTime.fromString(file_date, 'yyMMddhhmmss')
-            if date_time.isValid():
-                if date_time.date().year() < 2000:
-                    date_time = date_time.addYears(100)
-                date_time = date_time.toUTC()
-
-                query = QSqlQuery(self.db)
-                query.prepare("SELECT count(*) FROM coins WHERE updatedat > ?")
-                query.addBindValue(date_time.toString(Qt.ISODate))
-                query.exec_()
-                query.first()
-                if query.record().value(0) < autobackup_depth:
-                    return False
+        createdat = self.backupCatalog.latest()
+        if createdat is None:
+            return True
 
-        return True
+        query = SqlQuery(self.db)
+        query.prepare("SELECT count(*) FROM coins WHERE updatedat > ?")
+        query.addBindValue(createdat)
+        query.exec_()
+        query.first()
+        return query.record().value(0) >= Settings()['autobackup_depth']
 
     @waitCursorDecorator
     def vacuum(self):
-        QSqlQuery("VACUUM", self.db)
+        SqlQuery("VACUUM", self.db)
+
+    def deduplicateImages(self):
+        progressDlg = Gui.ProgressDialog(
+            self.tr("Deduplicating images"), None,
+            self.imageStorage.unhashedCount(), self.parent())
+
+        self.db.transaction()
+        removed = self.imageStorage.deduplicate(progressDlg)
+        self.db.commit()
+
+        progressDlg.reset()
+
+        QMessageBox.information(
+            self.parent(), self.tr("Deduplicate images"),
+            self.tr("Removed %d duplicated or unused images") % removed)
+
+    def findDuplicates(self):
+        # Returns filter for showing similar coins or None
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        groups_count, coins_count = self.duplicates.count()
+        QApplication.restoreOverrideCursor()
+
+        if not groups_count:
+            QMessageBox.information(
+                self.parent(), self.tr("Find duplicates"),
+                self.tr("Similar coins not found"))
+            return None
+
+        result = QMessageBox.question(
+            self.parent(), self.tr("Find duplicates"),
+            self.tr("Found %d groups of similar coins (%d coins).\n"
+                    "Show them in current list?") % (groups_count, coins_count),
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if result == QMessageBox.Yes:
+            return self.duplicates.filter()
+
+        return None
+
+    def adviseIndexes(self):
+        suggestions = self.indexAdvisor.suggestions()
+        if not suggestions:
+            QMessageBox.information(
+                self.parent(), self.tr("Optimize indexes"),
+                self.tr("No additional indexes required"))
+            return
+
+        columns = '\n'.join(', '.join(columns) for columns in suggestions)
+        result = QMessageBox.question(
+            self.parent(), self.tr("Optimize indexes"),
+            self.tr("Frequently used columns:\n%s\n\n"
+                    "Create indexes for speedup tree, filters and statistics?") % columns,
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if result == QMessageBox.Yes:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            self.indexAdvisor.createIndexes(suggestions)
+            QApplication.restoreOverrideCursor()
 
     @staticmethod
     def fileNameToCollectionName(fileName):
@@ -1315,15 +1967,14 @@ class Collection(QtCore.QObject):
 
         mobile_settings = {'Version': 5, 'Type': 'Mobile', 'Filter': params['filter']}
 
-        QSqlQuery("PRAGMA synchronous=OFF", db)
-        QSqlQuery("PRAGMA journal_mode=MEMORY", db)
+        Profiles['bulk'].apply(db, params['file'])
 
         sql = """CREATE TABLE settings (
             title CHAR NOT NULL UNIQUE,
             value CHAR)"""
-        QSqlQuery(sql, db)
+        SqlQuery(sql, db)
         for key, value in mobile_settings.items():
-            query = QSqlQuery(db)
+            query = SqlQuery(db)
             query.prepare("""INSERT INTO settings (title, value)
                     VALUES (?, ?)""")
             query.addBindValue(key)
@@ -1333,12 +1984,12 @@ class Collection(QtCore.QObject):
         sql = """CREATE TABLE updates (
             title CHAR NOT NULL UNIQUE,
             value CHAR)"""
-        QSqlQuery(sql, db)
+        SqlQuery(sql, db)
 
         sql = """CREATE TABLE photos (
             id INTEGER PRIMARY KEY,
             image BLOB)"""
-        QSqlQuery(sql, db)
+        SqlQuery(sql, db)
 
         sqlFields = []
         fields = CollectionFieldsBase()
@@ -1353,16 +2004,16 @@ class Collection(QtCore.QObject):
                 sqlFields.append("%s %s" % (field.name, Type.toSql(field.type)))
 
         sql = "CREATE TABLE coins (" + ", ".join(sqlFields) + ")"
-        QSqlQuery(sql, db)
+        SqlQuery(sql, db)
 
         model = self.model()
-        while model.canFetchMore():
-            model.fetchMore()
 
-        dest_model = QSqlTableModel(self.parent(), db)
-        dest_model.setEditStrategy(QSqlTableModel.OnManualSubmit)
-        dest_model.setTable('coins')
-        dest_model.select()
+        # Records are written directly instead of caching them in a model
+        dest_fields = [field.name for field in fields
+                       if field.name != 'id' and field.name not in SKIPPED_FIELDS]
+        insert_query = SqlQuery(db)
+        insert_query.prepare("INSERT INTO coins (%s) VALUES (%s)" % (
+            ', '.join(dest_fields), ', '.join('?' * len(dest_fields))))
 
         height = 64
         if params['density'] == 'HDPI':
@@ -1378,21 +2029,23 @@ class Collection(QtCore.QObject):
         is_obverse_enabled = params['image'] in (ExportDialog.IMAGE_OBVERSE, ExportDialog.IMAGE_BOTH)
         is_reverse_enabled = params['image'] in (ExportDialog.IMAGE_REVERSE, ExportDialog.IMAGE_BOTH)
 
-        fields = CollectionFieldsBase()
-        count = model.rowCount()
+        count = model.filteredCount()
         progressDlg = Gui.ProgressDialog(self.tr("Exporting records"),
                                         self.tr("Cancel"), count, self.parent())
 
-        for i in range(count):
+        db.transaction()
+
+        coins = model.records()
+        for coin in coins:
             progressDlg.step()
             if progressDlg.wasCanceled():
                 break
 
-            coin = model.record(i)
             if coin.value('status') in ('pass', 'sold'):
                 continue
+            model.loadImages(coin, ('obverseimg', 'reverseimg'))
 
-            dest_record = dest_model.record()
+            dest_record = db.record('coins')
 
             for field in fields:
                 if field.name in ('id', 'image', 'obverseimg', 'reverseimg'):
@@ -1431,7 +2084,7 @@ class Collection(QtCore.QObject):
                         else:
                             save_data = coin.value('obverseimg')
 
-                    query = QSqlQuery(db)
+                    query = SqlQuery(db)
                     query.prepare("""INSERT INTO photos (image)
                             VALUES (?)""")
                     query.addBindValue(save_data)
@@ -1460,7 +2113,7 @@ class Collection(QtCore.QObject):
                         else:
                             save_data = coin.value('reverseimg')
 
-                    query = QSqlQuery(db)
+                    query = SqlQuery(db)
                     query.prepare("""INSERT INTO photos (image)
                             VALUES (?)""")
                     query.addBindValue(save_data)
@@ -1497,24 +2150,27 @@ class Collection(QtCore.QObject):
                 image.save(buffer, 'png')
                 dest_record.setValue('image', ba)
 
-            dest_model.insertRecord(-1, dest_record)
+            for field in dest_fields:
+                insert_query.addBindValue(dest_record.value(field))
+            insert_query.exec_()
+        coins.close()
 
         progressDlg.setLabelText(self.tr("Saving..."))
-        dest_model.submitAll()
+        db.commit()
 
         progressDlg.setLabelText(self.tr("Compact..."))
-        QSqlQuery("""UPDATE coins
+        SqlQuery("""UPDATE coins
             SET
               reverseimg = (select t2.id from coins t3 join (select id, image from photos group by image having count(*) > 1) t2 on t1.image = t2.image join photos t1 on t3.reverseimg = t1.id where t1.id <> t2.id and t3.id = coins.id)
             WHERE coins.id in (select t3.id from coins t3 join (select id, image from photos group by image having count(*) > 1) t2 on t1.image = t2.image join photos t1 on t3.reverseimg = t1.id where t1.id <> t2.id)
             """, db)
-        QSqlQuery("""UPDATE coins
+        SqlQuery("""UPDATE coins
             SET
               obverseimg = (select t2.id from coins t3 join (select id, image from photos group by image having count(*) > 1) t2 on t1.image = t2.image join photos t1 on t3.obverseimg = t1.id where t1.id <> t2.id and t3.id = coins.id)
             WHERE coins.id in (select t3.id from coins t3 join (select id, image from photos group by image having count(*) > 1) t2 on t1.image = t2.image join photos t1 on t3.obverseimg = t1.id where t1.id <> t2.id)
             """, db)
 
-        QSqlQuery("""DELETE FROM photos
+        SqlQuery("""DELETE FROM photos
             WHERE id NOT IN (SELECT id FROM photos GROUP BY image)""", db)
 
         db.close()
@@ -1524,9 +2180,8 @@ class Collection(QtCore.QObject):
         db = QSqlDatabase.addDatabase('QSQLITE', 'mobile')
         db.setDatabaseName(params['file'])
         db.open()
-        QSqlQuery("PRAGMA synchronous=OFF", db)
-        QSqlQuery("PRAGMA journal_mode=MEMORY", db)
-        QSqlQuery("VACUUM", db)
+        Profiles['bulk'].apply(db, params['file'])
+        SqlQuery("VACUUM", db)
         db.close()
         QSqlDatabase.removeDatabase('mobile')
 
@@ -1550,9 +2205,7 @@ class Collection(QtCore.QObject):
             sort_column_id = model.fields.sort_id.id
             model.sort(sort_column_id, Qt.AscendingOrder)
         
-            while model.canFetchMore():
-                model.fetchMore()
-            count = model.rowCount()
+            count = model.filteredCount()
 
             desc = self.getDescription()
             data = {'title': desc.title, 'description': desc.description,
@@ -1568,15 +2221,18 @@ class Collection(QtCore.QObject):
                                             self.tr("Cancel"), count, self.parent())
 
             fields = CollectionFieldsBase()
-            for i in range(count):
+            coins = model.records()
+            for i, coin in enumerate(coins):
                 progressDlg.step()
                 if progressDlg.wasCanceled():
                     break
                 
                 data = {}
-                coin = model.record(i)
                 for field in fields:
-                    val = coin.value(field.name)
+                    if field.type == Type.Image:
+                        val = coin.value(field.name + '_id')
+                    else:
+                        val = coin.value(field.name)
                     if val is None or val == '':
                         continue
         
@@ -1586,17 +2242,22 @@ class Collection(QtCore.QObject):
                         continue
         
                     if field.type == Type.Image:
-                        hash_ = QCryptographicHash.hash(val, QCryptographicHash.Sha1)
-                        if hash_ in img_file_dict:
-                            img_file_title = img_file_dict[hash_]
+                        # Photos are stored once per content, so id
+                        # identifies image
+                        if val in img_file_dict:
+                            img_file_title = img_file_dict[val]
                         else:
+                            image = model.getImage(val)
+                            if not image:
+                                continue
+
                             img_file_title = "%d_%s.jpg" % (i + 1, field.name)
                             img_file_name = os.path.join(image_path, img_file_title)
                             img_file = open(img_file_name, 'wb')
-                            img_file.write(val.data())
+                            img_file.write(image.data())
                             img_file.close()
                             
-                            img_file_dict[hash_] = img_file_title
+                            img_file_dict[val] = img_file_title
 
                         data[field.name] = img_file_title
                     else:
@@ -1605,6 +2266,7 @@ class Collection(QtCore.QObject):
                 json.dump(data, json_file, indent=2, sort_keys=True, ensure_ascii=False)
                 if i < count - 1:
                     json_file.write(',\n')
+            coins.close()
             
             json_file.write(']\n}')
             json_file.close()
@@ -1612,7 +2274,7 @@ class Collection(QtCore.QObject):
             progressDlg.reset()
 
     def merge(self, fileName):
-        query = QSqlQuery(self.db)
+        query = SqlQuery(self.db)
         query.prepare("ATTACH ? AS src")
         query.addBindValue(fileName)
         res = query.exec_()
@@ -1621,201 +2283,109 @@ class Collection(QtCore.QObject):
                                  self.tr("Synchronizing"),
                                  self.tr("Can't open collection:\n%s") %
                                  query.lastError().text())
-            return
+            return False
 
         sql = "SELECT value FROM src.settings WHERE title='Type'"
-        query = QSqlQuery(sql, self.db)
+        query = SqlQuery(sql, self.db)
         query.first()
         type_ = query.record().value(0)
         if type_ != version.AppName:
             QMessageBox.critical(self.parent(),
                     self.tr("Synchronizing"),
                     self.tr("Collection %s in wrong format") % fileName)
-            return
+            SqlQuery("DETACH src", self.db)
+            return False
 
         sql = "SELECT value FROM src.settings WHERE title='Version'"
-        query = QSqlQuery(sql, self.db)
+        query = SqlQuery(sql, self.db)
         query.first()
         ver = query.record().value(0)
         if int(ver) != CollectionSettings.Default['Version']:
             QMessageBox.critical(self.parent(),
                     self.tr("Synchronizing"),
                     self.tr("Collection %s in old format.\n(Try to open it before merging.)") % fileName)
-            return
+            SqlQuery("DETACH src", self.db)
+            return False
 
         sql = "SELECT value FROM src.settings WHERE title='Password'"
-        query = QSqlQuery(sql, self.db)
+        query = SqlQuery(sql, self.db)
         query.first()
         pas = query.record().value(0)
+        # Active statement on src prevents detaching
+        query.finish()
         if pas != cryptPassword():
             dialog = PasswordDialog(
                 pas, self.fileNameToCollectionName(fileName), self.parent())
             result = dialog.exec_()
             if result == QDialog.Rejected:
-                return
-
-        query = QSqlQuery("SELECT COUNT(*) FROM src.coins", self.db)
-        query.first()
-        count = query.record().value(0)
-
-        progressDlg = Gui.ProgressDialog(
-            self.tr("Synchronizing"), self.tr("Cancel"), count, self.parent())
-
-        fields_query = QSqlQuery("PRAGMA table_info(coins)", self.db)
-        fields_query.exec_()
-        fields = []
-        while fields_query.next():
-            fields.append(fields_query.record().value(1))
-        fields.remove('id')
-        sql_fields = ','.join(fields)
-
-        inserted_count = 0
-        updated_count = 0
-        query = QSqlQuery("SELECT DISTINCT createdat FROM src.coins", self.db)
-        while query.next():
-            progressDlg.step()
-            if progressDlg.wasCanceled():
-                break
-
-            self.db.transaction()
-
-            sql = "SELECT 1 FROM coins WHERE createdat=? LIMIT 1"
-            select_query = QSqlQuery(sql, self.db)
-            select_query.addBindValue(query.record().value(0))
-            select_query.exec_()
-            if select_query.first():
-                dst_fields = ImageFields + \
-                             ('id', 'image', 'sort_id')
-                sql_dst_fields = ','.join(['coins.%s AS coins_%s' % (f, f) for f in dst_fields])
-                sql_src_fields = ','.join(['src_coins.%s' % f for f in fields])
-                sql = "SELECT %s, %s FROM coins\
-                    INNER JOIN src.coins src_coins ON coins.id=src_coins.id\
-                    WHERE src_coins.createdat=? AND\
-                          src_coins.createdat=coins.createdat AND\
-                          src_coins.updatedat>coins.updatedat" % (sql_src_fields, sql_dst_fields)
-                sel_query = QSqlQuery(sql, self.db)
-                sel_query.addBindValue(query.record().value(0))
-                sel_query.exec_()
-                if sel_query.first():
-                    sql = "UPDATE coins SET %s WHERE id=?" % ','.join(['%s=?' % f for f in fields])
-                    up_query = QSqlQuery(sql, self.db)
-                    for field in fields:
-                        if field == 'image':
-                            img_id = sel_query.record().value(field)
-                            old_img_id = sel_query.record().value('coins_image')
-                            if img_id and old_img_id:
-                                sql = "UPDATE images SET image=(SELECT image FROM src.images WHERE id=?) WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(img_id)
-                                img_query.addBindValue(old_img_id)
-                                img_query.exec_()
-                            elif img_id:
-                                sql = "INSERT INTO images (image) SELECT image FROM src.images WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(img_id)
-                                img_query.exec_()
-                                img_id = img_query.lastInsertId()
-                            elif old_img_id:
-                                sql = "DELETE FROM images WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(old_img_id)
-                                img_query.exec_()
-                                img_id = None
-
-                            up_query.addBindValue(img_id)
-                        elif field in ImageFields:
-                            img_id = sel_query.record().value(field)
-                            old_img_id = sel_query.record().value('coins_%s' % field)
-                            if img_id and old_img_id:
-                                sql = "UPDATE photos SET title=(SELECT title FROM src.photos WHERE id=?), image=(SELECT image FROM src.photos WHERE id=?) WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(img_id)
-                                img_query.addBindValue(img_id)
-                                img_query.addBindValue(old_img_id)
-                                img_query.exec_()
-                                img_id = old_img_id
-                            elif img_id:
-                                sql = "INSERT INTO photos (title, image) SELECT title, image FROM src.photos WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(img_id)
-                                img_query.exec_()
-                                img_id = img_query.lastInsertId()
-                            elif old_img_id:
-                                sql = "DELETE FROM photos WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(old_img_id)
-                                img_query.exec_()
-                                img_id = None
-
-                            up_query.addBindValue(img_id)
-                        elif field == 'sort_id':
-                            up_query.addBindValue(sel_query.record().value('coins_sort_id'))
-                        else:
-                            up_query.addBindValue(sel_query.record().value(field))
-                    up_query.addBindValue(sel_query.record().value('coins_id'))
-
-                    up_query.exec_()
-                    updated_count += 1
-            else:
-                sql = "SELECT %s FROM src.coins WHERE createdat=?" % sql_fields
-                sel_query = QSqlQuery(sql, self.db)
-                sel_query.addBindValue(query.record().value(0))
-                sel_query.exec_()
-                while sel_query.next():
-                    sql = "INSERT INTO coins (%s) VALUES (%s)" % (sql_fields, ','.join(['?'] * len(fields)))
-                    ins_query = QSqlQuery(sql, self.db)
-                    for field in fields:
-                        if field == 'image':
-                            old_img_id = sel_query.record().value(field)
-                            if old_img_id:
-                                sql = "INSERT INTO images (image) SELECT image FROM src.images WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(old_img_id)
-                                img_query.exec_()
-
-                                img_id = img_query.lastInsertId()
-                            else:
-                                img_id = None
-                            ins_query.addBindValue(img_id)
-                        elif field in ImageFields:
-                            old_img_id = sel_query.record().value(field)
-                            if old_img_id:
-                                sql = "INSERT INTO photos (title, image) SELECT title, image FROM src.photos WHERE id=?"
-                                img_query = QSqlQuery(sql, self.db)
-                                img_query.addBindValue(old_img_id)
-                                img_query.exec_()
-
-                                img_id = img_query.lastInsertId()
-                            else:
-                                img_id = None
-                            ins_query.addBindValue(img_id)
-                        elif field == 'sort_id':
-                            sort_query = QSqlQuery("SELECT MAX(sort_id) FROM coins", self.db)
-                            sort_query.first()
-                            sort_id = sort_query.record().value(0)
-                            if not sort_id:
-                                sort_id = 0
-                            ins_query.addBindValue(sort_id + 1)
-                        else:
-                            ins_query.addBindValue(sel_query.record().value(field))
-
-                    ins_query.exec_()
-                    inserted_count += 1
-
-            self.db.commit()
-
-        query = QSqlQuery("DETACH src", self.db)
-        query.exec_()
+                SqlQuery("DETACH src", self.db)
+                return False
 
-        progressDlg.reset()
+        # Only changes made after previous synchronization are checked
+        # when src has change journal
+        peer = None
+        since = None
+        last_change = None
+        journal = ChangeJournal(self.db)
+        src_journal = ChangeJournal(self.db, 'src')
+        if journal.isAvailable() and src_journal.isAvailable():
+            peer = src_journal.uuid()
+            last_change = src_journal.lastChange()
+            watermark, fingerprint = journal.watermark(peer)
+            # Other copy of src file or src restored from backup has
+            # different change under the same id, all coins are checked
+            # in this case
+            if fingerprint is not None and \
+                    src_journal.fingerprint(watermark) == fingerprint:
+                since = watermark
+
+        merge = Merge(self.db, CollectionModel.SORT_ID_STEP, since)
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        inserted_count, updated_count, deleted_count = merge.prepare()
+        QApplication.restoreOverrideCursor()
+
+        changed = False
+        synchronized = False
+        if inserted_count or updated_count or deleted_count:
+            result = QMessageBox.question(
+                self.parent(), self.tr("Synchronizing"),
+                self.tr("Will be inserted %d coins, updated %d coins, "
+                        "deleted %d coins.\nContinue?") %
+                (inserted_count, updated_count, deleted_count),
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if result == QMessageBox.Yes:
+                progressDlg = Gui.ProgressDialog(
+                    self.tr("Synchronizing"), self.tr("Cancel"),
+                    len(merge.steps()), self.parent())
+                changed = merge.apply(progressDlg)
+                progressDlg.reset()
 
-        if inserted_count or updated_count:
-            text = self.tr("Inserted %d coins, updated %d coins.\nThe application will need to restart now.") % (inserted_count, updated_count)
-            QMessageBox.information(self.parent(), self.tr("Synchronizing"),
-                                    text)
-            # TODO: refresh
-            self.parent().restart()
+                if merge.error:
+                    QMessageBox.critical(
+                        self.parent(), self.tr("Synchronizing"),
+                        self.tr("Can't merge collections: %s") % merge.error)
+                elif changed:
+                    synchronized = True
+                    QMessageBox.information(
+                        self.parent(), self.tr("Synchronizing"),
+                        self.tr("Inserted %d coins, updated %d coins, "
+                                "deleted %d coins.") %
+                        (inserted_count, updated_count, deleted_count))
         else:
+            synchronized = True
             text = self.tr("Collections looks like identical")
             QMessageBox.information(self.parent(), self.tr("Synchronizing"),
                                     text)
+
+        if synchronized and peer:
+            journal.setWatermark(peer, last_change,
+                                 src_journal.fingerprint(last_change))
+
+        merge.cleanup()
+        SqlQuery("DETACH src", self.db)
+
+        if changed:
+            self.imageCache.clear()
+
+        return changed
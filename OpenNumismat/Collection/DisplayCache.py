@@ -0,0 +1,66 @@
+from collections import OrderedDict
+
+
+# LRU cache of formatted cell values limited by approximate size in bytes.
+# Keys are (row, column) pairs, so rows must be invalidated when changed.
+class DisplayCache():
+    ITEM_OVERHEAD = 100
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+
+        self._items = OrderedDict()
+        self._columns = {}  # row -> set of cached columns
+
+    def get(self, row, column):
+        key = (row, column)
+        try:
+            value, _size = self._items[key]
+        except KeyError:
+            return None
+
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, row, column, value):
+        size = self.ITEM_OVERHEAD
+        if isinstance(value, str):
+            size += len(value) * 2
+        if size > self.max_size:
+            return
+
+        key = (row, column)
+        self.__remove(key)
+
+        self._items[key] = (value, size)
+        self._columns.setdefault(row, set()).add(column)
+        self.size += size
+
+        while self.size > self.max_size:
+            key = next(iter(self._items))
+            self.__remove(key)
+
+    def removeRows(self, first, last):
+        for row in range(first, last + 1):
+            for column in list(self._columns.get(row, ())):
+                self.__remove((row, column))
+
+    def clear(self):
+        self._items.clear()
+        self._columns.clear()
+        self.size = 0
+
+    def count(self):
+        return len(self._items)
+
+    def __remove(self, key):
+        item = self._items.pop(key, None)
+        if item:
+            self.size -= item[1]
+
+            row, column = key
+            columns = self._columns[row]
+            columns.discard(column)
+            if not columns:
+                del self._columns[row]
@@ -0,0 +1,172 @@
+from collections import Counter
+
+from PySide6.QtCore import QCryptographicHash
+
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+# Fields compared when looking for similar coins
+SIGNATURE_FIELDS = ('title', 'value', 'unit', 'country', 'period', 'ruler',
+                    'year', 'mint', 'mintmark', 'type', 'series', 'subjectshort',
+                    'status', 'material', 'quality', 'paydate', 'payprice',
+                    'saller', 'payplace', 'saledate', 'saleprice', 'buyer',
+                    'saleplace', 'variety', 'obversevar', 'reversevar',
+                    'edgevar')
+# Equal numbers could have different text (1 and 1.0)
+NUMERIC_FIELDS = ('value', 'year', 'payprice', 'saleprice')
+
+
+# Index of coins by signature - hash of normalized fields compared when
+# looking for similar coins. Values are compared without case, extra
+# spaces and difference between NULL and empty text.
+# SQLite has no hash functions, so triggers on coins only reset signature
+# of changed coin and signatures are computed before searching. They are
+# created by updating collection to version 10, without them signatures
+# of all coins are computed on each search.
+class Duplicates():
+    TABLE = 'coins_signatures'
+
+    def __init__(self, db):
+        self.db = db
+
+        query = SqlQuery("SELECT 1 FROM sqlite_master WHERE name='%s'" %
+                         self.TABLE, db)
+        self.indexed = query.first()
+
+    @staticmethod
+    def normalize(field, value):
+        if value is None or value == '':
+            return ''
+
+        if field in NUMERIC_FIELDS:
+            try:
+                return repr(float(value))
+            except (TypeError, ValueError):
+                pass
+
+        return ' '.join(str(value).split()).lower()
+
+    @staticmethod
+    def signature(values):
+        # Values of SIGNATURE_FIELDS to 64-bit integer, so index keeps
+        # short keys
+        hash_ = QCryptographicHash(QCryptographicHash.Sha1)
+        for field, value in zip(SIGNATURE_FIELDS, values):
+            hash_.addData(Duplicates.normalize(field, value).encode('utf-8'))
+            hash_.addData(b'\x1f')
+        return int.from_bytes(hash_.result().data()[:8], 'big', signed=True)
+
+    @staticmethod
+    def create(db):
+        query = SqlQuery("SELECT 1 FROM sqlite_master WHERE name='%s'" %
+                         Duplicates.TABLE, db)
+        exists = query.first()
+
+        if not exists:
+            SqlQuery("CREATE TABLE %s (coin_id INTEGER PRIMARY KEY,"
+                     " signature INTEGER)" % Duplicates.TABLE, db)
+            SqlQuery("CREATE INDEX %s_signature ON %s (signature)" %
+                     (Duplicates.TABLE, Duplicates.TABLE), db)
+            SqlQuery("INSERT INTO %s (coin_id) SELECT id FROM coins" %
+                     Duplicates.TABLE, db)
+
+        reset_signature = "INSERT OR REPLACE INTO %s (coin_id, signature)"\
+                          " VALUES (new.id, NULL);" % Duplicates.TABLE
+        SqlQuery("CREATE TRIGGER IF NOT EXISTS coins_signatures_insert"
+                 " AFTER INSERT ON coins BEGIN %s END" % reset_signature, db)
+        SqlQuery("CREATE TRIGGER IF NOT EXISTS coins_signatures_update"
+                 " AFTER UPDATE OF %s ON coins BEGIN %s END" % (
+                     ', '.join(SIGNATURE_FIELDS), reset_signature), db)
+        SqlQuery("CREATE TRIGGER IF NOT EXISTS coins_signatures_delete"
+                 " AFTER DELETE ON coins BEGIN"
+                 " DELETE FROM %s WHERE coin_id=old.id; END" % Duplicates.TABLE, db)
+
+        Duplicates(db).refresh()
+
+    def refresh(self):
+        # Computes signatures of coins changed after previous search
+        query = SqlQuery("SELECT id, %s FROM coins WHERE id IN"
+                         " (SELECT coin_id FROM %s WHERE signature IS NULL)" % (
+                             ', '.join(SIGNATURE_FIELDS), self.TABLE), self.db)
+        signatures = []
+        while query.next():
+            record = query.record()
+            values = [record.value(field) for field in SIGNATURE_FIELDS]
+            signatures.append((self.signature(values), record.value('id')))
+        query.finish()
+
+        if not signatures:
+            return
+
+        in_transaction = self.db.transaction()
+
+        query = SqlQuery(self.db)
+        query.prepare("UPDATE %s SET signature=? WHERE coin_id=?" % self.TABLE)
+        for signature, coin_id in signatures:
+            query.addBindValue(signature)
+            query.addBindValue(coin_id)
+            query.exec_()
+
+        if in_transaction:
+            self.db.commit()
+
+    def __signatures(self):
+        # Signatures of all coins for collection without index
+        query = SqlQuery(self.db)
+        query.setForwardOnly(True)
+        query.exec_("SELECT id, %s FROM coins" % ', '.join(SIGNATURE_FIELDS))
+        while query.next():
+            record = query.record()
+            values = [record.value(field) for field in SIGNATURE_FIELDS]
+            yield record.value('id'), self.signature(values)
+
+    def isExist(self, record):
+        signature = self.signature(record.value(field) for field in SIGNATURE_FIELDS)
+        coin_id = record.value('id')
+
+        if not self.indexed:
+            for other_id, other_signature in self.__signatures():
+                if other_signature == signature and other_id != coin_id:
+                    return True
+            return False
+
+        self.refresh()
+
+        query = SqlQuery(self.db)
+        query.prepare("SELECT 1 FROM %s WHERE signature=? AND coin_id IS NOT ?"
+                      " LIMIT 1" % self.TABLE)
+        query.addBindValue(signature)
+        query.addBindValue(coin_id)
+        query.exec_()
+
+        return query.first()
+
+    def count(self):
+        # Returns count of groups of similar coins and total count of coins
+        # in them
+        if not self.indexed:
+            groups = Counter(signature for _coin_id, signature in self.__signatures())
+            counts = [count for count in groups.values() if count > 1]
+            return len(counts), sum(counts)
+
+        self.refresh()
+
+        query = SqlQuery("SELECT count(*), ifnull(sum(coins_count), 0) FROM"
+                         " (SELECT count(*) AS coins_count FROM %s"
+                         " GROUP BY signature HAVING count(*)>1)" % self.TABLE,
+                         self.db)
+        query.first()
+        return query.record().value(0), query.record().value(1)
+
+    def filter(self):
+        if not self.indexed:
+            signatures = list(self.__signatures())
+            groups = Counter(signature for _coin_id, signature in signatures)
+            ids = [str(coin_id) for coin_id, signature in signatures
+                   if groups[signature] > 1]
+            return "id IN (%s)" % ', '.join(ids)
+
+        self.refresh()
+
+        return "id IN (SELECT coin_id FROM {0} WHERE signature IN"\
+               " (SELECT signature FROM {0} GROUP BY signature"\
+               " HAVING count(*)>1))".format(self.TABLE)
@@ -0,0 +1,63 @@
+import itertools
+
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+
+# Compiles value lists of filters for CollectionModel. QSqlTableModel
+# accepts filter only as text, so short lists are inlined as literals and
+# long ones are stored with bound parameters into session temp tables and
+# referenced by subquery. This keeps filter text short and independent of
+# count of values.
+class FilterCompiler():
+    MAX_INLINE_VALUES = 50
+    TABLE_PREFIX = 'filter_values_'
+
+    _serial = itertools.count(1)
+
+    def __init__(self, db):
+        self.db = db
+
+        self._prefix = "%s%d_" % (self.TABLE_PREFIX, next(self._serial))
+        self._tables = {}  # table name -> stored values
+
+    @staticmethod
+    def literal(value):
+        if isinstance(value, (int, float)):
+            return str(value)
+        return "'%s'" % str(value).replace("'", "''")
+
+    @staticmethod
+    def literalsIn(column, values, negate=False):
+        operator = 'NOT IN' if negate else 'IN'
+        return "%s %s (%s)" % (column, operator,
+                               ','.join(FilterCompiler.literal(value) for value in values))
+
+    def inValues(self, key, column, values, negate=False):
+        values = tuple(values)
+        if len(values) <= self.MAX_INLINE_VALUES:
+            return self.literalsIn(column, values, negate)
+
+        table = self.__storeValues(key, values)
+        operator = 'NOT IN' if negate else 'IN'
+        return "%s %s (SELECT value FROM temp.%s)" % (column, operator, table)
+
+    def __storeValues(self, key, values):
+        table = self._prefix + key
+        if self._tables.get(table) == values:
+            return table
+
+        if table not in self._tables:
+            SqlQuery("CREATE TEMP TABLE IF NOT EXISTS %s (value)" % table, self.db)
+        SqlQuery("DELETE FROM temp.%s" % table, self.db)
+
+        self.db.transaction()
+        query = SqlQuery(self.db)
+        query.prepare("INSERT INTO temp.%s (value) VALUES (?)" % table)
+        for value in values:
+            query.addBindValue(value)
+            query.exec_()
+        self.db.commit()
+
+        self._tables[table] = values
+
+        return table
@@ -0,0 +1,118 @@
+from OpenNumismat.Collection.CollectionFields import FieldTypes as Type
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+from OpenNumismat.Tools.CursorDecorators import waitCursorDecorator
+
+SKIPPED_FIELDS = ('id', 'sort_id', 'createdat', 'updatedat')
+
+
+# Optional FTS5 index of coins for quick search. Index is an external
+# content table kept in sync by triggers on coins. With trigram tokenizer
+# MATCH finds substrings like LIKE does, otherwise prefixes of words.
+class FullTextSearch():
+    TABLE = 'coins_fts'
+    TRIGGERS = ('coins_fts_insert', 'coins_fts_delete', 'coins_fts_update')
+    MIN_TRIGRAM_LEN = 3
+
+    def __init__(self, db, fields):
+        self.db = db
+        self.fields = [field.name for field in fields.fields
+                       if field.type not in Type.ImageTypes
+                       and field.name not in SKIPPED_FIELDS]
+
+        self.supported = self.__check("fts5(value)")
+        self.trigram = self.supported and self.__check("fts5(value, tokenize='trigram')")
+        self.active = self.supported and self.__isCreated()
+        if self.active:
+            # Existing index could be created without trigram support
+            self.trigram = 'trigram' in self.__objects()[self.TABLE]
+
+    def __check(self, module):
+        query = SqlQuery(self.db)
+        if not query.exec_("CREATE VIRTUAL TABLE temp.fts_check USING " + module):
+            return False
+        SqlQuery("DROP TABLE temp.fts_check", self.db)
+        return True
+
+    def __objects(self):
+        query = SqlQuery("SELECT name, sql FROM sqlite_master"
+                         " WHERE name LIKE 'coins_fts%'", self.db)
+        objects = {}
+        while query.next():
+            record = query.record()
+            objects[record.value(0)] = str(record.value(1))
+        return objects
+
+    def __isCreated(self):
+        names = self.__objects()
+        return self.TABLE in names and all(name in names for name in self.TRIGGERS)
+
+    def update(self, enabled):
+        if enabled and self.supported:
+            if not self.active:
+                self.drop()
+                self.create()
+        elif self.__objects():
+            # Without FTS5 triggers would make coins table read only
+            for name in self.TRIGGERS:
+                SqlQuery("DROP TRIGGER IF EXISTS %s" % name, self.db)
+            if self.supported:
+                SqlQuery("DROP TABLE IF EXISTS %s" % self.TABLE, self.db)
+            self.active = False
+
+    @waitCursorDecorator
+    def create(self):
+        columns = ', '.join(self.fields)
+        new_values = ', '.join('new.' + field for field in self.fields)
+        old_values = ', '.join('old.' + field for field in self.fields)
+        self.trigram = self.__check("fts5(value, tokenize='trigram')")
+        tokenize = 'trigram' if self.trigram else 'unicode61'
+
+        self.db.transaction()
+
+        SqlQuery("CREATE VIRTUAL TABLE %s USING fts5(%s, content='coins',"
+                 " content_rowid='id', tokenize='%s')" % (self.TABLE, columns, tokenize),
+                 self.db)
+        SqlQuery("CREATE TRIGGER coins_fts_insert AFTER INSERT ON coins BEGIN"
+                 " INSERT INTO %s (rowid, %s) VALUES (new.id, %s); END" %
+                 (self.TABLE, columns, new_values), self.db)
+        SqlQuery("CREATE TRIGGER coins_fts_delete AFTER DELETE ON coins BEGIN"
+                 " INSERT INTO %s (%s, rowid, %s) VALUES ('delete', old.id, %s); END" %
+                 (self.TABLE, self.TABLE, columns, old_values), self.db)
+        SqlQuery("CREATE TRIGGER coins_fts_update AFTER UPDATE OF %s ON coins BEGIN"
+                 " INSERT INTO %s (%s, rowid, %s) VALUES ('delete', old.id, %s);"
+                 " INSERT INTO %s (rowid, %s) VALUES (new.id, %s); END" %
+                 (columns, self.TABLE, self.TABLE, columns, old_values,
+                   self.TABLE, columns, new_values), self.db)
+        SqlQuery("INSERT INTO %s (%s) VALUES ('rebuild')" % (self.TABLE, self.TABLE),
+                 self.db)
+
+        self.db.commit()
+
+        self.active = self.__isCreated()
+
+    def drop(self):
+        for name in self.TRIGGERS:
+            SqlQuery("DROP TRIGGER IF EXISTS %s" % name, self.db)
+        SqlQuery("DROP TABLE IF EXISTS %s" % self.TABLE, self.db)
+        self.active = False
+
+    def filter(self, text, fields):
+        # Returns None when search can't be done by index and LIKE
+        # should be used instead
+        if not self.active:
+            return None
+        if any(field not in self.fields for field in fields):
+            return None
+        if self.trigram:
+            if len(text) < self.MIN_TRIGRAM_LEN:
+                return None
+        elif not any(char.isalnum() for char in text):
+            return None
+
+        phrase = '"%s"' % text.replace('"', '""')
+        if not self.trigram:
+            phrase += '*'
+        match = "{%s} : %s" % (' '.join(fields), phrase)
+
+        return "id IN (SELECT rowid FROM %s WHERE %s MATCH '%s')" % (
+            self.TABLE, self.TABLE, match.replace("'", "''"))
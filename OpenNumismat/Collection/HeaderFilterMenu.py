@@ -1,10 +1,11 @@
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
-from PySide6.QtSql import QSqlQuery
 from PySide6.QtWidgets import *
 
 from OpenNumismat.Collection.CollectionFields import FieldTypes as Type
 from OpenNumismat.Collection.CollectionFields import Statuses
+from OpenNumismat.Collection.FilterCompiler import FilterCompiler
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
 from OpenNumismat.Tools.Gui import statusIcon
 from OpenNumismat.Tools.Converters import numberWithFraction, compareYears
 
@@ -86,14 +87,16 @@ class FilterMenuButton(QPushButton):
                     revert = True
                 appliedValues.append(filter_.value)
 
+        self.model.indexAdvisor.use((self.columnName,))
+
         hasBlanks = False
         columnType = self.model.columnType(self.fieldid)
         if self.model.columnName(self.fieldid) == 'year':
-            filtersSql = self.filtersToSql(filters.values())
+            filtersSql = self.filtersToSql(filters.values(), self.model.filterCompiler)
             if filtersSql:
                 filtersSql = 'WHERE ' + filtersSql
             sql = "SELECT DISTINCT %s FROM coins %s" % (self.columnName, filtersSql)
-            query = QSqlQuery(sql, self.db)
+            query = SqlQuery(sql, self.db)
 
             while query.next():
                 icon = None
@@ -135,20 +138,20 @@ class FilterMenuButton(QPushButton):
             dataFilter = BlankFilter(self.columnName).toSql()
             blanksFilter = DataFilter(self.columnName).toSql()
 
-            filtersSql = self.filtersToSql(filters.values())
+            filtersSql = self.filtersToSql(filters.values(), self.model.filterCompiler)
             sql = "SELECT 1 FROM coins WHERE " + filtersSql
             if filtersSql:
                 sql += ' AND '
 
             # Get blank row count
             blank_sql = sql + blanksFilter + " LIMIT 1"
-            query = QSqlQuery(blank_sql, self.db)
+            query = SqlQuery(blank_sql, self.db)
             if query.first():
                 hasBlanks = True
 
             # Get not blank row count
             not_blank_sql = sql + dataFilter + " LIMIT 1"
-            query = QSqlQuery(not_blank_sql, self.db)
+            query = SqlQuery(not_blank_sql, self.db)
             if query.first():
                 if columnType in Type.ImageTypes:
                     label = self.tr("(Images)")
@@ -164,12 +167,12 @@ class FilterMenuButton(QPushButton):
                     item.setCheckState(Qt.Unchecked)
                 self.listWidget.addItem(item)
         elif columnType == Type.Status:
-            filtersSql = self.filtersToSql(filters.values())
+            filtersSql = self.filtersToSql(filters.values(), self.model.filterCompiler)
             if filtersSql:
                 filtersSql = 'WHERE ' + filtersSql
             sql = "SELECT DISTINCT %s FROM coins %s" % (
                 self.columnName, filtersSql)
-            query = QSqlQuery(sql, self.db)
+            query = SqlQuery(sql, self.db)
 
             while query.next():
                 value = query.record().value(0)
@@ -195,11 +198,11 @@ class FilterMenuButton(QPushButton):
 
             self.listWidget.sortItems()
         elif columnType == Type.Denomination:
-            filtersSql = self.filtersToSql(filters.values())
+            filtersSql = self.filtersToSql(filters.values(), self.model.filterCompiler)
             if filtersSql:
                 filtersSql = 'WHERE ' + filtersSql
             sql = "SELECT DISTINCT %s FROM coins %s" % (self.columnName, filtersSql)
-            query = QSqlQuery(sql, self.db)
+            query = SqlQuery(sql, self.db)
 
             while query.next():
                 icon = None
@@ -232,11 +235,11 @@ class FilterMenuButton(QPushButton):
 
             self.listWidget.sortItems()
         else:
-            filtersSql = self.filtersToSql(filters.values())
+            filtersSql = self.filtersToSql(filters.values(), self.model.filterCompiler)
             if filtersSql:
                 filtersSql = 'WHERE ' + filtersSql
             sql = "SELECT DISTINCT %s FROM coins %s" % (self.columnName, filtersSql)
-            query = QSqlQuery(sql, self.db)
+            query = SqlQuery(sql, self.db)
 
             while query.next():
                 icon = None
@@ -399,7 +402,7 @@ class FilterMenuButton(QPushButton):
             if self.fieldid in self.filters.keys():
                 self.filters.pop(self.fieldid)
 
-        filtersSql = self.filtersToSql(self.filters.values())
+        filtersSql = self.filtersToSql(self.filters.values(), self.model.filterCompiler)
         self.model.setFilter(filtersSql)
 
         self.listParam.save_filters()
@@ -416,10 +419,10 @@ class FilterMenuButton(QPushButton):
                 item.setHidden(True)
 
     @staticmethod
-    def filtersToSql(filters):
+    def filtersToSql(filters, compiler=None):
         sqlFilters = []
         for columnFilters in filters:
-            sqlFilters.append(columnFilters.toSql())
+            sqlFilters.append(columnFilters.toSql(compiler))
 
         return ' AND '.join(sqlFilters)
 
@@ -511,19 +514,18 @@ class ColumnFilters:
     def hasRevert(self):
         return self._revert
 
-    def toSql(self):
-        values = []
-        for filter_ in self._valueFilters():
-            sql = "'%s'" % filter_.value.replace("'", "''")
-            values.append(sql)
+    def toSql(self, compiler=None):
+        values = [filter_.value for filter_ in self._valueFilters()]
 
         combinedFilters = ''
         if values:
-            sqlValueFilters = ','.join(values)
-            if self.hasRevert():
-                combinedFilters = "%s IN (%s)" % (self.name, sqlValueFilters)
+            negate = not self.hasRevert()
+            if compiler:
+                combinedFilters = compiler.inValues(self.name, self.name,
+                                                    values, negate)
             else:
-                combinedFilters = "%s NOT IN (%s)" % (self.name, sqlValueFilters)
+                combinedFilters = FilterCompiler.literalsIn(self.name, values,
+                                                            negate)
 
         if self.hasBlank():
             if combinedFilters:
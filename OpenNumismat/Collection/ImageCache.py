@@ -0,0 +1,67 @@
+from collections import OrderedDict
+
+
+# LRU cache of image blobs limited by total size in bytes.
+# Keys are (table, id) pairs, so ids from photos and images never collide.
+class ImageCache():
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._items = OrderedDict()
+
+    def get(self, table, img_id):
+        key = (table, img_id)
+        try:
+            value, _size = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, table, img_id, value, size):
+        if size > self.max_size:
+            return
+
+        key = (table, img_id)
+        self.remove(table, img_id)
+
+        self._items[key] = (value, size)
+        self.size += size
+
+        while self.size > self.max_size:
+            _key, (_value, old_size) = self._items.popitem(last=False)
+            self.size -= old_size
+
+    def remove(self, table, img_id):
+        item = self._items.pop((table, img_id), None)
+        if item:
+            self.size -= item[1]
+
+    def clear(self, table=None):
+        if table:
+            for key in [key for key in self._items if key[0] == table]:
+                self.remove(*key)
+        else:
+            self._items.clear()
+            self.size = 0
+
+    def count(self):
+        return len(self._items)
+
+    def hitRatio(self):
+        total = self.hits + self.misses
+        if total:
+            return self.hits / total
+
+        return 0.
+
+    def resetStatistics(self):
+        self.hits = 0
+        self.misses = 0
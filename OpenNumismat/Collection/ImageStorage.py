@@ -0,0 +1,208 @@
+from PySide6.QtCore import QCryptographicHash
+
+from OpenNumismat.Collection.CollectionFields import ImageFields
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+
+# Content-addressed storage for rows of photos and images tables.
+# Identical blobs are stored once and shared between coins, a row is
+# deleted when the last coin referencing it is removed or changed.
+class ImageStorage():
+
+    def __init__(self, db, cache=None):
+        self.db = db
+        self.cache = cache
+
+        self._queries = {}
+
+    @staticmethod
+    def createTables(db):
+        sql = """CREATE TABLE photos (
+            id INTEGER PRIMARY KEY,
+            title TEXT,
+            image BLOB,
+            hash TEXT,
+            refs INTEGER NOT NULL DEFAULT 1)"""
+        SqlQuery(sql, db)
+
+        sql = """CREATE TABLE images (
+            id INTEGER PRIMARY KEY,
+            image BLOB,
+            hash TEXT,
+            refs INTEGER NOT NULL DEFAULT 1)"""
+        SqlQuery(sql, db)
+
+        ImageStorage.createIndexes(db)
+
+    @staticmethod
+    def createIndexes(db):
+        sql = "CREATE UNIQUE INDEX IF NOT EXISTS photos_hash ON photos(hash)"
+        SqlQuery(sql, db)
+        sql = "CREATE UNIQUE INDEX IF NOT EXISTS images_hash ON images(hash)"
+        SqlQuery(sql, db)
+
+    @staticmethod
+    def photoHash(title, image):
+        hash_ = QCryptographicHash(QCryptographicHash.Sha1)
+        hash_.addData(image)
+        hash_.addData(b'\0')
+        if title:
+            hash_.addData(title.encode('utf-8'))
+        return hash_.result().toHex().data().decode()
+
+    @staticmethod
+    def imageHash(image):
+        hash_ = QCryptographicHash(QCryptographicHash.Sha1)
+        hash_.addData(image)
+        return hash_.result().toHex().data().decode()
+
+    def addPhoto(self, title, image):
+        return self.__add('photos', self.photoHash(title, image),
+                          ('title', 'image'), (title, image))
+
+    def addImage(self, image):
+        return self.__add('images', self.imageHash(image),
+                          ('image',), (image,))
+
+    def removePhoto(self, img_id):
+        self.__remove('photos', img_id)
+
+    def removeImage(self, img_id):
+        self.__remove('images', img_id)
+
+    def __query(self, sql):
+        # Statements are prepared once and reused for bulk operations
+        query = self._queries.get(sql)
+        if not query:
+            query = SqlQuery(self.db)
+            query.prepare(sql)
+            self._queries[sql] = query
+
+        return query
+
+    def __add(self, table, hash_, fields, values):
+        query = self.__query("SELECT id FROM %s WHERE hash=?" % table)
+        query.addBindValue(hash_)
+        query.exec_()
+        found = query.first()
+        if found:
+            img_id = query.record().value(0)
+        query.finish()
+
+        if found:
+            query = self.__query("UPDATE %s SET refs=refs+1 WHERE id=?" % table)
+            query.addBindValue(img_id)
+            query.exec_()
+
+            return img_id
+
+        query = self.__query("INSERT INTO %s (%s, hash, refs) VALUES (%s, ?, 1)" %
+                             (table, ', '.join(fields), ', '.join('?' * len(fields))))
+        for value in values:
+            query.addBindValue(value)
+        query.addBindValue(hash_)
+        query.exec_()
+
+        return query.lastInsertId()
+
+    def __remove(self, table, img_id):
+        query = self.__query("UPDATE %s SET refs=refs-1 WHERE id=?" % table)
+        query.addBindValue(img_id)
+        query.exec_()
+
+        query = self.__query("DELETE FROM %s WHERE id=? AND refs<=0" % table)
+        query.addBindValue(img_id)
+        query.exec_()
+
+        if self.cache and query.numRowsAffected() > 0:
+            self.cache.remove(table, img_id)
+
+    def deduplicate(self, progressDlg=None):
+        removed = self.__deduplicate('photos', ImageFields, progressDlg)
+        removed += self.__deduplicate('images', ('image',), progressDlg)
+
+        if self.cache:
+            self.cache.clear()
+
+        return removed
+
+    def unhashedCount(self):
+        query = SqlQuery("SELECT (SELECT count(*) FROM photos WHERE hash IS NULL) +"
+                         " (SELECT count(*) FROM images WHERE hash IS NULL)", self.db)
+        query.first()
+        return query.record().value(0)
+
+    def __deduplicate(self, table, fields, progressDlg):
+        hashes = {}
+        query = SqlQuery(self.db)
+        query.setForwardOnly(True)
+        query.exec_("SELECT id, hash FROM %s WHERE hash IS NOT NULL" % table)
+        while query.next():
+            hashes[query.record().value(1)] = query.record().value(0)
+
+        SqlQuery("CREATE TEMP TABLE image_map ("
+                 "old_id INTEGER PRIMARY KEY, new_id INTEGER)", self.db)
+
+        map_query = SqlQuery(self.db)
+        map_query.prepare("INSERT INTO image_map (old_id, new_id) VALUES (?, ?)")
+        hash_query = SqlQuery(self.db)
+        hash_query.prepare("UPDATE %s SET hash=? WHERE id=?" % table)
+
+        if table == 'photos':
+            sql = "SELECT id, image, title FROM photos WHERE hash IS NULL"
+        else:
+            sql = "SELECT id, image FROM images WHERE hash IS NULL"
+        query = SqlQuery(self.db)
+        query.setForwardOnly(True)
+        query.exec_(sql)
+        while query.next():
+            if progressDlg:
+                progressDlg.step()
+
+            record = query.record()
+            img_id = record.value('id')
+            image = record.value('image')
+            if not image:
+                image = b''
+            if table == 'photos':
+                hash_ = self.photoHash(record.value('title'), image)
+            else:
+                hash_ = self.imageHash(image)
+
+            if hash_ in hashes:
+                map_query.addBindValue(img_id)
+                map_query.addBindValue(hashes[hash_])
+                map_query.exec_()
+            else:
+                hashes[hash_] = img_id
+                hash_query.addBindValue(hash_)
+                hash_query.addBindValue(img_id)
+                hash_query.exec_()
+
+        for field in fields:
+            sql = "UPDATE coins SET %s=(SELECT new_id FROM image_map WHERE old_id=coins.%s)\
+                WHERE %s IN (SELECT old_id FROM image_map)" % (field, field, field)
+            SqlQuery(sql, self.db)
+
+        query = SqlQuery("DELETE FROM %s WHERE id IN (SELECT old_id FROM image_map)" % table,
+                         self.db)
+        removed = query.numRowsAffected()
+
+        SqlQuery("DROP TABLE image_map", self.db)
+
+        # Recount references and drop rows not used by any coin
+        refs_sql = ' UNION ALL '.join(
+            "SELECT %s AS id FROM coins WHERE %s IS NOT NULL" % (field, field)
+            for field in fields)
+        SqlQuery("CREATE TEMP TABLE image_refs AS " + refs_sql, self.db)
+        SqlQuery("CREATE INDEX temp.image_refs_id ON image_refs(id)", self.db)
+
+        sql = "UPDATE %s SET refs=(SELECT count(*) FROM image_refs\
+            WHERE image_refs.id=%s.id)" % (table, table)
+        SqlQuery(sql, self.db)
+        query = SqlQuery("DELETE FROM %s WHERE refs=0" % table, self.db)
+        removed += query.numRowsAffected()
+
+        SqlQuery("DROP TABLE image_refs", self.db)
+
+        return removed
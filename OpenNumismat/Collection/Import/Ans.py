@@ -1,16 +1,13 @@
+import importlib.util
 import re
 import urllib.request
 from urllib.parse import quote_plus
 from socket import timeout
 
-ansAvailable = True
-
-try:
-    import lxml.etree
-    import lxml.html
-except ImportError:
+# lxml is imported on first request
+ansAvailable = importlib.util.find_spec('lxml') is not None
+if not ansAvailable:
     print('lxml module missed. Importing from ANS not available')
-    ansAvailable = False
 
 from PySide6.QtCore import Qt, QObject
 from PySide6.QtGui import QImage, QPixmap, QIcon
@@ -111,6 +108,8 @@ class AnsConnector(QObject):
 
     def getCount(self, images, department=None, country=None, year=None, dynasty=None,
                  ruler=None, denomination=None, material=None, type_=None):
+        import lxml.etree
+
         query = self._makeQuery(images, department, country, year, dynasty,
                  ruler, denomination, material, type_)
         action = "apis/search?q=" + query + "&format=rss"
@@ -126,6 +125,8 @@ class AnsConnector(QObject):
         return int(count[0].text)
     
     def getTranslation(self, src, lang):
+        import lxml.etree
+
         url = "https://nomisma.org/apis/getLabel?uri=" + src + "&lang=" + lang
         raw_data = self.download_data(url)
         if raw_data:
@@ -145,6 +146,8 @@ class AnsConnector(QObject):
     
     def getIds(self, images, department=None, country=None, year=None, dynasty=None,
                ruler=None, denomination=None, material=None, type_=None):
+        import lxml.etree
+
         query = self._makeQuery(images, department, country, year, dynasty,
                  ruler, denomination, material, type_)
 
@@ -179,6 +182,8 @@ class AnsConnector(QObject):
     
     def getItems(self, target, images, department=None, country=None, year=None, dynasty=None,
                  ruler=None, denomination=None, material=None, type_=None):
+        import lxml.html
+
         query = self._makeQuery(images, department, country, year, dynasty,
                  ruler, denomination, material, type_)
         action = "get_facet_options?q=" + query + "&category=" + target + "&mincount=1&pipeline=results&lang=" + self.lang
@@ -455,6 +460,8 @@ class AnsDialog(QDialog):
         return False
 
     def makeItem(self, item_id, record):
+        import lxml.etree
+
         data = self.connector.getData(item_id)
         tree = lxml.etree.fromstring(data.encode('utf-8'))
 
@@ -685,6 +692,8 @@ class AnsDialog(QDialog):
                 self.label.hide()
 
     def preview(self):
+        import lxml.etree
+
         self.table.show()
 
         department = self.departmentSelector.currentData()
@@ -5,6 +5,8 @@ from PySide6.QtCore import QObject, QByteArray
 from PySide6.QtSql import QSqlDatabase, QSqlQuery
 from PySide6.QtWidgets import QMessageBox
 
+from OpenNumismat.Collection.StorageProfile import Profiles
+
 
 class Cache(QObject):
     FILE_NAME = "opennumismat-cache.sqlite3"
@@ -22,8 +24,7 @@ class Cache(QObject):
             QMessageBox.warning(self.parent(), self.tr("Import"), self.tr("Can't open cache"))
             return None
 
-        QSqlQuery("PRAGMA synchronous=OFF", db)
-        QSqlQuery("PRAGMA journal_mode=OFF", db)
+        Profiles['temporary'].apply(db, self._file_name())
 
         if 'cache' not in db.tables():
             sql = "CREATE TABLE cache (\
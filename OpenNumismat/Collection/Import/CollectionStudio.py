@@ -1,14 +1,12 @@
 # -*- coding: utf-8 -*-
 
 import base64
+import importlib.util
 
-available = True
-
-try:
-    import lxml.etree
-except ImportError:
+# lxml is imported when file is read
+available = importlib.util.find_spec('lxml') is not None
+if not available:
     print('lxml module missed. Importing from CollectionStudio not available')
-    available = False
 
 from PySide6 import QtCore, QtGui
 
@@ -97,6 +95,8 @@ class ImportCollectionStudio(_Import):
         return src
 
     def _getRows(self, srcFile):
+        import lxml.etree
+
         with open(srcFile, 'rb') as f:
             xml = f.read().replace(b'&', b'&amp;')
         tree = lxml.etree.fromstring(xml)
@@ -1,5 +1,4 @@
 import datetime
-import openpyxl
 import os
 import urllib.request
 
@@ -120,6 +119,8 @@ class ImportExcel(_Import2):
         return 'owned'
 
     def _connect(self, src):
+        import openpyxl
+
         try:
             book = openpyxl.load_workbook(src)
         except openpyxl.utils.exceptions.InvalidFileException as e:
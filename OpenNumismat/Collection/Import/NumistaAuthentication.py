@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from PySide6.QtCore import Qt, QUrl, QMargins
+from PySide6.QtGui import QDesktopServices
+from PySide6.QtWidgets import *
+from PySide6.QtWebEngineCore import QWebEnginePage
+from PySide6.QtWebEngineWidgets import QWebEngineView as QWebView
+
+from OpenNumismat.Settings import Settings
+from OpenNumismat.Tools.DialogDecorators import storeDlgSizeDecorator
+
+
+class WebEnginePage(QWebEnginePage):
+
+    def acceptNavigationRequest(self, url, type_, isMainFrame):
+        if type_ == QWebEnginePage.NavigationTypeLinkClicked:
+            executor = QDesktopServices()
+            executor.openUrl(QUrl(url))
+            return False
+        return super().acceptNavigationRequest(url, type_, isMainFrame)
+
+
+@storeDlgSizeDecorator
+class NumistaAuthentication(QDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent,
+                         Qt.WindowCloseButtonHint | Qt.WindowSystemMenuHint)
+
+        if Settings()['locale'] in ('fr', 'es'):
+            self.language = Settings()['locale']
+        else:
+            self.language = 'en'
+
+        self.page = QWebView(self)
+        self.page.setPage(WebEnginePage(self))
+        self.page.urlChanged.connect(self.onUrlChanged)
+
+        redirect_uri = 'local'  # Should normally be a URL to your application
+        url_template = ('https://{language}.numista.com/api/oauth_authorize.php'
+                        '?response_type=code'
+                        '&client_id={client_id}'
+                        '&redirect_uri={redirect_uri}'
+                        '&scope={scope}')
+        authorization_url = url_template.format(
+          language=self.language,
+          client_id='opennumismat',
+          redirect_uri=redirect_uri,
+          scope='view_collection')
+        self.page.load(QUrl(authorization_url))
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.page)
+        layout.setContentsMargins(QMargins())
+        self.setLayout(layout)
+
+        self.setWindowTitle(self.tr("Numista"))
+
+    def onLinkClicked(self, url):
+        executor = QDesktopServices()
+        executor.openUrl(QUrl(url))
+
+    def onUrlChanged(self, url):
+        url = self.page.url().toString()
+        code_marker = 'api/local?code='
+        if code_marker in url:
+            start = url.find(code_marker) + len(code_marker)
+            end = url.find('&', start)
+            self.authorization_code = url[start:end]
+            self.accept()
+        elif 'api/local?state' in url:
+            self.close()
+
+    def onSslErrors(self, reply, errors):
+        reply.ignoreSslErrors()
@@ -10,6 +10,7 @@
 #
 #############################################
 
+import importlib.util
 import os
 import shutil
 import tempfile
@@ -22,13 +23,10 @@ from OpenNumismat.Collection.Import import _Import
 from OpenNumismat.Tools.Converters import stringToMoney
 
 
-available = True
-
-try:
-    import lxml.etree
-except ImportError:
+# lxml is imported when file is read
+available = importlib.util.find_spec('lxml') is not None
+if not available:
     print('lxml module missed. Importing from Tellico not available')
-    available = False
 
 NAMESPACES = {'t': 'http://periapsis.org/tellico/'}
 
@@ -125,6 +123,8 @@ class ImportTellico(_Import):
         shutil.rmtree(unzippedDir, True)
 
     def _getRows(self, unzippedDir):
+        import lxml.etree
+
         tree = lxml.etree.parse(os.path.join(unzippedDir, 'tellico.xml'))
         rows = tree.xpath("/t:tellico/t:collection/t:entry", namespaces=NAMESPACES)
         return rows
@@ -50,14 +50,7 @@ class _Import(QtCore.QObject):
                 self.progressDlg.setMaximum(len(rows))
                 self.progressDlg.setLabelText(QApplication.translate('_Import', "Importing from %s") % src)
 
-                for progress, row in enumerate(rows):
-                    self.progressDlg.setValue(progress)
-                    if self.progressDlg.wasCanceled():
-                        break
-
-                    record = model.record()
-                    self._setRecord(record, row)
-                    model.appendRecord(record)
+                model.appendRecords(self.__records(rows, model))
 
                 self.progressDlg.reset()
             else:
@@ -74,6 +67,16 @@ class _Import(QtCore.QObject):
 
         return False
 
+    def __records(self, rows, model):
+        for progress, row in enumerate(rows):
+            self.progressDlg.setValue(progress)
+            if self.progressDlg.wasCanceled():
+                break
+
+            record = model.record()
+            self._setRecord(record, row)
+            yield record
+
     def _connect(self, src):
         raise NotImplementedError
 
@@ -140,14 +143,7 @@ class _Import2(QtCore.QObject):
                 progressDlg.setMaximum(rows_count)
                 progressDlg.setLabelText(QApplication.translate('_Import2', "Importing from %s") % src)
 
-                for row in range(rows_count):
-                    progressDlg.setValue(row)
-                    if progressDlg.wasCanceled():
-                        break
-
-                    record = model.record()
-                    self._setRecord(record, row)
-                    model.appendRecord(record)
+                model.appendRecords(self.__records(rows_count, model, progressDlg))
 
                 progressDlg.reset()
             else:
@@ -160,6 +156,16 @@ class _Import2(QtCore.QObject):
         except _DatabaseServerError as error:
             self.__serverErrorMessage(error.__str__())
 
+    def __records(self, rows_count, model, progressDlg):
+        for row in range(rows_count):
+            progressDlg.setValue(row)
+            if progressDlg.wasCanceled():
+                break
+
+            record = model.record()
+            self._setRecord(record, row)
+            yield record
+
     def _connect(self, src):
         raise NotImplementedError
 
@@ -0,0 +1,75 @@
+from PySide6.QtSql import QSqlQuery
+
+
+# Indexes for columns used by core operations: tags of coin, merging
+# (createdat), checking for backup (updatedat) and manual sorting
+CoreIndexes = (
+    ('coins_tags_coin_id', 'coins_tags', ('coin_id',)),
+    ('coins_tags_tag_id', 'coins_tags', ('tag_id',)),
+    ('coins_createdat', 'coins', ('createdat',)),
+    ('coins_updatedat', 'coins', ('updatedat',)),
+    ('coins_sort_id', 'coins', ('sort_id',)),
+)
+
+
+# Collects columns of coins table queried by tree, filter menus and
+# statistics and suggests indexes for frequently used ones
+class IndexAdvisor():
+    MIN_USAGE = 3
+    INDEX_PREFIX = 'coins_advised_'
+
+    def __init__(self, db):
+        self.db = db
+        self.usage = {}
+
+    @staticmethod
+    def createCoreIndexes(db):
+        for name, table, columns in CoreIndexes:
+            sql = "CREATE INDEX IF NOT EXISTS %s ON %s(%s)" % (
+                name, table, ','.join(columns))
+            QSqlQuery(sql, db)
+
+    def use(self, columns):
+        columns = tuple(columns)
+        self.usage[columns] = self.usage.get(columns, 0) + 1
+
+    def indexes(self):
+        indexes = []
+
+        query = QSqlQuery("PRAGMA index_list(coins)", self.db)
+        names = []
+        while query.next():
+            names.append(query.record().value('name'))
+
+        for name in names:
+            query = QSqlQuery("PRAGMA index_info(%s)" % name, self.db)
+            columns = []
+            while query.next():
+                columns.append(query.record().value('name'))
+            indexes.append(tuple(columns))
+
+        return indexes
+
+    def suggestions(self):
+        indexes = self.indexes()
+
+        suggestions = []
+        for columns, count in sorted(self.usage.items(),
+                                     key=lambda item: item[1], reverse=True):
+            if count < self.MIN_USAGE:
+                continue
+            # Index with the same leading columns is already usable
+            if any(index[:len(columns)] == columns for index in indexes):
+                continue
+            if any(suggestion[:len(columns)] == columns for suggestion in suggestions):
+                continue
+
+            suggestions.append(columns)
+
+        return suggestions
+
+    def createIndexes(self, suggestions):
+        for columns in suggestions:
+            sql = "CREATE INDEX IF NOT EXISTS %s%s ON coins(%s)" % (
+                self.INDEX_PREFIX, '_'.join(columns), ','.join(columns))
+            QSqlQuery(sql, self.db)
@@ -0,0 +1,233 @@
+from OpenNumismat.Collection.CollectionFields import ImageFields
+from OpenNumismat.Collection.ImageStorage import ImageStorage
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+
+# Merges coins of collection attached as src. Coins absent in current
+# collection (by createdat) are inserted, coins changed later in src are
+# updated. Work is done by set-based statements over temp tables:
+# merge_inserts, merge_updates and merge_deletes select coins,
+# merge_photos and merge_images map ids of src images to ids in current
+# collection.
+# With since (id of last seen change in journal of src) only coins changed
+# after it are checked and coins deleted in src are deleted too.
+class Merge():
+    TEMP_TABLES = ('merge_inserts', 'merge_updates', 'merge_deletes',
+                   'merge_photos', 'merge_images')
+
+    def __init__(self, db, sort_id_step, since=None):
+        self.db = db
+        self.sort_id_step = sort_id_step
+        self.since = since
+
+        query = SqlQuery("PRAGMA table_info(coins)", self.db)
+        self.fields = []
+        while query.next():
+            self.fields.append(query.record().value(1))
+        self.fields.remove('id')
+
+        self.error = None
+
+    def prepare(self):
+        # Dry run: select coins for inserting, updating and deleting
+        self.cleanup()
+
+        changed = ''
+        if self.since is not None:
+            changed = " AND src_coins.id IN (SELECT row_id FROM src.changes"\
+                      " WHERE id>%d AND op<>'D')" % self.since
+
+        SqlQuery("CREATE TEMP TABLE merge_updates ("
+                 "dst_id INTEGER PRIMARY KEY, src_id INTEGER)", self.db)
+        SqlQuery("INSERT INTO merge_updates (dst_id, src_id)"
+                 " SELECT coins.id, src_coins.id FROM coins"
+                 " INNER JOIN src.coins src_coins ON coins.id=src_coins.id"
+                 " WHERE src_coins.createdat=coins.createdat AND"
+                 " src_coins.updatedat>coins.updatedat" + changed, self.db)
+
+        SqlQuery("CREATE TEMP TABLE merge_inserts ("
+                 "src_id INTEGER PRIMARY KEY, sort_id INTEGER)", self.db)
+        sql = "INSERT INTO merge_inserts (src_id, sort_id)"\
+              " SELECT id, (SELECT ifnull(MAX(sort_id), 0) FROM coins) +"\
+              " ROW_NUMBER() OVER (ORDER BY sort_id, id) * %d"\
+              " FROM src.coins src_coins WHERE createdat IS NOT NULL AND"\
+              " NOT EXISTS (SELECT 1 FROM coins WHERE coins.createdat=src_coins.createdat)"\
+              % self.sort_id_step
+        SqlQuery(sql + changed, self.db)
+
+        SqlQuery("CREATE TEMP TABLE merge_deletes (dst_id INTEGER PRIMARY KEY)", self.db)
+        if self.since is not None:
+            # Coin changed here after deleting in src is kept
+            sql = "INSERT OR IGNORE INTO merge_deletes (dst_id)"\
+                  " SELECT coins.id FROM src.changes"\
+                  " INNER JOIN coins ON coins.createdat=changes.key"\
+                  " WHERE changes.id>%d AND changes.op='D' AND"\
+                  " coins.updatedat<=changes.changedat AND"\
+                  " NOT EXISTS (SELECT 1 FROM src.coins WHERE createdat=changes.key)"\
+                  % self.since
+            SqlQuery(sql, self.db)
+
+        return (self.__count('merge_inserts'), self.__count('merge_updates'),
+                self.__count('merge_deletes'))
+
+    def steps(self):
+        return (
+            lambda: self.__mapImages('photos', 'merge_photos', ImageFields),
+            lambda: self.__mapImages('images', 'merge_images', ('image',)),
+            self.__releaseUpdated,
+            self.__updateCoins,
+            self.__insertCoins,
+            self.__deleteCoins,
+        )
+
+    def apply(self, progressDlg=None):
+        # Returns False when canceled or failed (error is stored), all
+        # changes are rolled back in this case
+        self.error = None
+        self.db.transaction()
+
+        for step in self.steps():
+            if progressDlg:
+                progressDlg.step()
+                if progressDlg.wasCanceled():
+                    self.db.rollback()
+                    return False
+
+            step()
+            if self.error:
+                self.db.rollback()
+                return False
+
+        return self.db.commit()
+
+    def cleanup(self):
+        for table in self.TEMP_TABLES:
+            SqlQuery("DROP TABLE IF EXISTS temp.%s" % table, self.db)
+
+    def __exec(self, sql):
+        query = SqlQuery(self.db)
+        if not query.exec_(sql) and not self.error:
+            self.error = query.lastError().databaseText()
+
+    def __count(self, table):
+        query = SqlQuery("SELECT count(*) FROM temp.%s" % table, self.db)
+        query.first()
+        return query.record().value(0)
+
+    def __mergedCoinsSql(self):
+        return "SELECT src_id FROM temp.merge_inserts UNION ALL"\
+               " SELECT src_id FROM temp.merge_updates"
+
+    def __mapImages(self, table, map_table, fields):
+        self.__exec("CREATE TEMP TABLE %s (src_id INTEGER PRIMARY KEY,"
+                    " dst_id INTEGER, hash TEXT, refs INTEGER)" % map_table)
+
+        # Count references from merged coins to each src image
+        refs_sql = ' UNION ALL '.join(
+            "SELECT %s AS id FROM src.coins WHERE %s IS NOT NULL AND id IN (%s)" %
+            (field, field, self.__mergedCoinsSql()) for field in fields)
+        self.__exec("INSERT INTO %s (src_id, refs) SELECT id, count(*) FROM (%s)"
+                    " GROUP BY id" % (map_table, refs_sql))
+        self.__exec("UPDATE {0} SET hash=(SELECT hash FROM src.{1} WHERE"
+                    " src.{1}.id={0}.src_id)".format(map_table, table))
+
+        self.__hashImages(table, map_table)
+
+        # Reuse images with the same content
+        self.__exec("UPDATE {0} SET dst_id=(SELECT id FROM {1}"
+                    " WHERE {1}.hash={0}.hash)".format(map_table, table))
+        self.__exec("UPDATE {1} SET refs=refs+(SELECT sum(refs) FROM {0}"
+                    " WHERE {0}.dst_id={1}.id) WHERE id IN (SELECT dst_id FROM {0})"
+                    .format(map_table, table))
+
+        if table == 'photos':
+            columns = 'title, image'
+        else:
+            columns = 'image'
+        src_columns = ', '.join('src_images.' + column for column in columns.split(', '))
+        self.__exec("INSERT INTO {1} ({2}, hash, refs)"
+                    " SELECT {3}, {0}.hash, sum({0}.refs) FROM {0}"
+                    " INNER JOIN src.{1} src_images ON src_images.id={0}.src_id"
+                    " WHERE {0}.dst_id IS NULL AND {0}.hash IS NOT NULL"
+                    " GROUP BY {0}.hash".format(map_table, table, columns, src_columns))
+        self.__exec("UPDATE {0} SET dst_id=(SELECT id FROM {1}"
+                    " WHERE {1}.hash={0}.hash) WHERE dst_id IS NULL"
+                    .format(map_table, table))
+
+    def __hashImages(self, table, map_table):
+        # Images of collections created before hashing have no hash
+        if table == 'photos':
+            sql = "SELECT {0}.src_id, title, image FROM {0}"
+        else:
+            sql = "SELECT {0}.src_id, image FROM {0}"
+        sql += " INNER JOIN src.{1} ON src.{1}.id={0}.src_id WHERE {0}.hash IS NULL"
+        query = SqlQuery(self.db)
+        query.setForwardOnly(True)
+        query.exec_(sql.format(map_table, table))
+
+        hashes = []
+        while query.next():
+            record = query.record()
+            image = record.value('image')
+            if not image:
+                image = b''
+            if table == 'photos':
+                hash_ = ImageStorage.photoHash(record.value('title'), image)
+            else:
+                hash_ = ImageStorage.imageHash(image)
+            hashes.append((hash_, record.value('src_id')))
+        query.finish()
+
+        update_query = SqlQuery(self.db)
+        update_query.prepare("UPDATE %s SET hash=? WHERE src_id=?" % map_table)
+        for hash_, src_id in hashes:
+            update_query.addBindValue(hash_)
+            update_query.addBindValue(src_id)
+            update_query.exec_()
+
+    def __releaseImages(self, coins_table):
+        for table, fields in (('photos', ImageFields), ('images', ('image',))):
+            for field in fields:
+                self.__exec("UPDATE %s SET refs=refs-(SELECT count(*) FROM coins"
+                            " WHERE coins.%s=%s.id AND coins.id IN"
+                            " (SELECT dst_id FROM temp.%s))"
+                            " WHERE id IN (SELECT %s FROM coins WHERE id IN"
+                            " (SELECT dst_id FROM temp.%s))" %
+                            (table, field, table, coins_table, field, coins_table))
+
+        self.__exec("DELETE FROM photos WHERE refs<=0")
+        self.__exec("DELETE FROM images WHERE refs<=0")
+
+    def __releaseUpdated(self):
+        # Images of updated coins are replaced by images from src
+        self.__releaseImages('merge_updates')
+
+    def __srcValue(self, field):
+        if field == 'image':
+            return "(SELECT dst_id FROM temp.merge_images WHERE src_id=src_coins.image)"
+        elif field in ImageFields:
+            return "(SELECT dst_id FROM temp.merge_photos WHERE src_id=src_coins.%s)" % field
+        else:
+            return "src_coins.%s" % field
+
+    def __updateCoins(self):
+        # Position of updated coin is kept
+        values = ', '.join("%s=%s" % (field, self.__srcValue(field))
+                           for field in self.fields if field != 'sort_id')
+        self.__exec("UPDATE coins SET %s FROM src.coins src_coins"
+                    " INNER JOIN temp.merge_updates ON merge_updates.src_id=src_coins.id"
+                    " WHERE coins.id=merge_updates.dst_id" % values)
+
+    def __insertCoins(self):
+        values = ', '.join("merge_inserts.sort_id" if field == 'sort_id'
+                           else self.__srcValue(field) for field in self.fields)
+        self.__exec("INSERT INTO coins (%s) SELECT %s FROM src.coins src_coins"
+                    " INNER JOIN temp.merge_inserts ON merge_inserts.src_id=src_coins.id"
+                    " ORDER BY merge_inserts.sort_id" %
+                    (', '.join(self.fields), values))
+
+    def __deleteCoins(self):
+        self.__releaseImages('merge_deletes')
+        self.__exec("DELETE FROM coins_tags WHERE coin_id IN"
+                    " (SELECT dst_id FROM temp.merge_deletes)")
+        self.__exec("DELETE FROM coins WHERE id IN (SELECT dst_id FROM temp.merge_deletes)")
@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from PySide6.QtCore import QDateTime, Qt
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+
+class QueryStats():
+    def __init__(self, site, template):
+        self.site = site
+        self.template = template
+        self.calls = 0
+        self.binds = 0
+        self.rows = 0
+        self.exec_time = 0.
+        self.fetch_time = 0.
+        self.max_time = 0.
+
+    def totalTime(self):
+        return self.exec_time + self.fetch_time
+
+    def toDict(self):
+        return {
+            'site': self.site,
+            'template': self.template,
+            'calls': self.calls,
+            'binds': self.binds,
+            'rows': self.rows,
+            'exec_time': self.exec_time,
+            'fetch_time': self.fetch_time,
+            'max_time': self.max_time,
+        }
+
+
+# Collects times of SQL statements grouped by call site and statement
+# template. Statements executed longer than SLOW_QUERY_TIME are logged
+# with their query plan. Disabled by default - then SqlQuery() gives plain
+# QSqlQuery without any overhead.
+class QueryProfiler():
+    SLOW_QUERY_TIME = 0.1  # seconds
+    MAX_SLOW_QUERIES = 100
+
+    enabled = False
+    stats = {}  # (site, template) -> QueryStats
+    slowQueries = []
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def setEnabled(enabled):
+        QueryProfiler.enabled = enabled
+
+    @staticmethod
+    def reset():
+        with QueryProfiler._lock:
+            QueryProfiler.stats = {}
+            QueryProfiler.slowQueries = []
+
+    @staticmethod
+    def template(sql):
+        # Literals are replaced with placeholders, so statements built by
+        # formatting values into them are grouped together
+        sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+        sql = re.sub(r"\b\d+(?:\.\d+)?\b", '?', sql)
+        sql = re.sub(r"\(\?(?:\s*,\s*\?)+\)", '(?, ...)', sql)
+        return ' '.join(sql.split())
+
+    @staticmethod
+    def entry(site, sql):
+        template = QueryProfiler.template(sql)
+        key = (site, template)
+        with QueryProfiler._lock:
+            stats = QueryProfiler.stats.get(key)
+            if not stats:
+                stats = QueryStats(site, template)
+                QueryProfiler.stats[key] = stats
+
+        return stats
+
+    @staticmethod
+    def addSlowQuery(site, sql, values, elapsed, db):
+        plan = []
+        query = QSqlQuery(db)
+        if query.prepare("EXPLAIN QUERY PLAN " + sql):
+            for value in values:
+                query.addBindValue(value)
+            if query.exec_():
+                while query.next():
+                    plan.append(query.record().value('detail'))
+
+        slow_query = {
+            'site': site,
+            'sql': sql,
+            'binds': [str(value) for value in values],
+            'time': elapsed,
+            'plan': plan,
+            'executedat': QDateTime.currentDateTimeUtc().toString(Qt.ISODateWithMs),
+        }
+        with QueryProfiler._lock:
+            QueryProfiler.slowQueries.append(slow_query)
+            del QueryProfiler.slowQueries[:-QueryProfiler.MAX_SLOW_QUERIES]
+
+    @staticmethod
+    def report():
+        # Counters are copied under lock, threads of ReadPool could update them
+        with QueryProfiler._lock:
+            stats = sorted(QueryProfiler.stats.values(),
+                           key=lambda item: item.totalTime(), reverse=True)
+            statements = [item.toDict() for item in stats]
+            slow_queries = list(QueryProfiler.slowQueries)
+
+        return {
+            'slow_query_time': QueryProfiler.SLOW_QUERY_TIME,
+            'statements': statements,
+            'slow_queries': slow_queries,
+        }
+
+    @staticmethod
+    def save(fileName):
+        with open(fileName, 'w', encoding='utf-8') as file:
+            json.dump(QueryProfiler.report(), file, indent=2, ensure_ascii=False)
+
+
+class ProfiledQuery(QSqlQuery):
+    def __init__(self, *args, site=''):
+        sql = None
+        db = None
+        for arg in args:
+            if isinstance(arg, str):
+                sql = arg
+            else:
+                db = arg
+        if db is None:
+            db = QSqlDatabase.database()
+
+        super().__init__(db)
+
+        self._db = db
+        self._site = site
+        self._stats = None
+        self._fetched = 0
+
+        if sql:
+            self.exec_(sql)
+
+    def exec_(self, sql=None):
+        if sql is None:
+            values = self.boundValues()
+            start = time.perf_counter()
+            res = super().exec_()
+        else:
+            values = []
+            start = time.perf_counter()
+            res = super().exec_(sql)
+        elapsed = time.perf_counter() - start
+
+        sql = self.lastQuery()
+        self._stats = QueryProfiler.entry(self._site, sql)
+        self._fetched = 0
+        # The same statement could be executed by threads of ReadPool
+        with QueryProfiler._lock:
+            self._stats.calls += 1
+            self._stats.binds += len(values)
+            self._stats.exec_time += elapsed
+            self._stats.max_time = max(self._stats.max_time, elapsed)
+
+        if res and elapsed >= QueryProfiler.SLOW_QUERY_TIME:
+            QueryProfiler.addSlowQuery(self._site, sql, values, elapsed, self._db)
+
+        return res
+
+    exec = exec_
+
+    def __fetched(self, res, start):
+        if self._stats:
+            elapsed = time.perf_counter() - start
+            rows = 0
+            if res:
+                # Row could be visited again by first() or seek()
+                pos = self.at() + 1
+                if pos > self._fetched:
+                    rows = pos - self._fetched
+                    self._fetched = pos
+
+            with QueryProfiler._lock:
+                self._stats.fetch_time += elapsed
+                self._stats.rows += rows
+
+        return res
+
+    def next(self):
+        start = time.perf_counter()
+        return self.__fetched(super().next(), start)
+
+    def first(self):
+        start = time.perf_counter()
+        return self.__fetched(super().first(), start)
+
+    def last(self):
+        start = time.perf_counter()
+        return self.__fetched(super().last(), start)
+
+    def seek(self, index, relative=False):
+        start = time.perf_counter()
+        return self.__fetched(super().seek(index, relative), start)
+
+
+def SqlQuery(*args):
+    # Drop-in replacement of QSqlQuery constructor
+    if QueryProfiler.enabled:
+        frame = sys._getframe(1)
+        site = "%s:%d %s" % (os.path.basename(frame.f_code.co_filename),
+                             frame.f_lineno, frame.f_code.co_name)
+        return ProfiledQuery(*args, site=site)
+
+    return QSqlQuery(*args)
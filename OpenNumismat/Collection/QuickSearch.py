@@ -0,0 +1,90 @@
+import itertools
+
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+
+
+# Keeps ids of coins found by quick search in a session temp table. When
+# new text extends the previous one only already found coins are checked,
+# so typing narrows result instead of rescanning whole coins table.
+# Result is recalculated from scratch after any change of coins. Changes
+# are counted by temp triggers, so writes to temp tables (like values of
+# filters) aren't taken as changes.
+class QuickSearch():
+    COUNTER_TABLE = 'quick_search_changes'
+
+    _serial = itertools.count(1)
+
+    def __init__(self, db):
+        self.db = db
+        self.table = 'quick_search_%d' % next(self._serial)
+
+        self._text = None
+        self._fields = None
+        self._filter = None
+        self._changes = None
+
+    def isActive(self):
+        return self._text is not None
+
+    def search(self, text, fields, filter_):
+        fields = tuple(fields)
+        narrow = (self.isActive() and fields == self._fields and
+                  text.startswith(self._text) and not self.__isChanged())
+
+        if not self.isActive():
+            SqlQuery("CREATE TEMP TABLE IF NOT EXISTS %s (id INTEGER PRIMARY KEY)" %
+                     self.table, self.db)
+            self.__createCounter()
+
+        if narrow:
+            sql = "DELETE FROM temp.{0} WHERE id NOT IN (SELECT id FROM coins"\
+                  " WHERE id IN (SELECT id FROM temp.{0}) AND {1})".format(
+                      self.table, filter_)
+            SqlQuery(sql, self.db)
+        else:
+            self.__fill(filter_)
+
+        self._text = text
+        self._fields = fields
+        self._filter = filter_
+        self._changes = self.__changes()
+
+        return "id IN (SELECT id FROM temp.%s)" % self.table
+
+    def update(self):
+        # Coins could be changed after searching
+        if self.isActive() and self.__isChanged():
+            self.__fill(self._filter)
+            self._changes = self.__changes()
+
+    def reset(self):
+        if self.isActive():
+            SqlQuery("DELETE FROM temp.%s" % self.table, self.db)
+        self._text = None
+        self._fields = None
+        self._filter = None
+
+    def __fill(self, filter_):
+        SqlQuery("DELETE FROM temp.%s" % self.table, self.db)
+        SqlQuery("INSERT INTO temp.%s SELECT id FROM coins WHERE %s" %
+                 (self.table, filter_), self.db)
+
+    def __createCounter(self):
+        # Shared by all quick searches of connection
+        SqlQuery("CREATE TEMP TABLE IF NOT EXISTS %s (changes INTEGER)" %
+                 self.COUNTER_TABLE, self.db)
+        SqlQuery("INSERT INTO temp.{0} (changes) SELECT 0"
+                 " WHERE NOT EXISTS (SELECT 1 FROM temp.{0})".format(self.COUNTER_TABLE),
+                 self.db)
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            SqlQuery("CREATE TEMP TRIGGER IF NOT EXISTS {0}_{1} AFTER {2} ON main.coins"
+                     " BEGIN UPDATE temp.{0} SET changes=changes+1; END".format(
+                         self.COUNTER_TABLE, event.lower(), event), self.db)
+
+    def __changes(self):
+        query = SqlQuery("SELECT changes FROM temp.%s" % self.COUNTER_TABLE, self.db)
+        query.first()
+        return query.record().value(0)
+
+    def __isChanged(self):
+        return self.__changes() != self._changes
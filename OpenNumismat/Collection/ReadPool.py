@@ -0,0 +1,267 @@
+import itertools
+import threading
+
+from PySide6.QtCore import QObject, QThread
+from PySide6.QtCore import Signal as pyqtSignal
+from PySide6.QtSql import QSqlDatabase
+
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+from OpenNumismat.Collection.StorageProfile import StorageProfile
+
+
+# Read-only connections to collection for running queries off GUI thread.
+# A connection can be used and removed only by thread created it, so pool
+# has own threads, each opens own connection on first query and removes it
+# before finishing. With WAL journal they aren't blocked by GUI connection
+# writing to collection.
+class ReadPool():
+    MAX_THREADS = 2
+    CONNECTION_PREFIX = 'readonly_'
+
+    _serial = itertools.count(1)
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+
+        self._prefix = "%s%d_" % (self.CONNECTION_PREFIX, next(self._serial))
+        self._tasks = []  # queued tasks
+        self._running = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._threads = []  # started on first task
+
+    def start(self, task):
+        with self._condition:
+            if self._closed:
+                return
+
+            self._tasks.append(task)
+            self._condition.notify()
+
+        if not self._threads:
+            for _ in range(self.MAX_THREADS):
+                thread = _PoolThread(self)
+                thread.start()
+                self._threads.append(thread)
+
+    def cancel(self, task):
+        # Returns True when task was taken before running
+        with self._condition:
+            if task in self._tasks:
+                self._tasks.remove(task)
+                return True
+
+        return False
+
+    def take(self):
+        # Waits for next task, returns None when pool is closed
+        with self._condition:
+            while not self._tasks and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            self._running += 1
+            return self._tasks.pop(0)
+
+    def taskDone(self):
+        with self._condition:
+            self._running -= 1
+            self._condition.notify_all()
+
+    def waitForDone(self):
+        with self._condition:
+            while self._tasks or self._running:
+                self._condition.wait()
+
+    def __connectionName(self):
+        return self._prefix + str(threading.get_ident())
+
+    def connection(self):
+        # Must be called from thread of pool
+        name = self.__connectionName()
+        if QSqlDatabase.contains(name):
+            return QSqlDatabase.database(name)
+
+        db = QSqlDatabase.addDatabase('QSQLITE', name)
+        db.setDatabaseName(self.fileName)
+        db.setConnectOptions('QSQLITE_OPEN_READONLY')
+        if not db.open():
+            return None
+
+        StorageProfile.applyReadOnly(db, self.fileName)
+
+        return db
+
+    def removeConnection(self):
+        # Must be called from thread of pool
+        name = self.__connectionName()
+        if QSqlDatabase.contains(name):
+            QSqlDatabase.database(name, False).close()
+            QSqlDatabase.removeDatabase(name)
+
+    def close(self):
+        # Running tasks are finished, queued ones are dropped
+        with self._condition:
+            self._closed = True
+            self._tasks.clear()
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.wait()
+        self._threads = []
+
+
+class _PoolThread(QThread):
+    def __init__(self, pool):
+        super().__init__()
+
+        self.pool = pool
+
+    def run(self):
+        while True:
+            task = self.pool.take()
+            if task is None:
+                break
+            try:
+                task.run()
+            finally:
+                self.pool.taskDone()
+
+        self.pool.removeConnection()
+
+
+class _TaskSignals(QObject):
+    rowsFetched = pyqtSignal(int, object)
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(int, str)
+    done = pyqtSignal(int)  # emitted even for stale task
+
+
+class _QueryTask():
+    def __init__(self, executor, generation, sql):
+        self.executor = executor
+        self.generation = generation
+        self.sql = sql
+        self.signals = executor._signals
+
+    def isStale(self):
+        return self.executor.generation != self.generation
+
+    def run(self):
+        try:
+            self.__run()
+        finally:
+            self.signals.done.emit(self.generation)
+
+    def __run(self):
+        if self.isStale():
+            return
+
+        db = self.executor.pool.connection()
+        if not db:
+            self.signals.failed.emit(self.generation, "Can't open collection")
+            return
+
+        query = SqlQuery(db)
+        query.setForwardOnly(True)
+        if not query.exec_(self.sql):
+            self.signals.failed.emit(self.generation, query.lastError().text())
+            return
+
+        rows = []
+        while query.next():
+            record = query.record()
+            rows.append([record.value(i) for i in range(record.count())])
+            if len(rows) >= self.executor.CHUNK_SIZE:
+                if self.isStale():
+                    query.finish()
+                    return
+                self.signals.rowsFetched.emit(self.generation, rows)
+                rows = []
+        query.finish()
+
+        if rows:
+            self.signals.rowsFetched.emit(self.generation, rows)
+        self.signals.finished.emit(self.generation)
+
+
+# Runs queries in ReadPool and passes their rows to GUI thread. Each
+# execute() makes results of previous query stale - they are dropped even
+# if it was already done.
+class QueryExecutor(QObject):
+    CHUNK_SIZE = 256
+
+    rowsFetched = pyqtSignal(object)  # list of rows, each is list of values
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, pool, parent=None):
+        super().__init__(parent)
+
+        self.pool = pool
+        self.generation = 0
+
+        self._tasks = {}  # generation -> task, kept until task is done
+        self._rows = []
+        self._callback = None
+
+        self._signals = _TaskSignals()
+        self._signals.rowsFetched.connect(self.__rowsFetched)
+        self._signals.finished.connect(self.__finished)
+        self._signals.failed.connect(self.__failed)
+        self._signals.done.connect(self.__done)
+
+    @staticmethod
+    def isSupported(sql):
+        # Temp tables are visible only for connection created them
+        return 'temp.' not in sql
+
+    def execute(self, sql, callback=None):
+        # Callback gets all rows when query is done
+        self.cancel()
+
+        self._rows = []
+        self._callback = callback
+        task = _QueryTask(self, self.generation, sql)
+        self._tasks[self.generation] = task
+        self.pool.start(task)
+
+        return self.generation
+
+    def cancel(self):
+        task = self._tasks.get(self.generation)
+        if task and self.pool.cancel(task):
+            del self._tasks[self.generation]
+        self.generation += 1
+
+    def __done(self, generation):
+        self._tasks.pop(generation, None)
+
+    def __rowsFetched(self, generation, rows):
+        if generation != self.generation:
+            return
+
+        self._rows.extend(rows)
+        self.rowsFetched.emit(rows)
+
+    def __finished(self, generation):
+        if generation != self.generation:
+            return
+
+        rows = self._rows
+        self._rows = []
+        callback = self._callback
+        self._callback = None
+
+        self.finished.emit()
+        if callback:
+            callback(rows)
+
+    def __failed(self, generation, error):
+        if generation != self.generation:
+            return
+
+        self._rows = []
+        self._callback = None
+
+        self.failed.emit(error)
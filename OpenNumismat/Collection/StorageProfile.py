@@ -0,0 +1,125 @@
+import os
+
+from PySide6.QtCore import QStorageInfo
+from PySide6.QtSql import QSqlQuery
+
+MB = 1024 * 1024
+
+
+# Storage settings of SQLite database applied after opening it. With WAL
+# journal reading connections aren't blocked by writing one. WAL needs
+# writable local file, otherwise fallback journal is used. Sizes of page
+# cache and memory map grow with size of database file.
+class StorageProfile():
+    BUSY_TIMEOUT = 5000  # ms
+    # Shared memory of WAL doesn't work over network
+    NETWORK_FILE_SYSTEMS = ('nfs', 'nfs4', 'cifs', 'smb', 'smb2', 'smb3', 'smbfs',
+                            'afpfs', 'webdav', 'davfs', 'fuse.sshfs', '9p')
+
+    # Max file size, page cache size (KiB) and memory map size
+    SIZES = (
+        (64 * MB, 8 * 1024, 64 * MB),
+        (1024 * MB, 32 * 1024, 256 * MB),
+        (None, 64 * 1024, 1024 * MB),
+    )
+
+    def __init__(self, name, journal_mode, synchronous, fallback_journal_mode=None):
+        self.name = name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.fallback_journal_mode = fallback_journal_mode or journal_mode
+
+    @staticmethod
+    def bySpeedup(speedup):
+        # Profiles for 'speedup' setting
+        return Profiles[('reliable', 'fast', 'extra_fast')[speedup]]
+
+    @classmethod
+    def __sizes(cls, fileName):
+        file_size = 0
+        if fileName and os.path.isfile(fileName):
+            file_size = os.path.getsize(fileName)
+        for max_size, cache_size, mmap_size in cls.SIZES:
+            if max_size is None or file_size <= max_size:
+                break
+
+        return cache_size, mmap_size
+
+    def apply(self, db, fileName=None):
+        cache_size, mmap_size = self.__sizes(fileName)
+
+        self.__setJournalMode(db, fileName)
+
+        pragmas = (
+            ('busy_timeout', self.BUSY_TIMEOUT),
+            ('synchronous', self.synchronous),
+            ('cache_size', -cache_size),
+            ('mmap_size', mmap_size),
+            ('temp_store', 'MEMORY'),
+        )
+        for name, value in pragmas:
+            QSqlQuery("PRAGMA %s=%s" % (name, value), db)
+
+    @classmethod
+    def applyReadOnly(cls, db, fileName):
+        # Journal mode and synchronous are set by writing connection
+        cache_size, mmap_size = cls.__sizes(fileName)
+
+        pragmas = (
+            ('cache_size', -cache_size),
+            ('mmap_size', mmap_size),
+            ('temp_store', 'MEMORY'),
+        )
+        for name, value in pragmas:
+            QSqlQuery("PRAGMA %s=%s" % (name, value), db)
+
+    def __setJournalMode(self, db, fileName):
+        journal_mode = self.journal_mode
+        if journal_mode == 'WAL' and not self.isWalSupported(fileName):
+            journal_mode = self.fallback_journal_mode
+
+        # Pragma returns mode in effect, it is unchanged when new one
+        # can't be set
+        query = QSqlQuery("PRAGMA journal_mode=%s" % journal_mode, db)
+        if query.first() and query.record().value(0).upper() != journal_mode:
+            if journal_mode != self.fallback_journal_mode:
+                QSqlQuery("PRAGMA journal_mode=%s" % self.fallback_journal_mode, db)
+
+    @classmethod
+    def isWalSupported(cls, fileName):
+        if not fileName:
+            return False
+        if fileName.startswith(('//', '\\\\')):
+            return False
+
+        storage = QStorageInfo(os.path.dirname(os.path.abspath(fileName)))
+        if not storage.isValid() or storage.isReadOnly():
+            return False
+        if not os.access(fileName, os.W_OK):
+            return False
+        file_system = bytes(storage.fileSystemType()).decode().lower()
+        return file_system not in cls.NETWORK_FILE_SYSTEMS
+
+    @staticmethod
+    def close(db):
+        # Data from WAL is moved to database file and file is switched back
+        # to rollback journal, so it could be copied alone or opened from
+        # read-only media. Journal mode stays WAL when other connections
+        # are still open.
+        query = QSqlQuery("PRAGMA journal_mode", db)
+        if query.first() and query.record().value(0).upper() == 'WAL':
+            query.finish()
+            QSqlQuery("PRAGMA wal_checkpoint(TRUNCATE)", db)
+            QSqlQuery("PRAGMA journal_mode=DELETE", db)
+
+
+Profiles = {
+    'reliable': StorageProfile('reliable', 'DELETE', 'FULL'),
+    # Crash with in-memory journal could corrupt database, so file journal
+    # is used without WAL
+    'fast': StorageProfile('fast', 'WAL', 'NORMAL', 'TRUNCATE'),
+    'extra_fast': StorageProfile('extra_fast', 'WAL', 'OFF', 'TRUNCATE'),
+    # Files filled from scratch, on failure they are created again
+    'bulk': StorageProfile('bulk', 'MEMORY', 'OFF'),
+    'temporary': StorageProfile('temporary', 'OFF', 'OFF'),
+}
@@ -3,8 +3,14 @@ from PySide6.QtWidgets import QApplication
 from PySide6.QtSql import QSqlQuery
 from PySide6.QtCore import QSettings
 
+from OpenNumismat.Collection.Backup import BackupCatalog
+from OpenNumismat.Collection.ChangeJournal import ChangeJournal
 from OpenNumismat.Collection.CollectionFields import FieldTypes as Type
+from OpenNumismat.Collection.Duplicates import Duplicates
+from OpenNumismat.Collection.ImageStorage import ImageStorage
+from OpenNumismat.Collection.IndexAdvisor import IndexAdvisor
 from OpenNumismat.Tools import Gui
+from OpenNumismat.Settings import Settings
 
 
 class Updater(QtCore.QObject):
@@ -46,6 +52,9 @@ class Updater(QtCore.QObject):
             if self.currentVersion < 9:
                 updater = UpdaterTo9(self.collection)
                 updater.update()
+            if self.currentVersion < 10:
+                updater = UpdaterTo10(self.collection)
+                updater.update()
 
             self.__finalize()
 
@@ -616,6 +625,55 @@ class UpdaterTo9(_Updater):
         self._finish()
 
 
+class UpdaterTo10(_Updater):
+
+    def __init__(self, collection):
+        super().__init__(collection)
+        self.progressDlg.setMinimumDuration(0)
+
+    def getTotalCount(self):
+        sql = "SELECT (SELECT count(*) FROM photos) + (SELECT count(*) FROM images)"
+        query = QSqlQuery(sql, self.db)
+        query.first()
+        return query.record().value(0) + 1
+
+    def update(self):
+        self._begin()
+
+        self.db.transaction()
+
+        for table in ('photos', 'images'):
+            sql = "ALTER TABLE %s ADD COLUMN hash TEXT" % table
+            QSqlQuery(sql, self.db)
+            sql = "ALTER TABLE %s ADD COLUMN refs INTEGER NOT NULL DEFAULT 1" % table
+            QSqlQuery(sql, self.db)
+
+        storage = ImageStorage(self.db)
+        storage.deduplicate(self.progressDlg)
+        ImageStorage.createIndexes(self.db)
+
+        IndexAdvisor.createCoreIndexes(self.db)
+
+        ChangeJournal.create(self.db)
+        Duplicates.create(self.db)
+
+        catalog = BackupCatalog(self.db)
+        catalog.create(Settings()['backup'], self.collection.getCollectionName())
+
+        # Leave gaps between positions of coins (see CollectionModel.SORT_ID_STEP)
+        sql = "UPDATE coins SET sort_id = sort_id * 1024"
+        QSqlQuery(sql, self.db)
+
+        self._updateRecord()
+
+        self.collection.settings['Version'] = 10
+        self.collection.settings.save()
+
+        self.db.commit()
+
+        self._finish()
+
+
 def updateCollection(collection):
     updater = Updater(collection, collection.parent())
     if updater.check():
@@ -2,15 +2,9 @@ import json
 import urllib.request
 
 from OpenNumismat.Tools.CursorDecorators import waitCursorDecorator
+from .MapKeys import MAPS_API_KEY
 from .MapWidget import BaseMapWidget
 
-gmapsAvailable = True
-
-try:
-    from OpenNumismat.private_keys import MAPS_API_KEY
-except ImportError:
-    gmapsAvailable = False
-
 
 class GMapsWidget(BaseMapWidget):
     HTML = '''
@@ -0,0 +1,16 @@
+# Keys of map services aren't distributed with sources, so maps which need
+# them are available only in builds with private keys
+gmapsAvailable = True
+mapboxAvailable = True
+
+try:
+    from OpenNumismat.private_keys import MAPS_API_KEY
+except ImportError:
+    MAPS_API_KEY = None
+    gmapsAvailable = False
+
+try:
+    from OpenNumismat.private_keys import MAPBOX_ACCESS_TOKEN
+except ImportError:
+    MAPBOX_ACCESS_TOKEN = None
+    mapboxAvailable = False
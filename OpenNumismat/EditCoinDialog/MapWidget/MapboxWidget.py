@@ -3,15 +3,9 @@ import urllib.request
 
 from OpenNumismat import version
 from OpenNumismat.Tools.CursorDecorators import waitCursorDecorator
+from .MapKeys import MAPBOX_ACCESS_TOKEN
 from .MapWidget import BaseMapWidget
 
-mapboxAvailable = True
-
-try:
-    from OpenNumismat.private_keys import MAPBOX_ACCESS_TOKEN
-except ImportError:
-    mapboxAvailable = False
-
 
 class MapboxWidget(BaseMapWidget):
     HTML = '''
@@ -1,9 +1,7 @@
 from enum import IntEnum
 
-from .OSMWidget import OSMWidget
-from .GMapsWidget import GMapsWidget, gmapsAvailable
-from .MapboxWidget import MapboxWidget, mapboxAvailable
-from .DAREWidget import DAREWidget
+# Widgets are imported on demand, they load web engine
+from .MapKeys import gmapsAvailable, mapboxAvailable
 
 
 class MapType(IntEnum):
@@ -15,10 +13,14 @@ class MapType(IntEnum):
 
 def get_map_widget(parent, type_, global_, static=True):
     if type_ == MapType.GMaps and gmapsAvailable:
+        from .GMapsWidget import GMapsWidget
         return GMapsWidget(global_, static, parent)
     elif type_ == MapType.Mapbox and mapboxAvailable:
+        from .MapboxWidget import MapboxWidget
         return MapboxWidget(global_, static, parent)
     elif type_ == MapType.DARE:
+        from .DAREWidget import DAREWidget
         return DAREWidget(global_, static, parent)
 
+    from .OSMWidget import OSMWidget
     return OSMWidget(global_, static, parent)
@@ -1,4 +1,3 @@
-import operator
 import pickle
 import os.path
 
@@ -21,9 +20,7 @@ from OpenNumismat.Collection.HeaderFilterMenu import FilterMenuButton
 from OpenNumismat.Tools import Gui, TemporaryDir
 from OpenNumismat.Tools.Converters import compareYears
 from OpenNumismat.Reports.Report import Report
-from OpenNumismat.Reports.Preview import PreviewDialog
 from OpenNumismat.Settings import Settings
-from OpenNumismat.Reports.ExportList import ExportToExcel, ExportToHtml, ExportToCsv, ExportToCsvUtf8
 from OpenNumismat.Tools.Gui import getSaveFileName, statusColor
 from OpenNumismat.Collection.HeaderFilterMenu import ColumnFilters, ValueFilter, DataFilter, BlankFilter
 
@@ -186,6 +183,8 @@ class BaseTableView(QTableView):
             indexes.append(real_index)
 
         if indexes:
+            from OpenNumismat.Reports.Preview import PreviewDialog
+
             preview = PreviewDialog(self.model(), indexes, self)
             preview.exec_()
         else:
@@ -227,6 +226,9 @@ class BaseTableView(QTableView):
             self, 'export_table', defaultFileName,
             OpenNumismat.HOME_PATH, filters)
         if fileName:
+            # Excel and image libraries are loaded only for export
+            from OpenNumismat.Reports.ExportList import ExportToExcel, ExportToHtml, ExportToCsv, ExportToCsvUtf8
+
             model = self.model()
             progressDlg = Gui.ProgressDialog(
                 QApplication.translate('BaseTableView', "Saving list"),
@@ -318,72 +320,18 @@ class BaseTableView(QTableView):
         if not indexes:
             indexes = self.selectedCoins()
 
-        # Fill multi record for editing
-        multiRecord = self.model().record(indexes[0].row())
-        tags = {}
-        for tag_id in multiRecord.value('tags'):
-            tags[tag_id] = Qt.Checked
-        usedFields = [Qt.Checked] * multiRecord.count()
-        for index in indexes:
-            record = self.model().record(index.row())
-
-            tags_diff = set(tags).symmetric_difference(record.value('tags'))
-            for tag_id in tags_diff:
-                tags[tag_id] = Qt.PartiallyChecked
+        model = self.model()
+        id_column = model.fields.id.id
+        ids = [model.index(index.row(), id_column).data(Qt.UserRole)
+               for index in indexes]
 
-            for j in range(multiRecord.count()):
-                field = record.field(j)
-                if field.name() == 'tags':
-                    usedFields[j] = Qt.Unchecked
-                else:
-                    value = field.value()
-                    if multiRecord.value(j) != value or not value:
-                        multiRecord.setNull(j)
-                        usedFields[j] = Qt.Unchecked
-        multiRecord.setValue('tags', tags)
+        # Fill multi record for editing
+        multiRecord, usedFields = model.multiRecord(ids)
 
-        dialog = EditCoinDialog(self.model(), multiRecord, self, usedFields)
+        dialog = EditCoinDialog(model, multiRecord, self, usedFields)
         result = dialog.exec_()
         if result == QDialog.Accepted:
-            progressDlg = Gui.ProgressDialog(
-                QApplication.translate('BaseTableView', "Updating records"),
-                QApplication.translate('BaseTableView', "Cancel"),
-                len(indexes), self)
-
-            # Fill records by used fields in multi record
-            multiRecord = dialog.record
-            usedFields = dialog.getUsedFields()
-            new_tags = multiRecord.value('tags')
-
-            # Sort and reverse indexes for updating records that out
-            # filtered after updating
-            rindexes = sorted(indexes, key=operator.methodcaller('row'),
-                              reverse=True)
-            for index in rindexes:
-                progressDlg.step()
-                if progressDlg.wasCanceled():
-                    break
-
-                record = self.model().record(index.row())
-                for i in range(multiRecord.count()):
-                    if usedFields[i] == Qt.Checked:
-                        record.setValue(i, multiRecord.value(i))
-                cur_tags = record.value('tags')
-                for tag_id, state in new_tags.items():
-                    if state == Qt.Checked:
-                        if tag_id not in cur_tags:
-                            cur_tags.append(tag_id)
-                    elif state == Qt.Unchecked:
-                        if tag_id in cur_tags:
-                            cur_tags.remove(tag_id)
-                record.setValue('tags', cur_tags)
-                self.model().setRecord(index.row(), record)
-
-            progressDlg.setLabelText(
-                QApplication.translate('BaseTableView', "Saving..."))
-            self.model().submitAll()
-
-            progressDlg.reset()
+            model.updateRecords(ids, dialog.record, dialog.getUsedFields())
 
     def _copy(self, indexes=None):
         if not indexes:
@@ -513,24 +461,11 @@ class BaseTableView(QTableView):
             QMessageBox.Yes | QMessageBox.Cancel,
             QMessageBox.Cancel)
         if result == QMessageBox.Yes:
-            progressDlg = Gui.ProgressDialog(
-                QApplication.translate('BaseTableView', "Deleting records"),
-                QApplication.translate('BaseTableView', "Cancel"),
-                len(indexes), self)
-
             model = self.model()
-            for index in indexes:
-                progressDlg.step()
-                if progressDlg.wasCanceled():
-                    break
-
-                model.removeRow(index.row())
-
-            progressDlg.setLabelText(
-                QApplication.translate('BaseTableView', "Saving..."))
-            model.submitAll()
-
-            progressDlg.reset()
+            id_column = model.fields.id.id
+            ids = [model.index(index.row(), id_column).data(Qt.UserRole)
+                   for index in indexes]
+            model.removeRecords(ids)
 
     def _clone(self, index=None):
         if not index:
@@ -734,7 +669,8 @@ class ListView(BaseTableView):
             self.headerButtons.append(btn)
 
         filtersSql = FilterMenuButton.filtersToSql(
-                                            self.listParam.filters.values())
+                                            self.listParam.filters.values(),
+                                            model.filterCompiler)
         self.model().setFilter(filtersSql)
 
         self.horizontalHeader().sectionResized.disconnect(self.columnResized)
@@ -988,17 +924,6 @@ class ListView(BaseTableView):
         model = self.model()
 
         if text:
-            val = "'%%%s%%'" % text.replace("'", "''")
-            values = []
-            val_lower = val.lower()
-            values.append(val_lower)
-            val_upper = val.upper()
-            if val_lower != val_upper:
-                values.append(val_upper)
-                values.append(val.title())
-            if val not in values:
-                values.append(val)
-
             parts = []
             for param in self.listParam.columns:
                 if not param.enabled:
@@ -1010,11 +935,27 @@ class ListView(BaseTableView):
 
                 parts.append(field.name)
 
+            ftsFilter = model.fullTextSearch.filter(text, parts)
+            if ftsFilter:
+                model.setQuickSearch(text, parts, ftsFilter)
+                return
+
+            val = "'%%%s%%'" % text.replace("'", "''")
+            values = []
+            val_lower = val.lower()
+            values.append(val_lower)
+            val_upper = val.upper()
+            if val_lower != val_upper:
+                values.append(val_upper)
+                values.append(val.title())
+            if val not in values:
+                values.append(val)
+
             sql = []
             for part in parts:
                 for val in values:
                     sql.append("%s LIKE %s" % (part, val))
-            model.setSearchFilter('(' + ' OR '.join(sql) + ')')
+            model.setQuickSearch(text, parts, '(' + ' OR '.join(sql) + ')')
         else:
             model.setSearchFilter('')
 
@@ -1394,6 +1335,12 @@ class IconView(BaseTableView):
         model = self.model()
 
         if text:
+            parts = ('title',)
+            ftsFilter = model.fullTextSearch.filter(text, parts)
+            if ftsFilter:
+                model.setQuickSearch(text, parts, ftsFilter)
+                return
+
             val = "'%%%s%%'" % text.replace("'", "''")
             values = []
             val_lower = val.lower()
@@ -1405,12 +1352,11 @@ class IconView(BaseTableView):
             if val not in values:
                 values.append(val)
 
-            parts = ('title',)
             sql = []
             for part in parts:
                 for val in values:
                     sql.append("%s LIKE %s" % (part, val))
-            model.setSearchFilter('(' + ' OR '.join(sql) + ')')
+            model.setQuickSearch(text, parts, '(' + ' OR '.join(sql) + ')')
         else:
             model.setSearchFilter('')
 
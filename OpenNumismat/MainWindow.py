@@ -18,8 +18,8 @@ from OpenNumismat.Tools.CursorDecorators import waitCursorDecorator
 from OpenNumismat.Tools.misc import versiontuple
 from OpenNumismat import version
 from OpenNumismat.Collection.Export import ExportDialog
-from OpenNumismat.FindDialog import FindDialog
 from OpenNumismat.SummaryDialog import SummaryDialog
+from OpenNumismat.PerformanceDialog import PerformanceDialog
 from OpenNumismat.Collection.Import.Colnect import ColnectDialog, colnectAvailable
 from OpenNumismat.Collection.Import.Ans import AnsDialog, ansAvailable
 from OpenNumismat.Collection.CollectionPages import CollectionPageTypes
@@ -142,6 +142,14 @@ class MainWindow(QMainWindow):
         vacuumCollectionAct.triggered.connect(self.vacuumCollectionEvent)
         self.collectionActs.append(vacuumCollectionAct)
 
+        deduplicateImagesAct = QAction(self.tr("Deduplicate images"), self)
+        deduplicateImagesAct.triggered.connect(self.deduplicateImagesEvent)
+        self.collectionActs.append(deduplicateImagesAct)
+
+        adviseIndexesAct = QAction(self.tr("Optimize indexes..."), self)
+        adviseIndexesAct.triggered.connect(self.adviseIndexesEvent)
+        self.collectionActs.append(adviseIndexesAct)
+
         descriptionCollectionAct = QAction(self.tr("Description"), self)
         descriptionCollectionAct.triggered.connect(
                                             self.descriptionCollectionEvent)
@@ -245,6 +253,8 @@ class MainWindow(QMainWindow):
         file.addSeparator()
         file.addAction(backupCollectionAct)
         file.addAction(vacuumCollectionAct)
+        file.addAction(deduplicateImagesAct)
+        file.addAction(adviseIndexesAct)
         file.addAction(passwordCollectionAct)
         file.addAction(descriptionCollectionAct)
         file.addSeparator()
@@ -359,6 +369,10 @@ class MainWindow(QMainWindow):
         reportAct.triggered.connect(self.report)
         self.collectionActs.append(reportAct)
 
+        findDuplicatesAct = QAction(self.tr("Find duplicates"), self)
+        findDuplicatesAct.triggered.connect(self.findDuplicatesEvent)
+        self.collectionActs.append(findDuplicatesAct)
+
         saveTableAct = QAction(QIcon(':/table.png'),
                                self.tr("Save current list..."), self)
         saveTableAct.triggered.connect(self.saveTable)
@@ -381,15 +395,20 @@ class MainWindow(QMainWindow):
         self.collectionActs.append(exportMenu)
         report.addSeparator()
         report.addAction(summaryAct)
+        report.addAction(findDuplicatesAct)
 
         yearCalculatorAct = QAction(self.tr("Year calculator"), self)
         yearCalculatorAct.triggered.connect(self.yearCalculator)
         referencesGeneratorAct = QAction(self.tr("References generator"), self)
         referencesGeneratorAct.triggered.connect(self.referencesGenerator)
+        performanceAct = QAction(self.tr("Performance"), self)
+        performanceAct.triggered.connect(self.performanceEvent)
 
         tools = menubar.addMenu(self.tr("Tools"))
         tools.addAction(yearCalculatorAct)
         tools.addAction(referencesGeneratorAct)
+        tools.addSeparator()
+        tools.addAction(performanceAct)
 
         helpAct = QAction(QIcon(':/help.png'),
                           self.tr("User manual"), self)
@@ -516,6 +535,9 @@ class MainWindow(QMainWindow):
         dialog = SettingsDialog(self.collection, self)
         res = dialog.exec_()
         if res == QDialog.Accepted:
+            for i in range(self.viewTab.count()):
+                self.viewTab.widget(i).model().resetFormatters()
+
             result = QMessageBox.question(self, self.tr("Settings"),
                         self.tr("The application will need to restart to apply "
                                 "the new settings. Restart it now?"),
@@ -535,6 +557,9 @@ class MainWindow(QMainWindow):
         self.viewTab.updatePage(page)
 
     def findEvent(self):
+        # Image matching libraries are heavy, so they are loaded on first search
+        from OpenNumismat.FindDialog import FindDialog
+
         model = self.viewTab.currentModel()
         dialog = FindDialog(model, self)
         dialog.exec_()
@@ -759,6 +784,13 @@ class MainWindow(QMainWindow):
         listView = self.viewTab.currentListView()
         listView.saveTable()
 
+    def findDuplicatesEvent(self):
+        filter_ = self.collection.findDuplicates()
+        if filter_:
+            self.quickSearch.clear()
+            listView = self.viewTab.currentListView()
+            listView.model().setSearchFilter(filter_)
+
     def __workingDir(self):
         fileName = self.collection.fileName
         if not fileName:
@@ -801,12 +833,23 @@ class MainWindow(QMainWindow):
 
         self.collection.vacuum()
 
+    def deduplicateImagesEvent(self):
+        self.collection.deduplicateImages()
+
+        for i in range(self.viewTab.count()):
+            self.viewTab.widget(i).model().select()
+
+    def adviseIndexesEvent(self):
+        self.collection.adviseIndexes()
+
     def mergeCollectionEvent(self):
         fileName, _selectedFilter = QFileDialog.getOpenFileName(self,
                 self.tr("Open collection"), self.__workingDir(),
                 self.tr("Collections (*.db)"))
         if fileName:
-            self.collection.merge(fileName)
+            if self.collection.merge(fileName):
+                for i in range(self.viewTab.count()):
+                    self.viewTab.widget(i).model().select()
 
     def openCollection(self, fileName):
         self.__closeCollection()
@@ -890,7 +933,7 @@ class MainWindow(QMainWindow):
 
             if Settings()['autobackup']:
                 if self.collection.isNeedBackup():
-                    self.collection.backup()
+                    self.collection.backup(background=True)
 
     def yearCalculator(self):
         year = datetime.today().strftime("%Y")
@@ -902,6 +945,10 @@ class MainWindow(QMainWindow):
     def referencesGenerator(self):
         self._openUrl("http://opennumismat.github.io/references/")
 
+    def performanceEvent(self):
+        dialog = PerformanceDialog(self.collection, self)
+        dialog.exec_()
+
     def about(self):
         QMessageBox.about(self, self.tr("About %s") % version.AppName,
                         "%s %s\n\n" % (version.AppName, version.Version) +
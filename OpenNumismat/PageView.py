@@ -5,7 +5,6 @@ from PySide6.QtWidgets import *
 from OpenNumismat.ImageView import ImageView
 from OpenNumismat.DetailsView import DetailsView
 from OpenNumismat.ListView import ListView, CardView, IconView
-from OpenNumismat.StatisticsView import StatisticsView
 from OpenNumismat.TagsView import TagsView
 from OpenNumismat.TreeView import TreeView
 from OpenNumismat.Settings import Settings
@@ -73,12 +72,9 @@ class PageView(Splitter):
         else:
             self.splitter1.addWidget(self.detailsView)
 
-        self.statisticsView = StatisticsView(pageParam.statisticsParam)
-        self.statisticsView.setMinimumHeight(200)
-
-        settings = Settings()
-        self.mapView = get_map_widget(None, settings['map_type'], True)
-        self.mapView.markerClicked.connect(self.setCurrentCoin)
+        # Charts and web engine are loaded when info is shown first time
+        self.statisticsView = None
+        self.mapView = None
 
         self.addWidget(self.splitter1)
         if self.imagesAtBottom:
@@ -96,8 +92,10 @@ class PageView(Splitter):
         self.listView.setModel(model)
         self.imageView.setModel(model)
         self.detailsView.setModel(model)
-        self.statisticsView.setModel(model)
-        self.mapView.setModel(model)
+        if self.statisticsView:
+            self.statisticsView.setModel(model)
+        if self.mapView:
+            self.mapView.setModel(model)
         self.prepareInfo()
 
         self.listView.rowChanged.connect(self.imageView.rowChangedEvent)
@@ -108,6 +106,7 @@ class PageView(Splitter):
             self.tagsView.currentItemChanged.connect(self.treeView.clearSelection)
             self._model.tagsChanged.connect(self.tagsView.tagsChanged)
         self._model.modelChanged.connect(self.modelChanged)
+        self._model.searchChanged.connect(self.searchChanged)
 
         if not model.settings['tags_used']:
             self.tagsView.hide()
@@ -117,18 +116,38 @@ class PageView(Splitter):
 
     def modelChanged(self):
         self.treeView.modelChanged()
+        self.searchChanged()
+
+    def searchChanged(self):
         self.listView.modelChanged()
         if self.param.info_type == CollectionPageTypes.Statistics:
             self.statisticsView.modelChanged()
         elif self.param.info_type == CollectionPageTypes.Map:
             self.mapView.modelChanged()
 
+    def createStatisticsView(self):
+        from OpenNumismat.StatisticsView import StatisticsView
+
+        self.statisticsView = StatisticsView(self.param.statisticsParam)
+        self.statisticsView.setMinimumHeight(200)
+        self.statisticsView.setModel(self._model)
+
+    def createMapView(self):
+        settings = Settings()
+        self.mapView = get_map_widget(None, settings['map_type'], True)
+        self.mapView.markerClicked.connect(self.setCurrentCoin)
+        self.mapView.setModel(self._model)
+
     def prepareInfo(self):
         sizes = self.splitter1.sizes()
 
         if self.param.info_type == CollectionPageTypes.Map:
+            if not self.mapView:
+                self.createMapView()
             self.splitter1.replaceWidget(1, self.mapView)
         elif self.param.info_type == CollectionPageTypes.Statistics:
+            if not self.statisticsView:
+                self.createStatisticsView()
             self.splitter1.replaceWidget(1, self.statisticsView)
         else:
             if self.imagesAtBottom:
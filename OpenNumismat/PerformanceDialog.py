@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import *
+
+import OpenNumismat
+from OpenNumismat.Collection.QueryProfiler import QueryProfiler
+from OpenNumismat.Tools.DialogDecorators import storeDlgSizeDecorator
+from OpenNumismat.Tools.Gui import getSaveFileName
+
+
+@storeDlgSizeDecorator
+class PerformanceDialog(QDialog):
+
+    def __init__(self, collection, parent=None):
+        super().__init__(parent,
+                         Qt.WindowCloseButtonHint | Qt.WindowSystemMenuHint)
+
+        self.imageCache = collection.imageCache
+
+        self.setWindowTitle(self.tr("Performance"))
+
+        self.enabledCheck = QCheckBox(self.tr("Collect statistics of SQL queries"), self)
+        self.enabledCheck.setChecked(QueryProfiler.enabled)
+        self.enabledCheck.toggled.connect(QueryProfiler.setEnabled)
+
+        self.table = QTableWidget(self)
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels((
+            self.tr("Call site"), self.tr("Statement"), self.tr("Calls"),
+            self.tr("Rows"), self.tr("Binds"), self.tr("Total, ms"),
+            self.tr("Max, ms")))
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.currentCellChanged.connect(self.currentCellChanged)
+
+        self.planBox = QTextEdit(self)
+        self.planBox.setReadOnly(True)
+
+        self.imageCacheLabel = QLabel(self)
+
+        splitter = QSplitter(Qt.Vertical, self)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.planBox)
+
+        buttonBox = QDialogButtonBox(Qt.Horizontal)
+        refreshButton = buttonBox.addButton(self.tr("Refresh"),
+                                            QDialogButtonBox.ActionRole)
+        refreshButton.clicked.connect(self.refresh)
+        resetButton = buttonBox.addButton(QDialogButtonBox.Reset)
+        resetButton.clicked.connect(self.reset)
+        saveButton = buttonBox.addButton(self.tr("Save..."),
+                                         QDialogButtonBox.ActionRole)
+        saveButton.clicked.connect(self.save)
+        buttonBox.addButton(QDialogButtonBox.Close)
+        buttonBox.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.enabledCheck)
+        layout.addWidget(splitter)
+        layout.addWidget(self.imageCacheLabel)
+        layout.addWidget(buttonBox)
+
+        self.setLayout(layout)
+
+        self.refresh()
+
+    def refresh(self):
+        report = QueryProfiler.report()
+        self.statements = report['statements']
+        self.slowQueries = report['slow_queries']
+
+        self.table.setRowCount(len(self.statements))
+        for row, stats in enumerate(self.statements):
+            values = (stats['site'], stats['template'], stats['calls'],
+                      stats['rows'], stats['binds'],
+                      round((stats['exec_time'] + stats['fetch_time']) * 1000, 1),
+                      round(stats['max_time'] * 1000, 1))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
+        self.table.setColumnWidth(1, min(self.table.columnWidth(1), 400))
+
+        self.planBox.clear()
+
+        self.imageCacheLabel.setText(
+            self.tr("Image cache: %d images, %.1f of %.1f MB, hits %d, misses %d (%.0f%%)") % (
+                self.imageCache.count(), self.imageCache.size / 1024 / 1024,
+                self.imageCache.max_size / 1024 / 1024,
+                self.imageCache.hits, self.imageCache.misses,
+                self.imageCache.hitRatio() * 100))
+
+    def currentCellChanged(self, row, _column, _prevRow, _prevColumn):
+        # Show slow executions of selected statement with their query plans
+        self.planBox.clear()
+        if row < 0 or row >= len(self.statements):
+            return
+
+        stats = self.statements[row]
+        lines = [stats['template'], ""]
+        for slow_query in self.slowQueries:
+            if slow_query['site'] != stats['site']:
+                continue
+            if QueryProfiler.template(slow_query['sql']) != stats['template']:
+                continue
+
+            lines.append(self.tr("Slow query %d ms at %s") % (
+                slow_query['time'] * 1000, slow_query['executedat']))
+            if slow_query['binds']:
+                lines.append(', '.join(slow_query['binds']))
+            lines.extend(slow_query['plan'])
+            lines.append("")
+
+        self.planBox.setText('\n'.join(lines))
+
+    def reset(self):
+        QueryProfiler.reset()
+        self.imageCache.resetStatistics()
+        self.refresh()
+
+    def save(self):
+        fileName, _selectedFilter = getSaveFileName(
+            self, 'performance', 'performance.json',
+            OpenNumismat.HOME_PATH, self.tr("JSON (*.json)"))
+        if fileName:
+            try:
+                QueryProfiler.save(fileName)
+            except OSError as error:
+                QMessageBox.warning(self, self.tr("Performance"),
+                                    self.tr("Can't save file: %s") % error)
@@ -8,6 +8,7 @@ from PySide6.QtGui import QPixmap, QIcon
 from PySide6.QtWidgets import *
 from PySide6.QtCore import Signal as pyqtSignal
 
+from OpenNumismat.Collection.StorageProfile import Profiles
 from OpenNumismat.Reference.ReferenceDialog import ReferenceDialog, CrossReferenceDialog
 
 
@@ -90,12 +91,48 @@ class BaseReferenceSection(QtCore.QObject):
         self.letter = letter
         self.sort = sort
         self.parent_name = None
+        self.model = None
+        self._icons = None
+
+    def close(self):
+        # Model and its proxy refer to each other. Unlinked they are
+        # destroyed right away instead of by garbage collector, which
+        # could do it after connection of reference is replaced
+        if self.model:
+            self.model.proxyModel().setSourceModel(None)
+            self.model = None
+        self._icons = None
 
     def reload(self):
         self.getSort()
         self.setSort()
         self.model.select()
 
+        self.resetIcons()
+
+    def loadIcons(self):
+        # Map of values to icons. Value without icon is absent in map, so
+        # it also not requested from DB
+        self._icons = {}
+
+        sql = "SELECT value, icon FROM %s WHERE icon IS NOT NULL" % self.table_name
+        query = QSqlQuery(sql, self.db)
+        while query.next():
+            record = query.record()
+            pixmap = QPixmap()
+            if pixmap.loadFromData(record.value(1)):
+                # Like a query by value, first of duplicated values is used
+                self._icons.setdefault(str(record.value(0)), QIcon(pixmap))
+
+    def resetIcons(self):
+        self._icons = None
+
+    def getIcon(self, value):
+        if self._icons is None:
+            self.loadIcons()
+
+        return self._icons.get(str(value))
+
     def button(self, parent=None):
         self.parent = parent
         button = QPushButton(self.letter, parent)
@@ -379,6 +416,8 @@ class Reference(QtCore.QObject):
                             self.tr("Can't open reference:\n%s") % fileName)
                 return False
             else:
+                self.__speedup(fileName)
+
                 # Update reference DB for version 1.4.3
                 if self.db.record('sections').indexOf('sort') < 0:
                     sql = "ALTER TABLE sections ADD COLUMN sort INTEGER"
@@ -419,12 +458,22 @@ class Reference(QtCore.QObject):
                             self.tr("Create reference"),
                             self.tr("Can't create reference:\n%s") % fileName)
                 return False
+            self.__speedup(fileName)
             self.create()
 
         self.fileName = fileName
 
         return True
 
+    def close(self):
+        for section in self.sections:
+            section.close()
+
+    def __speedup(self, fileName):
+        # Reference is shared by collections and changed rarely, so it
+        # isn't switched to WAL
+        Profiles['reliable'].apply(self.db, fileName)
+
     def load(self):
         # Update reference DB for version 1.6.2
         if 'ref' not in self.db.tables():
@@ -444,14 +493,15 @@ class Reference(QtCore.QObject):
         for section in self.sections:
             section.load(self.db)
 
-        self.sections_with_icons = []
+        # Sections with icons by name
+        self.sections_with_icons = {}
         for section in self.sections:
-            name = section.table_name
-            sql = "SELECT 1 FROM %s WHERE icon IS NOT NULL LIMIT 1" % name
+            sql = "SELECT 1 FROM %s WHERE icon IS NOT NULL LIMIT 1" % section.table_name
             query = QtSql.QSqlQuery(sql, self.db)
             query.exec_()
             if query.first():
-                self.sections_with_icons.append(name)
+                self.sections_with_icons[section.name] = section
+                section.loadIcons()
 
     def section(self, name):
         # NOTE: payplace and saleplace fields has one reference section =>
@@ -497,19 +547,9 @@ class Reference(QtCore.QObject):
         elif section in ('material', 'material2'):
             section = 'material'
 
-        table_name = "ref_%s" % section
-        if table_name in self.sections_with_icons:
-            sql = "SELECT icon FROM %s WHERE value=?" % table_name
-            query = QtSql.QSqlQuery(sql, self.db)
-            query.addBindValue(value)
-            query.exec_()
-            if query.first():
-                data = query.record().value(0)
-                if data:
-                    pixmap = QPixmap()
-                    if pixmap.loadFromData(data):
-                        icon = QIcon(pixmap)
-                        return icon
+        ref_section = self.sections_with_icons.get(section)
+        if ref_section:
+            return ref_section.getIcon(value)
         return None
 
     def backup(self):
@@ -435,6 +435,7 @@ class AllReferenceDialog(QDialog):
         for section in self.sections:
             widget = self.widgets[section.name]
             section.saveSort(widget.sortButton.isChecked())
+            section.resetIcons()
         if not self.db.commit():
             QMessageBox.critical(self.parent(),
                             self.tr("Save reference"),
@@ -1,11 +1,6 @@
 import codecs
 import os
 
-try:
-    from jinja2 import Environment, FileSystemLoader
-except ImportError:
-    print('jinja2 module missed. Report engine not available')
-
 from PySide6 import QtCore
 from PySide6.QtCore import Qt, QCryptographicHash, QLocale
 
@@ -98,6 +93,9 @@ class Report(QtCore.QObject):
 
         copyFolder(os.path.join(self.srcFolder, 'files'), self.contentDir)
 
+        # Template engine isn't needed until first report
+        from jinja2 import Environment, FileSystemLoader
+
         loader = FileSystemLoader(self.srcFolder)
         self.env = Environment(loader=loader, autoescape=True)
 
@@ -1,6 +1,5 @@
 import os.path
 
-from PySide6.QtCharts import QChart
 from PySide6.QtCore import Qt, QLocale, QSettings
 from PySide6.QtGui import QColor
 
@@ -74,9 +73,12 @@ class Settings(BaseSettings):
         'backup': OpenNumismat.HOME_PATH + "/backup/",
         'autobackup': True,
         'autobackup_depth': 25,
+        'autobackup_keep': 0,
         'reference': OpenNumismat.HOME_PATH + "/reference.ref",
         'error': True,
         'speedup': 1,
+        'image_cache_size': 64,
+        'display_cache_size': 16,
         'updates': False,
         'template': default_template,
         'images_by_default': 2,
@@ -91,7 +93,7 @@ class Settings(BaseSettings):
         'built_in_viewer': True,
         'font_size': 0,
         'style': '',
-        'chart_theme': QChart.ChartThemeLight.value,
+        'chart_theme': 0,  # QChart.ChartThemeLight
         'multicolor_chart': False,
         'use_blaf_palette': True,
         'show_chart_legend': False,
@@ -129,7 +131,10 @@ class Settings(BaseSettings):
         elif key in (
             'images_by_default',
             'autobackup_depth',
+            'autobackup_keep',
             'speedup',
+            'image_cache_size',
+            'display_cache_size',
             'map_type',
             'font_size',
             'chart_theme',
@@ -14,9 +14,7 @@ from OpenNumismat.Tools.Gui import infoMessageBox
 from OpenNumismat.Settings import Settings
 from OpenNumismat.Collection.CollectionFields import Statuses, TitleTemplateFields
 from OpenNumismat.Collection.Import.Cache import Cache
-from OpenNumismat.EditCoinDialog.MapWidget import MapType
-from OpenNumismat.EditCoinDialog.MapWidget.GMapsWidget import gmapsAvailable
-from OpenNumismat.EditCoinDialog.MapWidget.MapboxWidget import mapboxAvailable
+from OpenNumismat.EditCoinDialog.MapWidget import MapType, gmapsAvailable, mapboxAvailable
 
 
 class MainSettingsPage(QWidget):
@@ -96,6 +94,16 @@ class MainSettingsPage(QWidget):
                       self.autobackupDepth)
         self.autobackupDepth.setEnabled(settings['autobackup'])
 
+        self.autobackupKeep = QSpinBox(self)
+        self.autobackupKeep.setRange(0, 1000)
+        self.autobackupKeep.setSpecialValueText(self.tr("All"))
+        self.autobackupKeep.setValue(settings['autobackup_keep'])
+        self.autobackupKeep.setSizePolicy(QSizePolicy.Fixed,
+                                          QSizePolicy.Fixed)
+        layout.addRow(self.tr("Autobackups to keep"),
+                      self.autobackupKeep)
+        self.autobackupKeep.setEnabled(settings['autobackup'])
+
         self.errorSending = QCheckBox(
                             self.tr("Send error info to author"), self)
         self.errorSending.setChecked(settings['error'])
@@ -188,6 +196,7 @@ class MainSettingsPage(QWidget):
 
     def autobackupClicked(self, state):
         self.autobackupDepth.setEnabled(state == Qt.Checked)
+        self.autobackupKeep.setEnabled(state == Qt.Checked)
 
     def referenceButtonClicked(self):
         file, _selectedFilter = QFileDialog.getOpenFileName(
@@ -218,6 +227,7 @@ class MainSettingsPage(QWidget):
         settings['backup'] = self.backupFolder.text()
         settings['autobackup'] = self.autobackup.isChecked()
         settings['autobackup_depth'] = self.autobackupDepth.value()
+        settings['autobackup_keep'] = self.autobackupKeep.value()
         settings['reference'] = self.reference.text()
         settings['error'] = self.errorSending.isChecked()
         settings['updates'] = self.checkUpdates.isChecked()
@@ -327,6 +337,13 @@ class CollectionSettingsPage(QWidget):
         self.tagsEnabled.setChecked(self.settings['tags_used'])
         layout.addRow(self.tagsEnabled)
 
+        self.ftsSearch = QCheckBox(self.tr("Full-text index for quick search"), self)
+        self.ftsSearch.setChecked(self.settings['fts_search'])
+        if not collection.fullTextSearch.supported:
+            self.ftsSearch.setEnabled(False)
+            self.ftsSearch.setToolTip(self.tr("Not supported by SQLite library"))
+        layout.addRow(self.ftsSearch)
+
         self.statusUsed = {}
         statusesList = QListWidget(self)
         statusesList.setWrapping(True)
@@ -388,6 +405,7 @@ class CollectionSettingsPage(QWidget):
         self.settings['axis_in_hours'] = self.axisHours.isChecked()
         self.settings['stars_count'] = 5 if self.starsCount.isChecked() else 10
         self.settings['tags_used'] = self.tagsEnabled.isChecked()
+        self.settings['fts_search'] = self.ftsSearch.isChecked()
         default_status = self.defaultStatus.currentData()
         self.settings['default_status'] = default_status
 
@@ -402,6 +420,8 @@ class CollectionSettingsPage(QWidget):
 
         self.settings.save()
 
+        self.collection.fullTextSearch.update(self.settings['fts_search'])
+
         if self.settings['image_height'] != old_image_height:
             result = QMessageBox.question(self, self.tr("Settings"),
                     self.tr("Preview image height was changed. Recalculate it now?"),
@@ -20,13 +20,14 @@ from PySide6.QtCore import QCollator, QLocale
 from PySide6.QtCore import Qt, QPoint, QMargins, QSize, QDate, QDateTime, QByteArray
 from PySide6.QtCore import Signal as pyqtSignal
 from PySide6.QtGui import QImage, QIcon, QCursor, QPainter, QColor
-from PySide6.QtSql import QSqlQuery
 from PySide6.QtWidgets import *
 from PySide6.QtWebEngineWidgets import QWebEngineView as QWebView
 
 import OpenNumismat
 from OpenNumismat.Collection.CollectionFields import Statuses
 from OpenNumismat.Collection.CollectionFields import StatisticsFields
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
+from OpenNumismat.Collection.ReadPool import QueryExecutor
 from OpenNumismat.Tools.Gui import getSaveFileName
 from OpenNumismat.Tools.Converters import numberWithFraction
 from OpenNumismat.Tools.misc import saveImageFilters
@@ -961,6 +962,7 @@ class StatisticsView(QWidget):
 
     def setModel(self, model):
         self.model = model
+        self.executor = QueryExecutor(model.readPool, self)
 
         default_subfieldid = 0
         for field in self.model.fields.userFields:
@@ -1124,6 +1126,32 @@ class StatisticsView(QWidget):
 
         self.modelChanged()
     
+    def _select(self, sql, callback):
+        # Chart is filled when query is done in background. Filter with
+        # temp tables can be used only by GUI connection.
+        if QueryExecutor.isSupported(sql):
+            self.executor.execute(sql, callback)
+        else:
+            self.executor.cancel()
+
+            query = SqlQuery(self.model.database())
+            query.exec_(sql)
+            rows = []
+            while query.next():
+                record = query.record()
+                rows.append([record.value(i) for i in range(record.count())])
+            callback(rows)
+
+    def _useIndex(self, field, *columns):
+        # Report grouped columns to index advisor
+        if field == 'fineness':
+            columns = ('material', 'fineness') + columns
+        elif field == 'unit':
+            columns = ('value', 'unit') + columns
+        else:
+            columns = (field,) + columns
+        self.model.indexAdvisor.use(columns)
+
     def fillBarChart(self, chart):
         fieldId = self.fieldSelector.currentData()
         field = self.model.fields.field(fieldId).name
@@ -1133,6 +1161,7 @@ class StatisticsView(QWidget):
             sql_field = "IFNULL(value,''),IFNULL(unit,'')"
         else:
             sql_field = "IFNULL(%s,'')" % field
+        self._useIndex(field, 'quantity')
 
         filter_ = self.model.filter()
         if filter_:
@@ -1142,31 +1171,32 @@ class StatisticsView(QWidget):
         
         sql = "SELECT sum(iif(quantity!='',quantity,1)), %s FROM coins %s GROUP BY %s" % (
             sql_field, sql_filter, sql_field)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        zz = {}
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            val = str(record.value(1))
-            if field == 'unit':
-                val = numberWithFraction(val)[0] + ' ' + str(record.value(2))
-            elif field == 'fineness':
-                val += ' ' + str(record.value(2))
-            zz[val] = count
-
-        if field == 'status':
-            sorted_zz = dict(sorted(zz.items(), key=lambda x: Statuses.order(x[0])))
+
+        def fill(rows):
             zz = {}
-            for key, val in sorted_zz.items():
-                zz[Statuses[key]] = val
-        elif field == 'year':
-            pass
-        else:
-            zz = dict(sorted(zz.items(), key=cmp_to_key(self.sortStrings)))
+            for record in rows:
+                count = record[0]
+                val = str(record[1])
+                if field == 'unit':
+                    val = numberWithFraction(val)[0] + ' ' + str(record[2])
+                elif field == 'fineness':
+                    val += ' ' + str(record[2])
+                zz[val] = count
+
+            if field == 'status':
+                sorted_zz = dict(sorted(zz.items(), key=lambda x: Statuses.order(x[0])))
+                zz = {}
+                for key, val in sorted_zz.items():
+                    zz[Statuses[key]] = val
+            elif field == 'year':
+                pass
+            else:
+                zz = dict(sorted(zz.items(), key=cmp_to_key(self.sortStrings)))
+
+            chart.setData(list(zz), list(zz.values()))
 
-        chart.setData(list(zz), list(zz.values()))
         chart.setLabelY(self.fieldSelector.currentText())
+        self._select(sql, fill)
 
         return chart
     
@@ -1203,66 +1233,69 @@ class StatisticsView(QWidget):
         
         subfieldId = self.subfieldSelector.currentData()
         subfield = self.model.fields.field(subfieldId).name
+        self._useIndex(field, subfield)
         sql = "SELECT count(IFNULL(%s,'')), IFNULL(%s,''), %s FROM coins"\
               " %s GROUP BY %s, IFNULL(%s,'')" % (
                         subfield, subfield, sql_field, sql_filter, sql_field, subfield)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        xx = []
-        yy = []
-        zz = []
-        vv = {}
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            val = str(record.value(2))
+
+        chart = StackedBarChart(self)
+
+        def fill(rows):
+            xx = []
+            yy = []
+            zz = []
+            vv = {}
+            for record in rows:
+                count = record[0]
+                val = str(record[2])
+                if field == 'status':
+                    val = Statuses[val]
+                elif field == 'unit':
+                    val = numberWithFraction(val)[0] + ' ' + str(record[3])
+                elif field == 'fineness':
+                    val += ' ' + str(record[3])
+                subval = str(record[1])
+                if subfield == 'status':
+                    subval = Statuses[subval]
+
+                if val not in xx:
+                    xx.append(val)
+                if subval not in zz:
+                    zz.append(subval)
+                if val not in vv:
+                    vv[val] = {}
+                vv[val][subval] = count
+
+            for _ in range(len(zz)):
+                yy.append([0] * len(xx))
+
             if field == 'status':
-                val = Statuses[val]
-            elif field == 'unit':
-                val = numberWithFraction(val)[0] + ' ' + str(record.value(3))
-            elif field == 'fineness':
-                val += ' ' + str(record.value(3))
-            subval = str(record.value(1))
+                xx.reverse()
+            elif field == 'year':
+                xx = sorted(xx, key=cmp_to_key(self.sortYears), reverse=True)
+            else:
+                xx = sorted(xx, key=cmp_to_key(self.sortStrings), reverse=True)
+
             if subfield == 'status':
-                subval = Statuses[subval]
-
-            if val not in xx:
-                xx.append(val)
-            if subval not in zz:
-                zz.append(subval)
-            if val not in vv:
-                vv[val] = {}
-            vv[val][subval] = count
-
-        for _ in range(len(zz)):
-            yy.append([0] * len(xx))
-
-        if field == 'status':
-            xx.reverse()
-        elif field == 'year':
-            xx = sorted(xx, key=cmp_to_key(self.sortYears), reverse=True)
-        else:
-            xx = sorted(xx, key=cmp_to_key(self.sortStrings), reverse=True)
+                pass
+            elif subfield == 'year':
+                zz = sorted(zz, key=cmp_to_key(self.sortYears), reverse=True)
+            else:
+                zz = sorted(zz, key=cmp_to_key(self.sortStrings))
 
-        if subfield == 'status':
-            pass
-        elif subfield == 'year':
-            zz = sorted(zz, key=cmp_to_key(self.sortYears), reverse=True)
-        else:
-            zz = sorted(zz, key=cmp_to_key(self.sortStrings))
+            for i, val in enumerate(xx):
+                for j, subval in enumerate(zz):
+                    try:
+                        yy[j][i] = vv[val][subval]
+                    except KeyError:
+                        pass
 
-        for i, val in enumerate(xx):
-            for j, subval in enumerate(zz):
-                try:
-                    yy[j][i] = vv[val][subval]
-                except KeyError:
-                    pass
+            chart.setData(xx, yy, zz)
 
-        chart = StackedBarChart(self)
-        chart.setData(xx, yy, zz)
         chart.setLabelY(self.fieldSelector.currentText())
         chart.setLabelZ(self.subfieldSelector.currentText())
-        
+        self._select(sql, fill)
+
         return chart
 
     def progressChart(self):
@@ -1346,32 +1379,33 @@ class StatisticsView(QWidget):
                   " GROUP BY strftime('%s', paydate) ORDER BY paydate" % (
                       sql_field, date_format, ' AND '.join(sql_filters),
                       date_format)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        xx = {}
-        while query.next():
-            record = query.record()
-            count = record.value(0) or 0
-            val = str(record.value(1))
-            xx[val] = count
-
-        if period == 'year':
-            years = []
-            for year in xx.keys():
-                try:
-                    years.append(int(year))
-                except ValueError:
-                    pass
-
-            if len(years) > 2:
-                for x in range(int(min(years)), int(max(years))):
-                    if str(x) not in xx:
-                        xx[str(x)] = 0
 
-            xx = dict(sorted(xx.items()))
+        def fill(rows):
+            xx = {}
+            for record in rows:
+                count = record[0] or 0
+                val = str(record[1])
+                xx[val] = count
+
+            if period == 'year':
+                years = []
+                for year in xx.keys():
+                    try:
+                        years.append(int(year))
+                    except ValueError:
+                        pass
+
+                if len(years) > 2:
+                    for x in range(int(min(years)), int(max(years))):
+                        if str(x) not in xx:
+                            xx[str(x)] = 0
+
+                xx = dict(sorted(xx.items()))
+
+            chart.setData(list(xx), list(xx.values()))
 
-        chart.setData(list(xx), list(xx.values()))
         chart.setLabelY(self.periodSelector.currentText())
+        self._select(sql, fill)
 
         return chart
 
@@ -1411,58 +1445,60 @@ class StatisticsView(QWidget):
                     date_field, sql_field,
                     ' AND '.join(sql_filters),
                     date_field, sql_field)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        xx = {}
-        zz = []
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            year = str(record.value(1))
-            val = str(record.value(2))
-
-            if field == 'status':
-                val = Statuses[val]
-            elif field == 'unit':
-                val = numberWithFraction(val)[0] + ' ' + str(record.value(3))
-            elif field == 'fineness':
-                val += ' ' + str(record.value(3))
-
-            if val not in zz:
-                zz.append(val)
-
-            if year not in xx:
-                xx[year] = {}
-            xx[year][val] = count
-
-        if not nice_years:
-            years = []
-            for year in xx.keys():
-                try:
-                    years.append(int(year))
-                except ValueError:
-                    pass
-
-            if len(years) > 2:
-                for x in range(int(min(years)), int(max(years))):
-                    if str(x) not in xx:
-                        xx[str(x)] = {}
-
-            xx = dict(sorted(xx.items(), key=cmp_to_key(self.sortYears)))
-
-        if field == 'status':
-            zz = sorted(zz, key=cmp_to_key(self.sortStatuses), reverse=True)
-        elif field == 'year':
-            zz = sorted(zz, key=cmp_to_key(self.sortYears))
-        else:
-            zz = sorted(zz, key=cmp_to_key(self.sortStrings), reverse=True)
 
         if nice_years:
             chart = AreaNiceChart(self)
         else:
             chart = AreaChart(self)
-        chart.setData(xx, zz)
+
+        def fill(rows):
+            xx = {}
+            zz = []
+            for record in rows:
+                count = record[0]
+                year = str(record[1])
+                val = str(record[2])
+
+                if field == 'status':
+                    val = Statuses[val]
+                elif field == 'unit':
+                    val = numberWithFraction(val)[0] + ' ' + str(record[3])
+                elif field == 'fineness':
+                    val += ' ' + str(record[3])
+
+                if val not in zz:
+                    zz.append(val)
+
+                if year not in xx:
+                    xx[year] = {}
+                xx[year][val] = count
+
+            if not nice_years:
+                years = []
+                for year in xx.keys():
+                    try:
+                        years.append(int(year))
+                    except ValueError:
+                        pass
+
+                if len(years) > 2:
+                    for x in range(int(min(years)), int(max(years))):
+                        if str(x) not in xx:
+                            xx[str(x)] = {}
+
+                xx = dict(sorted(xx.items(), key=cmp_to_key(self.sortYears)))
+
+            if field == 'status':
+                zz = sorted(zz, key=cmp_to_key(self.sortStatuses), reverse=True)
+            elif field == 'year':
+                zz = sorted(zz, key=cmp_to_key(self.sortYears))
+            else:
+                zz = sorted(zz, key=cmp_to_key(self.sortStrings), reverse=True)
+
+            chart.setData(xx, zz)
+
         chart.setLabelY(self.fieldSelector.currentText())
+        self._select(sql, fill)
 
         return chart
 
@@ -1470,89 +1506,60 @@ class StatisticsView(QWidget):
         nice_years = Settings()['nice_years_chart']
 
         filter_ = self.model.filter()
-        if filter_:
-            sql_filter = "WHERE %s" % filter_
-        else:
-            sql_filter = ""
-
-        if nice_years:
-            date_field = "strftime('%Y-%m', createdat)"
-        else:
-            date_field = "strftime('%Y', createdat)"
-
-        sql = "SELECT sum(iif(quantity!='',quantity,1)), %s FROM coins"\
-              " %s"\
-              " GROUP BY %s" % (date_field, sql_filter, date_field)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        xx = {}
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            val = str(record.value(1))
-            xx[val] = [count, 0, 0]
-
-        sql_filters = ["status IN ('owned', 'ordered', 'sale', 'sold', 'missing', 'duplicate', 'replacement')"]
-        if filter_:
-            sql_filters.append(filter_)
-
-        if nice_years:
-            date_field = "strftime('%Y-%m', paydate)"
-        else:
-            date_field = "strftime('%Y', paydate)"
 
-        sql = "SELECT sum(iif(quantity!='',quantity,1)), %s FROM coins"\
-              " WHERE %s"\
-              " GROUP BY %s" % (date_field, ' AND '.join(sql_filters), date_field)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            val = str(record.value(1))
-            if val in xx:
-                xx[val][1] = count
+        # Added, paid and sold coins by dates in one query
+        sqls = []
+        for date, status_filter in (
+                ('createdat', None),
+                ('paydate', "status IN ('owned', 'ordered', 'sale', 'sold', 'missing', 'duplicate', 'replacement')"),
+                ('saledate', "status='sold'")):
+            sql_filters = []
+            if status_filter:
+                sql_filters.append(status_filter)
+            if filter_:
+                sql_filters.append(filter_)
+            if sql_filters:
+                sql_filter = "WHERE %s" % ' AND '.join(sql_filters)
             else:
-                xx[val] = [0, count, 0]
+                sql_filter = ""
 
-        sql_filters = ["status='sold'"]
-        if filter_:
-            sql_filters.append(filter_)
-
-        if nice_years:
-            date_field = "strftime('%Y-%m', saledate)"
-        else:
-            date_field = "strftime('%Y', saledate)"
-
-        sql = "SELECT sum(iif(quantity!='',quantity,1)), %s FROM coins"\
-              " WHERE %s"\
-              " GROUP BY %s" % (date_field, ' AND '.join(sql_filters), date_field)
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            val = str(record.value(1))
-            if val in xx:
-                xx[val][2] = count
+            if nice_years:
+                date_field = "strftime('%%Y-%%m', %s)" % date
             else:
-                xx[val] = [0, 0, count]
+                date_field = "strftime('%%Y', %s)" % date
+
+            sqls.append("SELECT %d, sum(iif(quantity!='',quantity,1)), %s FROM coins"
+                        " %s GROUP BY %s" % (len(sqls), date_field, sql_filter, date_field))
+        sql = ' UNION ALL '.join(sqls)
 
         if nice_years:
             chart = AreaNiceStatusChart(self)
         else:
-            keys = list(xx)
-            if '' in keys:
-                keys.remove('')
-            if len(keys) > 2:
-                for x in range(int(min(keys)), int(max(keys))):
-                    if str(x) not in xx:
-                        xx[str(x)] = [0, 0, 0]
-
             chart = AreaStatusChart(self)
 
-        xx = dict(sorted(xx.items()))
-        chart.setData(xx.keys(), list(xx.values()))
+        def fill(rows):
+            xx = {}
+            for record in rows:
+                kind = record[0]
+                count = record[1]
+                val = str(record[2])
+                if val not in xx:
+                    xx[val] = [0, 0, 0]
+                xx[val][kind] = count
+
+            if not nice_years:
+                keys = list(xx)
+                if '' in keys:
+                    keys.remove('')
+                if len(keys) > 2:
+                    for x in range(int(min(keys)), int(max(keys))):
+                        if str(x) not in xx:
+                            xx[str(x)] = [0, 0, 0]
+
+            xx = dict(sorted(xx.items()))
+            chart.setData(xx.keys(), list(xx.values()))
+
+        self._select(sql, fill)
 
         return chart
 
@@ -1564,19 +1571,20 @@ class StatisticsView(QWidget):
             sql_filter = ""
 
         sql = "SELECT sum(iif(quantity!='',quantity,1)), IFNULL(country,'') FROM coins %s GROUP BY IFNULL(country,'')" % sql_filter
-        query = QSqlQuery(self.model.database())
-        query.exec_(sql)
-        xx = []
-        yy = []
-        while query.next():
-            record = query.record()
-            count = record.value(0)
-            val = str(record.value(1))
-            xx.append(val)
-            yy.append(count)
 
         chart = GeoChart(self)
-        chart.setData(xx, yy, self.regionSelector.currentData())
+        region = self.regionSelector.currentData()
+
+        def fill(rows):
+            xx = []
+            yy = []
+            for record in rows:
+                xx.append(str(record[1]))
+                yy.append(record[0])
+
+            chart.setData(xx, yy, region)
+
+        self._select(sql, fill)
         
         return chart
 
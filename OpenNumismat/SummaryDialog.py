@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 
 from PySide6.QtCore import Qt, QDate, QLocale
-from PySide6.QtSql import QSqlQuery
 from PySide6.QtWidgets import QDialog, QTextEdit, QVBoxLayout, QDialogButtonBox
 
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
 from OpenNumismat.Tools.DialogDecorators import storeDlgSizeDecorator
 from OpenNumismat.Tools.Converters import stringToMoney
 
@@ -51,7 +51,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT count(*) FROM coins"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             totalCount = query.record().value(0)
             lines.append(self.tr("Total count: %d") % totalCount)
@@ -60,7 +60,7 @@ class SummaryDialog(QDialog):
         quantity_owned = 0
         sql = "SELECT quantity FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'duplicate', 'replacement')"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         while query.next():
             record = query.record()
             quantity = int(record.value('quantity') or 1)
@@ -77,7 +77,7 @@ class SummaryDialog(QDialog):
         sql = "SELECT quantity FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'duplicate', 'replacement') AND " \
                 "%s" % gold_filter
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         while query.next():
             record = query.record()
             quantity = int(record.value('quantity') or 1)
@@ -94,7 +94,7 @@ class SummaryDialog(QDialog):
                     "%s AND " \
                     "ifnull(fineness,'')<>'' AND ifnull(weight,'')<>''" % gold_filter
             sql = self.makeSql(sql, filter_)
-            query = QSqlQuery(sql, model.database())
+            query = SqlQuery(sql, model.database())
             gold_weight = 0
             gold_count = 0
             gold_quantity = 0
@@ -129,7 +129,7 @@ class SummaryDialog(QDialog):
         sql = "SELECT quantity FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'duplicate', 'replacement') AND " \
                 "%s" % silver_filter
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         while query.next():
             record = query.record()
             quantity = int(record.value('quantity') or 1)
@@ -146,7 +146,7 @@ class SummaryDialog(QDialog):
                     "%s AND " \
                     "ifnull(fineness,'')<>'' AND ifnull(weight,'')<>''" % silver_filter
             sql = self.makeSql(sql, filter_)
-            query = QSqlQuery(sql, model.database())
+            query = SqlQuery(sql, model.database())
             silver_weight = 0
             silver_count = 0
             silver_quantity = 0
@@ -177,7 +177,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT count(*) FROM coins WHERE status='wish'"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             count = query.record().value(0)
             lines.append(self.tr("Count wish: %d") % count)
@@ -185,7 +185,7 @@ class SummaryDialog(QDialog):
         count_sold = 0
         sql = "SELECT count(*) FROM coins WHERE status='sold'"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             count_sold = query.record().value(0)
             if count_sold > 0:
@@ -193,7 +193,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT count(*) FROM coins WHERE status='bidding'"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             count = query.record().value(0)
             if count > 0:
@@ -201,7 +201,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT count(*) FROM coins WHERE status='missing'"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             count = query.record().value(0)
             if count > 0:
@@ -211,13 +211,13 @@ class SummaryDialog(QDialog):
         commission = ""
         sql = "SELECT SUM(totalpayprice) FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'sold', 'missing', 'duplicate', 'replacement') AND totalpayprice<>'' AND totalpayprice IS NOT NULL"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             paid = query.record().value(0)
             if paid:
                 sql = "SELECT SUM(payprice) FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'sold', 'missing', 'duplicate', 'replacement') AND payprice<>'' AND payprice IS NOT NULL"
                 sql = self.makeSql(sql, filter_)
-                query = QSqlQuery(sql, model.database())
+                query = SqlQuery(sql, model.database())
                 if query.first():
                     paid_without_commission = query.record().value(0)
                     if paid_without_commission:
@@ -234,13 +234,13 @@ class SummaryDialog(QDialog):
         commission = ""
         sql = "SELECT SUM(totalsaleprice) FROM coins WHERE status='sold' AND totalsaleprice<>'' AND totalsaleprice IS NOT NULL"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             earned = query.record().value(0)
             if earned:
                 sql = "SELECT SUM(saleprice) FROM coins WHERE status='sold' AND saleprice<>'' AND saleprice IS NOT NULL"
                 sql = self.makeSql(sql, filter_)
-                query = QSqlQuery(sql, model.database())
+                query = SqlQuery(sql, model.database())
                 if query.first():
                     earn_without_commission = query.record().value(0)
                     if earn_without_commission:
@@ -260,7 +260,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT paydate FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'sold', 'missing', 'duplicate', 'replacement') AND paydate<>'' AND paydate IS NOT NULL ORDER BY paydate LIMIT 1"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             date = QDate.fromString(query.record().value(0), Qt.ISODate)
             paydate = locale.toString(date, QLocale.ShortFormat)
@@ -268,7 +268,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT UPPER(grade), price1, price2, price3, price4, quantity FROM coins WHERE status IN ('owned', 'ordered', 'sale', 'duplicate', 'replacement') AND (ifnull(price1,'')<>'' OR ifnull(price2,'')<>'' OR ifnull(price3,'')<>'' OR ifnull(price4,'')<>'')"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         est_owned = 0
         count = 0
         coins_quantity = 0
@@ -318,7 +318,7 @@ class SummaryDialog(QDialog):
 
         sql = "SELECT price1, price2, price3, price4 FROM coins WHERE status='wish' AND (ifnull(price1,'')<>'' OR ifnull(price2,'')<>'' OR ifnull(price3,'')<>'' OR ifnull(price4,'')<>'')"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         est_wish = 0
         count = 0
         comment = ""
@@ -343,9 +343,9 @@ class SummaryDialog(QDialog):
 
         lines.append(' '.join((self.tr("Estimation wish: %d") % est_wish, comment)))
 
-        sql = "SELECT count(*) FROM photos"
+        sql = "SELECT ifnull(SUM(refs), 0) FROM photos"
         sql = self.makeSql(sql, filter_)
-        query = QSqlQuery(sql, model.database())
+        query = SqlQuery(sql, model.database())
         if query.first():
             count = query.record().value(0)
             lines.append(self.tr("Count images: %d") % count)
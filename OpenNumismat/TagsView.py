@@ -59,21 +59,8 @@ class TagsView(QTreeWidget):
             self.resizeColumnToContents(0)
 
             tag_id = current.data(0, Qt.UserRole)
-            sql = "SELECT coin_id FROM coins_tags WHERE tag_id=%d" % tag_id
-            query = QSqlQuery(self.db)
-            query.exec_(sql)
-            coin_ids = []
-            while query.next():
-                record = query.record()
-
-                coin_id = record.value(0)
-                coin_ids.append(str(coin_id))
-
-            if coin_ids:
-                # TODO: Use INNER JOIN instead filtering by id
-                filter_ = "id IN (" + ','.join(coin_ids) + ")"
-            else:
-                filter_ = "FALSE"
+            # Subquery keeps filter short for any count of tagged coins
+            filter_ = "id IN (SELECT coin_id FROM coins_tags WHERE tag_id=%d)" % tag_id
             self.model.setAdditionalFilter(filter_)
 
     def tagsChanged(self):
@@ -1,4 +1,3 @@
-from PySide6.QtSql import QSqlQuery
 from PySide6.QtCore import Qt, QCollator, QLocale, QEvent
 from PySide6.QtWidgets import *
 
@@ -8,6 +7,7 @@ from OpenNumismat.Tools import Gui
 from OpenNumismat.Tools.Gui import statusIcon
 from OpenNumismat.Tools.Converters import numberWithFraction, compareYears
 from OpenNumismat.Collection.CollectionFields import Statuses
+from OpenNumismat.Collection.QueryProfiler import SqlQuery
 from OpenNumismat.Settings import Settings
 
 
@@ -130,10 +130,12 @@ class TreeView(QTreeWidget):
         if not fields:
             return
 
+        self.model.indexAdvisor.use(fields)
+
         sql = "SELECT DISTINCT %s FROM coins" % ','.join(fields)
         if filters:
             sql += " WHERE " + filters
-        query = QSqlQuery(sql, self.db)
+        query = SqlQuery(sql, self.db)
         hasEmpty = False
         while query.next():
             record = query.record()
@@ -321,20 +323,20 @@ class TreeView(QTreeWidget):
         self.model.setFilter('')
         self.changingEnabled = True
 
-        newRecord = self.model.record()
-        # Fill new record with values of first record
-        for j in range(newRecord.count()):
-            newRecord.setValue(j, self.model.record(0).value(j))
-        tag_ids = self.model.record(0).value('tags')
+        # Fill new record with values of first record. Images are compared
+        # by ids and loaded only for common ones
+        newRecord = self.model.record(0, with_images=False)
+        tag_ids = newRecord.value('tags')
 
-        for i in range(self.model.rowCount()):
-            record = self.model.record(i)
+        for i in range(1, self.model.rowCount()):
+            record = self.model.record(i, with_images=False)
             for j in range(newRecord.count()):
                 value = record.value(j)
                 if newRecord.value(j) != value or not value:
                     newRecord.setNull(j)
             tag_ids = list([tag_id for tag_id in tag_ids if tag_id in record.value('tags')])
         newRecord.setValue('tags', tag_ids)
+        self.model.loadImages(newRecord)
 
         self.model.addCoin(newRecord, self)
 
@@ -346,63 +348,19 @@ class TreeView(QTreeWidget):
         self.model.setFilter('')
         self.changingEnabled = True
 
+        while self.model.canFetchMore():
+            self.model.fetchMore()
+        id_column = self.model.fields.id.id
+        ids = [self.model.index(i, id_column).data(Qt.UserRole)
+               for i in range(self.model.rowCount())]
+
         # Fill multi record for editing
-        multiRecord = self.model.record(0)
-        tags = {}
-        for tag_id in multiRecord.value('tags'):
-            tags[tag_id] = Qt.Checked
-        usedFields = [Qt.Checked] * multiRecord.count()
-        for i in range(self.model.rowCount()):
-            record = self.model.record(i)
-
-            tags_diff = set(tags).symmetric_difference(record.value('tags'))
-            for tag_id in tags_diff:
-                tags[tag_id] = Qt.PartiallyChecked
-
-            for j in range(multiRecord.count()):
-                field = record.field(j)
-                if field.name() == 'tags':
-                    usedFields[j] = Qt.Unchecked
-                else:
-                    value = field.value()
-                    if multiRecord.value(j) != value or not value:
-                        multiRecord.setNull(j)
-                        usedFields[j] = Qt.Unchecked
-        multiRecord.setValue('tags', tags)
+        multiRecord, usedFields = self.model.multiRecord(ids)
 
-        # TODO: Make identical with ListView._multiEdit
         dialog = EditCoinDialog(self.model, multiRecord, self, usedFields)
         result = dialog.exec_()
         if result == QDialog.Accepted:
-            progressDlg = Gui.ProgressDialog(self.tr("Updating records"),
-                                self.tr("Cancel"), self.model.rowCount(), self)
-
-            # Fill records by used fields in multi record
-            multiRecord = dialog.record
-            usedFields = dialog.getUsedFields()
-            new_tags = multiRecord.value('tags')
-            for i in range(self.model.rowCount()):
-                progressDlg.setValue(i)
-                if progressDlg.wasCanceled():
-                    break
-
-                record = self.model.record(i)
-                for j in range(multiRecord.count()):
-                    if usedFields[j] == Qt.Checked:
-                        record.setValue(j, multiRecord.value(j))
-                cur_tags = record.value('tags')
-                for tag_id, state in new_tags.items():
-                    if state == Qt.Checked:
-                        if tag_id not in cur_tags:
-                            cur_tags.append(tag_id)
-                    elif state == Qt.Unchecked:
-                        if tag_id in cur_tags:
-                            cur_tags.remove(tag_id)
-                record.setValue('tags', cur_tags)
-                self.model.setRecord(i, record)
-
-            self.model.submitAll()
-            progressDlg.reset()
+            self.model.updateRecords(ids, dialog.record, dialog.getUsedFields())
 
         self.model.setFilter(storedFilter)
 
@@ -5,7 +5,7 @@ import ssl
 import sys
 import traceback
 
-from PySide6.QtCore import QCoreApplication, QTranslator, QUrl, QUrlQuery, QSettings, QLibraryInfo, QLocale
+from PySide6.QtCore import Qt, QCoreApplication, QTranslator, QUrl, QUrlQuery, QSettings, QLibraryInfo, QLocale
 from PySide6.QtWidgets import QApplication, QMessageBox
 from PySide6.QtGui import QDesktopServices
 from PySide6 import __version__ as PYQT_VERSION_STR
@@ -14,12 +14,16 @@ import OpenNumismat
 from OpenNumismat.Settings import Settings
 from OpenNumismat.LatestCollections import LatestCollections
 from OpenNumismat.MainWindow import MainWindow
+from OpenNumismat.Collection.Backup import BackupThread
 from OpenNumismat.Tools import TemporaryDir
 from OpenNumismat import resources
 from OpenNumismat import version
 
 
 def main():
+    # Web engine is imported with statistics, map and report preview after
+    # application is started
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
 
     QCoreApplication.setOrganizationName(version.Company)
@@ -64,6 +68,12 @@ def main():
     mainWindow.raise_()  # this will raise the window on Mac OS X
     status = app.exec_()
 
+    # Autobackup could be still in progress after closing window
+    BackupThread.waitAll()
+
+    # Collection file is left without WAL
+    mainWindow.collection.close()
+
     # Clear temporary files
     TemporaryDir.remove()
 
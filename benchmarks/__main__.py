@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# Headless benchmarks of collection operations.
+# Usage: python -m benchmarks [--coins N] [--photos M] [--output results.json]
+#                             [--compare baseline.json] [-k name] ...
+
+import argparse
+import fnmatch
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.harness import Runner, compare, initApplication
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Run headless benchmarks")
+    parser.add_argument('--coins', type=int, default=1000)
+    parser.add_argument('--photos', type=int, default=200)
+    parser.add_argument('--photo-size', type=int, default=800,
+                        help="side of photo in pixels")
+    parser.add_argument('--tags', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--collection',
+                        help="use existing collection instead of generated one")
+    parser.add_argument('--work-dir',
+                        help="folder for generated collection, kept between runs")
+    parser.add_argument('-k', dest='patterns', action='append',
+                        help="run only benchmarks matching pattern, e.g. statistics_*")
+    parser.add_argument('--list', action='store_true',
+                        help="list benchmarks and exit")
+    parser.add_argument('--output', help="save results to JSON file")
+    parser.add_argument('--compare', help="compare results with saved JSON file")
+    args = parser.parse_args()
+
+    app = initApplication()
+
+    from benchmarks.generator import generateCollection
+    from benchmarks.suite import BENCHMARKS
+
+    benchmarks = BENCHMARKS
+    if args.patterns:
+        benchmarks = [benchmark for benchmark in BENCHMARKS
+                      if any(fnmatch.fnmatch(benchmark.name, pattern)
+                             for pattern in args.patterns)]
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return 0
+
+    params = {'coins': args.coins, 'photos': args.photos,
+              'photo_size': args.photo_size, 'tags': args.tags,
+              'seed': args.seed}
+
+    if args.work_dir:
+        workDir = args.work_dir
+        os.makedirs(workDir, exist_ok=True)
+    else:
+        workDir = tempfile.mkdtemp(prefix='on_benchmarks_')
+
+    try:
+        if args.collection:
+            baseFile = os.path.abspath(args.collection)
+            params = {'collection': baseFile, 'seed': args.seed,
+                      'coins': args.coins}
+        else:
+            baseFile = os.path.join(
+                workDir, 'base_%(coins)d_%(photos)d_%(photo_size)d_%(tags)d_%(seed)d.db' % params)
+            if not os.path.exists(baseFile):
+                print("Generating collection %s" % baseFile)
+                generateCollection(baseFile, **params)
+
+        runner = Runner(workDir, baseFile, os.path.join(workDir, 'reference.ref'),
+                        params, args.repeat)
+        for benchmark in benchmarks:
+            runner.run(benchmark)
+
+        if args.output:
+            runner.save(args.output)
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as file:
+                compare(json.load(file), runner.report())
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    del app
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# Synthetic collection for benchmarks. Coins are stored by Collection
+# itself, so the file has the same structure, side tables and previews as
+# a collection filled by user.
+# Usage: python -m benchmarks.generator <collection.db> [options]
+
+import argparse
+import os
+import random
+import tempfile
+
+from PySide6.QtCore import Qt, QBuffer, QByteArray, QDate, QIODevice, QPointF
+from PySide6.QtGui import QColor, QImage, QPainter, QRadialGradient
+from PySide6.QtSql import QSqlQuery
+
+from benchmarks.harness import initApplication, closeCollection
+
+COUNTRIES = (
+    ('USA', ('cent', 'dollar'), ('P', 'D', 'S', 'W')),
+    ('Germany', ('pfennig', 'mark', 'euro cent', 'euro'), ('A', 'D', 'F', 'G', 'J')),
+    ('France', ('centime', 'franc', 'euro cent', 'euro'), ('A', 'B', 'K')),
+    ('United Kingdom', ('penny', 'shilling', 'pound'), ('',)),
+    ('Russia', ('kopek', 'ruble'), ('MMD', 'SPMD')),
+    ('Canada', ('cent', 'dollar'), ('',)),
+    ('Italy', ('centesimo', 'lira', 'euro cent', 'euro'), ('R',)),
+    ('Japan', ('sen', 'yen'), ('',)),
+    ('Spain', ('centimo', 'peseta', 'euro'), ('M',)),
+    ('Australia', ('cent', 'dollar'), ('',)),
+    ('Austria', ('groschen', 'schilling', 'euro'), ('',)),
+    ('Mexico', ('centavo', 'peso'), ('Mo',)),
+    ('India', ('paisa', 'rupee'), ('B', 'C', 'H', 'N')),
+    ('China', ('fen', 'jiao', 'yuan'), ('',)),
+    ('Switzerland', ('rappen', 'franc'), ('B',)),
+    ('Netherlands', ('cent', 'gulden', 'euro'), ('',)),
+    ('Poland', ('grosz', 'zloty'), ('MW',)),
+    ('Ukraine', ('kopiyka', 'hryvnia'), ('',)),
+    ('Brazil', ('centavo', 'real'), ('',)),
+    ('South Africa', ('cent', 'rand'), ('',)),
+)
+VALUES = (1, 2, 5, 10, 20, 25, 50, 100, 0.5, 0.25)
+MATERIALS = (('Copper-nickel', 0.3), ('Bronze', 0.2), ('Steel', 0.15),
+             ('Brass', 0.12), ('Aluminium', 0.1), ('Silver', 0.1), ('Gold', 0.03))
+STATUSES = (('owned', 0.55), ('wish', 0.15), ('duplicate', 0.08),
+            ('sold', 0.06), ('ordered', 0.04), ('sale', 0.04),
+            ('replacement', 0.03), ('missing', 0.02), ('demo', 0.01),
+            ('bidding', 0.01), ('pass', 0.01))
+OWNED_STATUSES = ('owned', 'duplicate', 'replacement', 'sale', 'ordered', 'sold')
+GRADES = (('UNC', 0.3), ('AU', 0.2), ('XF', 0.2), ('VF', 0.15), ('F', 0.1), ('BU', 0.05))
+TYPES = ('Circulation', 'Commemorative', 'Bullion', 'Pattern', 'Token')
+SERIES = ('Olympic Games', 'Red Book', 'Animals', 'Famous people', 'Cities',
+          'State quarters', 'Space', 'Architecture')
+SHAPES = ('Round', 'Round', 'Round', 'Polygonal', 'Square', 'Scalloped')
+PLACES = ('Coin show', 'Bank', 'Auction', 'Online shop', 'Exchange', 'Gift')
+WORDS = ('eagle', 'crown', 'wreath', 'shield', 'portrait', 'ship', 'tower',
+         'lion', 'star', 'oak', 'laurel', 'river', 'mountain', 'bridge',
+         'monogram', 'value', 'legend', 'denticles', 'ribbon', 'torch')
+
+
+def weighted(rnd, items):
+    values, weights = zip(*items)
+    return rnd.choices(values, weights)[0]
+
+
+def makePhotos(count, size, rnd):
+    # Photos are encoded once, JPEG of gradients and circles has size close
+    # to real photos of coins
+    photos = []
+    for _ in range(count):
+        image = QImage(size, size, QImage.Format_RGB32)
+        image.fill(QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        for _ in range(12):
+            center = QPointF(rnd.uniform(0, size), rnd.uniform(0, size))
+            radius = rnd.uniform(size / 20, size / 2)
+            gradient = QRadialGradient(center, radius)
+            gradient.setColorAt(0, QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+            gradient.setColorAt(1, QColor(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256), 0))
+            painter.setBrush(gradient)
+            painter.drawEllipse(center, radius, radius)
+        painter.end()
+
+        ba = QByteArray()
+        buffer = QBuffer(ba)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, 'jpg')
+        photos.append(ba)
+
+    return photos
+
+
+def randomDate(rnd, first_year, last_year):
+    date = QDate(first_year, 1, 1)
+    days = date.daysTo(QDate(last_year, 12, 31))
+    return date.addDays(rnd.randrange(days + 1)).toString(Qt.ISODate)
+
+
+def fillRecord(record, rnd):
+    country, units, mints = rnd.choices(
+        COUNTRIES, [1 / (i + 1) for i in range(len(COUNTRIES))])[0]
+    unit = rnd.choice(units)
+    value = rnd.choice(VALUES)
+    # Most of coins in collections are modern
+    year = min(2024, int(rnd.triangular(1700, 2025, 2000)))
+    status = weighted(rnd, STATUSES)
+
+    record.setValue('country', country)
+    record.setValue('unit', unit)
+    record.setValue('value', value)
+    record.setValue('year', year)
+    record.setValue('status', status)
+    record.setValue('title', "%s %s %s" % (value, unit, year))
+    record.setValue('period', "%s (%d-%d)" % (country, year // 50 * 50, year // 50 * 50 + 49))
+    record.setValue('mint', "%s mint" % country)
+    record.setValue('mintmark', rnd.choice(mints))
+    record.setValue('type', rnd.choice(TYPES))
+    if rnd.random() < 0.2:
+        record.setValue('series', rnd.choice(SERIES))
+        record.setValue('subjectshort', ' '.join(rnd.sample(WORDS, 2)).capitalize())
+    material = weighted(rnd, MATERIALS)
+    record.setValue('material', material)
+    if material in ('Silver', 'Gold'):
+        record.setValue('fineness', rnd.choice((500, 750, 900, 925, 999)))
+    record.setValue('shape', rnd.choice(SHAPES))
+    record.setValue('diameter', round(rnd.uniform(14, 40), 1))
+    record.setValue('weight', round(rnd.uniform(1, 30), 2))
+    record.setValue('mintage', rnd.randrange(1000, 500000000))
+    record.setValue('catalognum1', "KM# %d" % rnd.randrange(1, 2000))
+    record.setValue('quality', weighted(rnd, GRADES))
+    record.setValue('grade', record.value('quality'))
+    record.setValue('obversedesign', ' '.join(rnd.choices(WORDS, k=8)))
+    record.setValue('reversedesign', ' '.join(rnd.choices(WORDS, k=8)))
+    record.setValue('issuedate', randomDate(rnd, year, year))
+
+    if status in OWNED_STATUSES:
+        quantity = rnd.choices((1, 2, 3, 5), (0.85, 0.1, 0.03, 0.02))[0]
+        price = round(rnd.lognormvariate(1.5, 1.2), 2)
+        record.setValue('quantity', quantity)
+        record.setValue('paydate', randomDate(rnd, 2000, 2024))
+        record.setValue('payprice', price)
+        record.setValue('totalpayprice', round(price * quantity * 1.05, 2))
+        record.setValue('saller', "Seller %d" % rnd.randrange(50))
+        record.setValue('payplace', rnd.choice(PLACES))
+        record.setValue('storage', "Album %d" % rnd.randrange(1, 20))
+    if status == 'sold':
+        price = round(rnd.lognormvariate(2, 1), 2)
+        record.setValue('saledate', randomDate(rnd, 2010, 2024))
+        record.setValue('saleprice', price)
+        record.setValue('totalsaleprice', price)
+        record.setValue('buyer', "Buyer %d" % rnd.randrange(50))
+        record.setValue('saleplace', rnd.choice(PLACES))
+    if rnd.random() < 0.1:
+        record.setValue('note', ' '.join(rnd.choices(WORDS, k=30)))
+
+
+def generateCollection(fileName, coins=1000, photos=200, photo_size=800,
+                       tags=10, seed=1):
+    from OpenNumismat.Collection.Collection import Collection
+
+    if os.path.exists(fileName):
+        os.remove(fileName)
+
+    rnd = random.Random(seed)
+
+    collection = Collection()
+    if not collection.create(fileName):
+        raise RuntimeError("Can't create collection %s" % fileName)
+    collection.loadReference(os.path.join(tempfile.mkdtemp(), 'reference.ref'))
+    if not collection.pages().pagesParam():
+        collection.pages().addPage(collection.getCollectionName())
+
+    model = collection.model()
+
+    tag_ids = []
+    tag_query = QSqlQuery(collection.db)
+    tag_query.prepare("INSERT INTO tags (tag, parent_id, position) VALUES (?, NULL, ?)")
+    for position in range(tags):
+        tag_query.addBindValue("Tag %d" % (position + 1))
+        tag_query.addBindValue(position)
+        tag_query.exec_()
+        tag_ids.append(tag_query.lastInsertId())
+
+    images = makePhotos(photos, photo_size, rnd) if photos else []
+
+    def records():
+        for i in range(coins):
+            record = model.record()
+            fillRecord(record, rnd)
+            # Each photo is used once: first coins get obverse and reverse
+            if 2 * i < len(images):
+                record.setValue('obverseimg', images[2 * i])
+            if 2 * i + 1 < len(images):
+                record.setValue('reverseimg', images[2 * i + 1])
+            if tag_ids:
+                record.setValue('tags', rnd.sample(tag_ids, rnd.choice((0, 0, 1, 1, 2))))
+            else:
+                record.setValue('tags', [])
+            yield record
+
+    model.appendRecords(records())
+
+    closeCollection(collection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic collection")
+    parser.add_argument('file', help="collection file to create")
+    parser.add_argument('--coins', type=int, default=1000)
+    parser.add_argument('--photos', type=int, default=200)
+    parser.add_argument('--photo-size', type=int, default=800,
+                        help="side of photo in pixels")
+    parser.add_argument('--tags', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = initApplication()
+    generateCollection(args.file, args.coins, args.photos, args.photo_size,
+                       args.tags, args.seed)
+    del app
+
+
+if __name__ == '__main__':
+    main()
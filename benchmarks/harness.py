@@ -0,0 +1,220 @@
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+
+# Benchmarks don't need a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6 import __version__ as PYSIDE_VERSION
+from PySide6.QtCore import QCoreApplication, QDateTime, Qt, qVersion
+from PySide6.QtSql import QSqlQuery
+from PySide6.QtWidgets import QApplication, QFileDialog, QMessageBox
+
+APP_NAME = 'OpenNumismatBenchmarks'
+
+
+def initApplication():
+    app = QApplication.instance()
+    if app:
+        return app
+
+    # Like in main, web engine is imported after application is started
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv)
+
+    # Own settings, so benchmarks use defaults and don't touch settings of
+    # user
+    QCoreApplication.setOrganizationName(APP_NAME)
+    QCoreApplication.setApplicationName(APP_NAME)
+
+    from OpenNumismat.pathes import init_pathes
+    init_pathes()
+
+    from OpenNumismat.Tools import TemporaryDir
+    TemporaryDir.init(APP_NAME)
+
+    from OpenNumismat import resources  # noqa: F401
+
+    makeHeadless()
+
+    return app
+
+
+def makeHeadless():
+    # Modal dialogs would block benchmarks: questions are accepted and
+    # messages only printed
+    def message(default):
+        def show(_parent, title, text, *_args, **_kws):
+            print("[%s] %s" % (title, text))
+            return default
+        return staticmethod(show)
+
+    QMessageBox.information = message(QMessageBox.Ok)
+    QMessageBox.warning = message(QMessageBox.Ok)
+    QMessageBox.critical = message(QMessageBox.Ok)
+    QMessageBox.question = message(QMessageBox.Yes)
+
+
+class SaveFileName():
+    # Answer of file dialog inside of with statement
+    def __init__(self, fileName):
+        self.fileName = fileName
+
+    def __enter__(self):
+        self.getSaveFileName = QFileDialog.getSaveFileName
+        QFileDialog.getSaveFileName = staticmethod(
+            lambda *_args, **_kws: (self.fileName, ''))
+        return self
+
+    def __exit__(self, *_args):
+        QFileDialog.getSaveFileName = self.getSaveFileName
+
+
+def processEvents(collection=None):
+    # Wait for queries in read pool and deliver their results
+    if collection and collection.readPool:
+        collection.readPool.waitForDone()
+    QCoreApplication.processEvents()
+    QCoreApplication.processEvents()
+
+
+def closeCollection(collection):
+    if collection.readPool:
+        collection.readPool.close()
+    collection.db.close()
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Skip(Exception):
+    # Benchmark can't run in current environment
+    pass
+
+
+class Benchmark():
+    def __init__(self, name, func, setup=None, teardown=None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.teardown = teardown
+
+
+class Runner():
+    def __init__(self, workDir, baseFile, reference, params, repeat=3):
+        self.workDir = workDir
+        self.baseFile = baseFile
+        self.reference = reference
+        self.params = params
+        self.repeat = repeat
+
+        self.results = {}
+        self.skipped = {}
+        self._copies = 0
+        self._collection = None
+        self._sqliteVersion = None
+
+    def openCollection(self, fileName):
+        # Like main window, one object is used for all opened collections
+        from OpenNumismat.Collection.Collection import Collection
+
+        if not self._collection:
+            self._collection = Collection()
+        if not self._collection.open(fileName):
+            raise RuntimeError("Can't open collection %s" % fileName)
+        self._collection.loadReference(self.reference)
+
+        if not self._sqliteVersion:
+            query = QSqlQuery("SELECT sqlite_version()", self._collection.db)
+            if query.first():
+                self._sqliteVersion = query.value(0)
+
+        return self._collection
+
+    def copyCollection(self):
+        # Each run works with own copy, so changes made by benchmark don't
+        # affect next ones
+        self._copies += 1
+        fileName = os.path.join(self.workDir, 'run_%d.db' % self._copies)
+        shutil.copyfile(self.baseFile, fileName)
+        return fileName
+
+    def run(self, benchmark):
+        times = []
+        extra = {}
+        for _ in range(self.repeat):
+            context = {'runner': self, 'extra': extra}
+            try:
+                if benchmark.setup:
+                    benchmark.setup(context)
+
+                start = time.perf_counter()
+                benchmark.func(context)
+                times.append(time.perf_counter() - start)
+            except Skip as skip:
+                self.skipped[benchmark.name] = str(skip)
+                print("%-32s skipped: %s" % (benchmark.name, skip))
+                return
+            except Exception:
+                traceback.print_exc()
+                self.skipped[benchmark.name] = "failed"
+                print("%-32s failed" % benchmark.name)
+                return
+            finally:
+                if benchmark.teardown:
+                    benchmark.teardown(context)
+
+        self.results[benchmark.name] = dict(extra, **{
+            'times': times,
+            'min': min(times),
+            'median': statistics.median(times),
+        })
+        print("%-32s %10.4f s (median %.4f s)" % (
+            benchmark.name, min(times), statistics.median(times)))
+
+    def report(self):
+        return {
+            'createdat': QDateTime.currentDateTimeUtc().toString(Qt.ISODateWithMs),
+            'environment': {
+                'python': platform.python_version(),
+                'pyside': PYSIDE_VERSION,
+                'qt': qVersion(),
+                'sqlite': self._sqliteVersion,
+                'python_sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'machine': platform.machine(),
+                'revision': revision(),
+            },
+            'parameters': dict(self.params, repeat=self.repeat),
+            'results': self.results,
+            'skipped': self.skipped,
+        }
+
+    def save(self, fileName):
+        with open(fileName, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
+
+
+def compare(baseline, current):
+    # Ratio of min times, more than 1 is slower than baseline
+    base_results = baseline['results']
+    print("%-32s %10s %10s %8s" % ("benchmark", "baseline", "current", "ratio"))
+    for name, result in current['results'].items():
+        if name in base_results:
+            base_time = base_results[name]['min']
+            print("%-32s %10.4f %10.4f %8.2f" % (
+                name, base_time, result['min'],
+                result['min'] / base_time if base_time else 0))
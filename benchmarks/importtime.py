@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Import time of modules loaded before main window is shown. Interpreter is
+# started with -X importtime, so each run is a cold start of a new process.
+# Usage: python -m benchmarks.importtime [--repeat N] [--output imports.json]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+STARTUP_MODULE = 'OpenNumismat.main'
+SUBSYSTEMS = (
+    # name, modules with their submodules
+    ('web engine', ('PySide6.QtWebEngineCore', 'PySide6.QtWebEngineWidgets',
+                    'PySide6.QtWebChannel')),
+    ('charts', ('PySide6.QtCharts',)),
+    ('qt', ('PySide6', 'shiboken6', 'shibokensupport')),
+    ('image search', ('cv2', 'numpy', 'PIL', 'imagehash', 'scipy', 'pywt')),
+    ('reports', ('jinja2', 'markupsafe', 'openpyxl', 'et_xmlfile', 'lxml',
+                 'xlrd', 'xlwt')),
+    ('opennumismat', ('OpenNumismat',)),
+)
+OTHER = 'other'
+
+
+def subsystem(module):
+    for name, packages in SUBSYSTEMS:
+        for package in packages:
+            if module == package or module.startswith(package + '.'):
+                return name
+
+    return OTHER
+
+
+def parse(output):
+    # Lines look like "import time:  self [us] | cumulative | module", module
+    # is indented by nesting level
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        modules.append((parts[2].strip(), int(parts[0]) / 1000000))
+
+    return modules
+
+
+def summarize(modules):
+    # Own times of modules give total without counting nested imports twice
+    subsystems = {name: 0. for name, _packages in SUBSYSTEMS}
+    subsystems[OTHER] = 0.
+    for module, self_time in modules:
+        subsystems[subsystem(module)] += self_time
+
+    return {
+        'total': sum(subsystems.values()),
+        'subsystems': subsystems,
+        'modules': len(modules),
+    }
+
+
+def measureImports(module=STARTUP_MODULE):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        capture_output=True, text=True, cwd=root)
+    if process.returncode:
+        errors = process.stderr.strip().splitlines()
+        raise RuntimeError("Can't import %s: %s" % (
+            module, errors[-1] if errors else process.returncode))
+
+    modules = parse(process.stderr)
+    return modules, summarize(modules)
+
+
+def printSummary(summary, modules=(), top=0):
+    print("%-16s %10s %6s" % ("subsystem", "ms", "%"))
+    total = summary['total']
+    for name, value in sorted(summary['subsystems'].items(),
+                              key=lambda item: item[1], reverse=True):
+        print("%-16s %10.1f %6.1f" % (
+            name, value * 1000, value / total * 100 if total else 0))
+    print("%-16s %10.1f" % ("total", total * 1000))
+
+    if top:
+        print()
+        print("%-48s %10s" % ("module", "self, ms"))
+        for module, self_time in sorted(modules, key=lambda item: item[1],
+                                        reverse=True)[:top]:
+            print("%-48s %10.1f" % (module, self_time * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.importtime',
+                                     description="Measure startup imports")
+    parser.add_argument('--module', default=STARTUP_MODULE)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=20,
+                        help="show slowest modules")
+    parser.add_argument('--output', help="save results to JSON file")
+    args = parser.parse_args()
+
+    # Fastest run has least noise from other processes
+    runs = [measureImports(args.module) for _ in range(args.repeat)]
+    modules, summary = min(runs, key=lambda run: run[1]['total'])
+    summary['runs'] = [run[1]['total'] for run in runs]
+
+    printSummary(summary, modules, args.top)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(dict(summary, module=args.module), file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
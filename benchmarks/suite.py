@@ -0,0 +1,375 @@
+import importlib.util
+import os
+import random
+import shutil
+
+from PySide6.QtCore import Qt
+
+import OpenNumismat
+from benchmarks.generator import fillRecord
+from benchmarks.harness import (Benchmark, Skip, SaveFileName, processEvents,
+                                closeCollection)
+from benchmarks.importtime import measureImports
+
+STATISTICS_CHARTS = (
+    # name, chart, items
+    ('bar', 'bar', None),
+    ('barh', 'barh', None),
+    ('pie', 'pie', None),
+    ('stacked', 'stacked', None),
+    ('progress', 'progress', 'paydate'),
+    ('area_status', 'area', 'status'),
+    ('area_year', 'area', 'year'),
+    ('geochart', 'geochart', None),
+)
+QUICK_SEARCH_TEXT = 'eagle'
+REPORT_TEMPLATE = 'full'
+
+
+def removeCollection(fileName):
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(fileName + suffix):
+            os.remove(fileName + suffix)
+
+
+def openCopy(context):
+    runner = context['runner']
+    context['file'] = runner.copyCollection()
+    context['collection'] = runner.openCollection(context['file'])
+
+
+def openModel(context):
+    openCopy(context)
+    model = context['collection'].model()
+    model.select()
+    context['model'] = model
+
+
+def fetchAll(model):
+    while model.canFetchMore():
+        model.fetchMore()
+
+
+def pageParam(collection):
+    # Filled like in TabView
+    param = collection.pages().pagesParam()[0]
+    param.images_at_bottom = collection.settings['images_at_bottom']
+    param.treeParam.convert_fraction = collection.settings['convert_fraction']
+    return param
+
+
+def cleanup(context):
+    if 'views' in context:
+        for view in context['views']:
+            view.deleteLater()
+        processEvents()
+    if 'collection' in context:
+        closeCollection(context['collection'])
+    for fileName in context.get('files', []) + [context.get('file')]:
+        if fileName:
+            removeCollection(fileName)
+    for path in context.get('dirs', []):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+# startup
+
+def benchStartupImports(context):
+    # New process, so this is a cold start time of interpreter and imports
+    try:
+        _modules, summary = measureImports()
+    except RuntimeError as error:
+        raise Skip(str(error))
+    context['extra']['imports'] = summary['subsystems']
+
+
+# open
+
+def setupOpen(context):
+    context['file'] = context['runner'].copyCollection()
+
+
+def benchOpen(context):
+    context['collection'] = context['runner'].openCollection(context['file'])
+
+
+# select
+
+def benchSelect(context):
+    context['model'].select()
+
+
+def benchSelectAll(context):
+    model = context['model']
+    model.select()
+    fetchAll(model)
+    context['extra']['rows'] = model.rowCount()
+
+
+# model data
+
+def setupModelData(context):
+    from OpenNumismat.Collection.CollectionFields import FieldTypes as Type
+
+    openModel(context)
+    model = context['model']
+    fetchAll(model)
+
+    # Images are excluded, their loading is not a formatting
+    columns = [field.id for field in model.fields.fields
+               if field.type not in Type.ImageTypes]
+    context['indexes'] = [model.index(row, column)
+                          for row in range(model.rowCount()) for column in columns]
+    context['extra']['cells'] = len(context['indexes'])
+
+
+def benchModelData(context):
+    model = context['model']
+    for index in context['indexes']:
+        model.data(index, Qt.DisplayRole)
+
+
+def setupImageData(context):
+    from OpenNumismat.Collection.CollectionFields import FieldTypes as Type
+
+    openModel(context)
+    model = context['model']
+    fetchAll(model)
+
+    columns = [field.id for field in model.fields.fields
+               if field.type == Type.Image]
+    context['indexes'] = [model.index(row, column)
+                          for row in range(model.rowCount()) for column in columns]
+    model.imageCache.resetStatistics()
+
+
+def benchImageData(context):
+    # Second pass is like scrolling back to already viewed coins
+    model = context['model']
+    for _ in range(2):
+        for index in context['indexes']:
+            model.data(index, Qt.DisplayRole)
+
+    context['extra']['image_cache'] = {
+        'hits': model.imageCache.hits,
+        'misses': model.imageCache.misses,
+        'hit_ratio': model.imageCache.hitRatio(),
+    }
+
+
+# header filter
+
+def setupListView(context):
+    from OpenNumismat.ListView import ListView
+
+    openModel(context)
+    param = pageParam(context['collection'])
+    view = ListView(param.listParam)
+    view.setModel(context['model'])
+    context['view'] = view
+    context['views'] = [view]
+
+
+def benchHeaderFilterMenus(context):
+    buttons = context['view'].headerButtons
+    for button in buttons:
+        button.prepareMenu()
+    context['extra']['columns'] = len(buttons)
+
+
+def setupHeaderFilterApply(context):
+    setupListView(context)
+    for button in context['view'].headerButtons:
+        if button.columnName == 'country':
+            button.prepareMenu()
+            context['button'] = button
+            return
+
+    raise Skip("column country is hidden")
+
+
+def benchHeaderFilterApply(context):
+    # Exclude first country, then remove filter
+    button = context['button']
+    button.listWidget.item(1).setCheckState(Qt.Unchecked)
+    button.apply()
+    button.listWidget.item(0).setCheckState(Qt.Checked)
+    button.apply()
+
+
+# quick search
+
+def benchQuickSearch(context):
+    # Text is typed by one letter
+    view = context['view']
+    for i in range(1, len(QUICK_SEARCH_TEXT) + 1):
+        view.search(QUICK_SEARCH_TEXT[:i])
+    view.search('')
+
+
+# tree
+
+def setupTree(context):
+    from OpenNumismat.TreeView import TreeView
+
+    openModel(context)
+    collection = context['collection']
+    view = TreeView(pageParam(collection).treeParam)
+    view.setModel(context['model'], collection.reference)
+    context['view'] = view
+    context['views'] = [view]
+
+
+def benchTree(context):
+    view = context['view']
+    view.modelChanged()
+    root = view.topLevelItem(0)
+    count = root.childCount()
+    for i in range(root.childCount()):
+        view.expandItem(root.child(i))
+        count += root.child(i).childCount()
+    context['extra']['items'] = count
+
+
+# statistics
+
+def setupStatistics(chart, items):
+    def setup(context):
+        from OpenNumismat.StatisticsView import StatisticsView
+
+        openModel(context)
+        param = pageParam(context['collection']).statisticsParam
+        param['chart'] = chart
+        if items:
+            param['items'] = items
+        view = StatisticsView(param)
+        view.setModel(context['model'])
+        context['view'] = view
+        context['views'] = [view]
+
+    return setup
+
+
+def benchStatistics(context):
+    context['view'].modelChanged()
+    processEvents(context['collection'])
+
+
+# summary
+
+def benchSummary(context):
+    from OpenNumismat.SummaryDialog import SummaryDialog
+
+    dialog = SummaryDialog(context['model'])
+    context['views'] = [dialog]
+
+
+# export
+
+def benchExportJson(context):
+    fileName = context['file'] + '.json'
+    context['files'] = [fileName]
+    context['dirs'] = [context['file'] + '_images']
+    with SaveFileName(fileName):
+        context['collection'].exportToJson()
+
+
+def benchExportMobile(context):
+    from OpenNumismat.Collection.Export import ExportDialog
+
+    fileName = context['file'] + '.mobile.db'
+    context['files'] = [fileName]
+    params = {'file': fileName, 'filter': '', 'density': 'XHDPI',
+              'image': ExportDialog.IMAGE_BOTH, 'fullimage': False}
+    context['collection'].exportToMobile(params)
+
+
+# report
+
+def setupReport(context):
+    if not importlib.util.find_spec('jinja2'):
+        raise Skip("jinja2 module missed")
+
+    openModel(context)
+    model = context['model']
+    fetchAll(model)
+    context['indexes'] = [model.index(row, 0) for row in range(model.rowCount())]
+    context['dirs'] = [context['file'] + '_report']
+    os.makedirs(context['dirs'][0])
+
+
+def benchReport(context):
+    from OpenNumismat.Reports.Report import Report
+
+    template = os.path.join(OpenNumismat.PRJ_PATH, 'templates', REPORT_TEMPLATE)
+    report = Report(context['model'], template, context['dirs'][0])
+    report.generate(context['indexes'], True)
+
+
+# merge
+
+def setupMerge(context):
+    # Source collection is a copy with changed, added and deleted coins
+    runner = context['runner']
+    srcFile = runner.copyCollection()
+    context['files'] = [srcFile]
+
+    src = runner.openCollection(srcFile)
+    model = src.model()
+    coins = runner.params['coins']
+    rnd = random.Random(runner.params['seed'] + 1)
+
+    db = src.db
+    db.transaction()
+    db.exec("UPDATE coins SET title=title || ' *',"
+            " updatedat=strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+            " WHERE id % 10 = 0")
+    db.exec("DELETE FROM coins WHERE id % 50 = 1")
+    db.commit()
+
+    def records():
+        for _ in range(max(coins // 20, 1)):
+            record = model.record()
+            fillRecord(record, rnd)
+            record.setValue('tags', [])
+            yield record
+    model.appendRecords(records())
+
+    closeCollection(src)
+
+    openCopy(context)
+    context['src'] = srcFile
+
+
+def benchMerge(context):
+    context['collection'].merge(context['src'])
+
+
+# images
+
+def benchRecalculateImages(context):
+    context['model'].recalculateAllImages()
+
+
+BENCHMARKS = [
+    Benchmark('startup_imports', benchStartupImports),
+    Benchmark('open', benchOpen, setupOpen, cleanup),
+    Benchmark('select', benchSelect, openModel, cleanup),
+    Benchmark('select_fetch_all', benchSelectAll, openModel, cleanup),
+    Benchmark('model_data', benchModelData, setupModelData, cleanup),
+    Benchmark('image_data', benchImageData, setupImageData, cleanup),
+    Benchmark('header_filter_menus', benchHeaderFilterMenus, setupListView, cleanup),
+    Benchmark('header_filter_apply', benchHeaderFilterApply, setupHeaderFilterApply, cleanup),
+    Benchmark('quick_search', benchQuickSearch, setupListView, cleanup),
+    Benchmark('tree_expansion', benchTree, setupTree, cleanup),
+] + [
+    Benchmark('statistics_' + name, benchStatistics, setupStatistics(chart, items), cleanup)
+    for name, chart, items in STATISTICS_CHARTS
+] + [
+    Benchmark('summary', benchSummary, openModel, cleanup),
+    Benchmark('export_json', benchExportJson, openModel, cleanup),
+    Benchmark('export_mobile', benchExportMobile, openModel, cleanup),
+    Benchmark('report', benchReport, setupReport, cleanup),
+    Benchmark('merge', benchMerge, setupMerge, cleanup),
+    Benchmark('recalculate_images', benchRecalculateImages, openModel, cleanup),
+]
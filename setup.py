@@ -144,7 +144,7 @@ params = {
 
     "py_modules": ['open-numismat', ],
 
-    "packages": find_packages() + [
+    "packages": find_packages(exclude=["benchmarks", "benchmarks.*"]) + [
         'OpenNumismat/db'] +
           templates_packages,
 
@@ -0,0 +1,80 @@
+import gc
+import itertools
+import os
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import pytest
+from PySide6.QtCore import QCoreApplication, QSettings
+from PySide6.QtSql import QSqlDatabase
+from PySide6.QtWidgets import QApplication, QMessageBox
+
+_connections = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # Settings of tests don't touch settings of installed application
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope,
+                      str(tmp_path_factory.mktemp('settings')))
+    QCoreApplication.setOrganizationName('OpenNumismatTests')
+    QCoreApplication.setApplicationName('OpenNumismatTests')
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    # Questions are confirmed, shown messages are collected
+    shown = []
+
+    def message(answer):
+        def show(_parent, title, text, *_args, **_kwargs):
+            shown.append((title, text))
+            return answer
+        return show
+
+    monkeypatch.setattr(QMessageBox, 'information', message(QMessageBox.Ok))
+    monkeypatch.setattr(QMessageBox, 'warning', message(QMessageBox.Ok))
+    monkeypatch.setattr(QMessageBox, 'critical', message(QMessageBox.Ok))
+    monkeypatch.setattr(QMessageBox, 'question', message(QMessageBox.Yes))
+
+    return shown
+
+
+@pytest.fixture
+def db(app, tmp_path):
+    name = 'test_%d' % next(_connections)
+    db = QSqlDatabase.addDatabase('QSQLITE', name)
+    db.setDatabaseName(str(tmp_path / 'test.db'))
+    assert db.open()
+
+    yield db
+
+    db.close()
+    del db
+    QSqlDatabase.removeDatabase(name)
+
+
+@pytest.fixture(scope='session')
+def _collection(app):
+    from OpenNumismat.Collection.Collection import Collection
+
+    # Like main window, one object is used for all opened collections
+    return Collection()
+
+
+@pytest.fixture
+def collection(_collection, messages, tmp_path):
+    collection = _collection
+    assert collection.create(str(tmp_path / 'collection.db'))
+    collection.loadReference(str(tmp_path / 'reference.ref'))
+
+    yield collection
+
+    collection.close()
+    # Objects left from closed collection are found here instead of in
+    # some later test
+    gc.collect()
+
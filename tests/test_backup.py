@@ -0,0 +1,179 @@
+import os
+import sqlite3
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtSql import QSqlQuery
+
+from OpenNumismat.Collection.Backup import BackupCatalog, BackupThread
+from OpenNumismat.Settings import Settings
+
+
+def backupFile(directory, name):
+    path = directory / name
+    path.write_bytes(b'backup')
+    return str(path)
+
+
+def catalogFiles(db):
+    query = QSqlQuery("SELECT file FROM backups ORDER BY createdat", db)
+    result = []
+    while query.next():
+        result.append(query.value(0))
+    return result
+
+
+def addBackup(db, fileName, createdat, auto):
+    query = QSqlQuery(db)
+    query.prepare("INSERT INTO backups (file, createdat, auto) VALUES (?, ?, ?)")
+    query.addBindValue(fileName)
+    query.addBindValue(createdat)
+    query.addBindValue(auto)
+    assert query.exec_()
+
+
+@pytest.fixture
+def backupDir(tmp_path):
+    directory = tmp_path / 'backup'
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def catalog(db, backupDir):
+    QSqlQuery("CREATE TABLE coins (id INTEGER PRIMARY KEY, updatedat TEXT)", db)
+    catalog = BackupCatalog(db)
+    catalog.create(str(backupDir), 'coins')
+    return catalog
+
+
+def test_create_registers_existing_backups(db, backupDir):
+    old = backupFile(backupDir, 'coins_190101120000.db')
+    new = backupFile(backupDir, 'coins_200101120000.db')
+    backupFile(backupDir, 'other_200101120000.db')
+    backupFile(backupDir, 'coins_backup.db')
+
+    catalog = BackupCatalog(db)
+    catalog.create(str(backupDir), 'coins')
+
+    assert catalogFiles(db) == [old, new]
+    assert catalog.latest().startswith('2020-01-01')
+
+
+def test_add_and_remove(db, catalog, backupDir):
+    QSqlQuery("INSERT INTO coins (updatedat) VALUES ('2020-01-01T00:00:00.000')", db)
+    fileName = backupFile(backupDir, 'coins_200101120000.db')
+
+    backup_id = catalog.add(fileName, True)
+    assert backup_id is not None
+
+    query = QSqlQuery("SELECT coins_count, updatedat, auto FROM backups", db)
+    query.first()
+    assert [query.value(i) for i in range(3)] == [1, '2020-01-01T00:00:00.000', 1]
+
+    catalog.remove(backup_id)
+    assert catalogFiles(db) == []
+
+
+def test_add_without_catalog(db, backupDir):
+    QSqlQuery("CREATE TABLE coins (id INTEGER PRIMARY KEY, updatedat TEXT)", db)
+    catalog = BackupCatalog(db)
+
+    assert catalog.add(backupFile(backupDir, 'coins_200101120000.db'), True) is None
+    catalog.remove(None)
+
+
+def test_latest_skips_deleted_files(db, catalog, backupDir):
+    addBackup(db, backupFile(backupDir, 'first.db'), '2020-01-01T00:00:00.000', 1)
+    addBackup(db, str(backupDir / 'deleted.db'), '2021-01-01T00:00:00.000', 1)
+
+    assert catalog.latest() == '2020-01-01T00:00:00.000'
+
+
+def test_prune_keeps_latest_autobackups(db, catalog, backupDir):
+    files = []
+    for year in range(2020, 2025):
+        files.append(backupFile(backupDir, 'auto_%d.db' % year))
+        addBackup(db, files[-1], '%d-01-01T00:00:00.000' % year, 1)
+    manual = backupFile(backupDir, 'manual.db')
+    addBackup(db, manual, '2019-01-01T00:00:00.000', 0)
+
+    assert catalog.prune(2) == 3
+
+    assert catalogFiles(db) == [manual] + files[-2:]
+    assert sorted(path.name for path in backupDir.iterdir()) == [
+        'auto_2023.db', 'auto_2024.db', 'manual.db']
+
+
+def test_prune_with_missing_files(db, catalog, backupDir):
+    addBackup(db, str(backupDir / 'deleted.db'), '2020-01-01T00:00:00.000', 1)
+    addBackup(db, backupFile(backupDir, 'auto.db'), '2021-01-01T00:00:00.000', 1)
+
+    assert catalog.prune(1) == 1
+    assert catalogFiles(db) == [str(backupDir / 'auto.db')]
+
+
+@pytest.fixture
+def backupSettings(tmp_path):
+    settings = Settings(autoSave=True)
+    old = settings['backup']
+    settings['backup'] = str(tmp_path / 'backups')
+
+    yield settings
+
+    settings['backup'] = old
+
+
+def waitBackups():
+    # Finishing of thread is handled by GUI thread
+    BackupThread.waitAll()
+    while BackupThread._threads:
+        QCoreApplication.processEvents()
+
+
+def failPartway(monkeypatch):
+    def progress(_thread, _status, remaining, total):
+        if remaining < total:
+            raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(BackupThread, 'PAGES_STEP', 1)
+    monkeypatch.setattr(BackupThread, '_BackupThread__progress', progress)
+
+
+def test_backup_is_registered_when_done(collection, backupSettings):
+    assert collection.backup()
+
+    files = catalogFiles(collection.db)
+    assert len(files) == 1
+    assert os.path.exists(files[0])
+
+
+def test_background_backup_is_registered_when_done(collection, backupSettings):
+    assert collection.backup(background=True)
+    waitBackups()
+
+    files = catalogFiles(collection.db)
+    assert len(files) == 1
+    assert os.path.exists(files[0])
+
+
+def test_failed_backup_isnt_registered(collection, messages, backupSettings,
+                                      monkeypatch):
+    failPartway(monkeypatch)
+
+    assert not collection.backup()
+
+    assert catalogFiles(collection.db) == []
+    assert os.listdir(backupSettings['backup']) == []
+    assert messages[-1][0] == "Backup collection"
+
+
+def test_failed_background_backup_isnt_registered(collection, backupSettings,
+                                                  monkeypatch):
+    failPartway(monkeypatch)
+
+    assert collection.backup(background=True)
+    waitBackups()
+
+    assert catalogFiles(collection.db) == []
+    assert os.listdir(backupSettings['backup']) == []
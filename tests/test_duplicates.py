@@ -0,0 +1,141 @@
+import pytest
+from PySide6.QtSql import QSqlQuery
+
+from OpenNumismat.Collection.Duplicates import Duplicates, NUMERIC_FIELDS, SIGNATURE_FIELDS
+
+
+def coinValues(title):
+    values = {field: field for field in SIGNATURE_FIELDS}
+    values.update(title=title, value=10, year=2000, payprice=5.5, saleprice=7,
+                  paydate='2020-01-01', saledate='2021-01-01')
+    return values
+
+
+def addCoin(model, **values):
+    record = model.record()
+    for field, value in values.items():
+        record.setValue(field, value)
+    model.appendRecord(record)
+
+
+def coinRecord(model, title):
+    query = QSqlQuery(model.database())
+    query.prepare("SELECT * FROM coins WHERE title=?")
+    query.addBindValue(title)
+    query.exec_()
+    query.first()
+    return query.record()
+
+
+def filtered(db, duplicates):
+    query = QSqlQuery("SELECT title FROM coins WHERE %s ORDER BY id" % duplicates.filter(), db)
+    result = []
+    while query.next():
+        result.append(query.value(0))
+    return result
+
+
+@pytest.fixture(params=[True, False], ids=['indexed', 'direct'])
+def duplicates(request, collection):
+    duplicates = Duplicates(collection.db)
+    assert duplicates.indexed
+    # Collections before version 10 have no signatures
+    duplicates.indexed = request.param
+    return duplicates
+
+
+def test_similar_coin_exists(collection, duplicates):
+    model = collection.model()
+    addCoin(model, **coinValues('a'))
+    addCoin(model, **coinValues('b'))
+
+    record = coinRecord(model, 'a')
+    # Coin itself isn't similar
+    assert not duplicates.isExist(record)
+
+    record.setNull('id')
+    assert duplicates.isExist(record)
+
+    record.setValue('title', 'c')
+    assert not duplicates.isExist(record)
+
+
+@pytest.mark.parametrize('field', ('country', 'year'))
+def test_coins_differ_by_one_field(collection, duplicates, field):
+    model = collection.model()
+    addCoin(model, **coinValues('a'))
+    values = coinValues('a')
+    values[field] = 1999 if field in NUMERIC_FIELDS else 'other'
+    addCoin(model, **values)
+
+    record = coinRecord(model, 'a')
+    record.setNull('id')
+    record.setValue(field, 1998 if field in NUMERIC_FIELDS else 'another')
+    assert not duplicates.isExist(record)
+    assert duplicates.count() == (0, 0)
+
+
+def test_empty_and_null_fields_are_equal(collection, duplicates):
+    model = collection.model()
+    values = coinValues('a')
+    values.pop('mint')
+    addCoin(model, **values)
+    values['mint'] = ''
+    addCoin(model, **values)
+
+    record = coinRecord(model, 'a')
+    record.setNull('id')
+    assert duplicates.isExist(record)
+    assert duplicates.count() == (1, 2)
+
+
+def test_case_and_spaces_are_ignored(collection, duplicates):
+    model = collection.model()
+    addCoin(model, **coinValues('Half  Dollar'))
+    values = coinValues(' half dollar ')
+    values['country'] = 'COUNTRY'
+    addCoin(model, **values)
+
+    assert duplicates.count() == (1, 2)
+    assert filtered(collection.db, duplicates) == ['Half  Dollar', ' half dollar ']
+
+
+def test_equal_numbers_with_different_text(collection, duplicates):
+    model = collection.model()
+    addCoin(model, **coinValues('a'))
+    values = coinValues('a')
+    values.update(value='10.0', payprice='5.50')
+    addCoin(model, **values)
+
+    assert duplicates.count() == (1, 2)
+
+
+def test_signature_is_fixed_size():
+    short = Duplicates.signature(['a'] * len(SIGNATURE_FIELDS))
+    long_ = Duplicates.signature(['a' * 1000] * len(SIGNATURE_FIELDS))
+
+    assert -2 ** 63 <= short < 2 ** 63
+    assert -2 ** 63 <= long_ < 2 ** 63
+    assert short != long_
+
+
+def test_groups_of_similar_coins(collection, duplicates):
+    model = collection.model()
+    for title in ('a', 'b', 'a', 'a', 'b', 'c'):
+        addCoin(model, **coinValues(title))
+
+    assert duplicates.count() == (2, 5)
+    assert filtered(collection.db, duplicates) == ['a', 'b', 'a', 'a', 'b']
+
+
+def test_signature_follows_changes(collection, duplicates):
+    model = collection.model()
+    addCoin(model, **coinValues('a'))
+    addCoin(model, **coinValues('b'))
+    assert duplicates.count() == (0, 0)
+
+    QSqlQuery("UPDATE coins SET title='a' WHERE title='b'", collection.db)
+    assert duplicates.count() == (1, 2)
+
+    QSqlQuery("DELETE FROM coins WHERE id=(SELECT MAX(id) FROM coins)", collection.db)
+    assert duplicates.count() == (0, 0)
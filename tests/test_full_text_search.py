@@ -0,0 +1,57 @@
+from PySide6.QtWidgets import QMessageBox
+
+
+def enableIndex(collection):
+    collection.settings['fts_search'] = True
+    collection.settings.save()
+    collection.fullTextSearch.update(True)
+    assert collection.fullTextSearch.active
+
+
+def removeIndex(collection):
+    # Like opening by SQLite without FTS5
+    fullTextSearch = collection.fullTextSearch
+    fullTextSearch.update(False)
+    assert not fullTextSearch.active
+
+
+def reopen(collection, tmp_path):
+    fileName = collection.fileName
+    collection.close()
+    assert collection.open(fileName)
+    collection.loadReference(str(tmp_path / 'reference.ref'))
+
+
+def test_missing_index_is_rebuilt_on_open(collection, messages, tmp_path):
+    enableIndex(collection)
+    removeIndex(collection)
+
+    reopen(collection, tmp_path)
+
+    assert collection.settings['fts_search']
+    assert collection.fullTextSearch.active
+    assert collection.fullTextSearch.filter('coin', ['title']) is not None
+    assert any(title == "Full-text search" for title, _text in messages)
+
+
+def test_missing_index_is_kept_when_rebuild_declined(collection, messages,
+                                                      monkeypatch, tmp_path):
+    enableIndex(collection)
+    removeIndex(collection)
+
+    monkeypatch.setattr(QMessageBox, 'question',
+                        lambda *_args, **_kwargs: QMessageBox.No)
+    reopen(collection, tmp_path)
+
+    assert collection.settings['fts_search']
+    assert not collection.fullTextSearch.active
+    assert collection.fullTextSearch.filter('coin', ['title']) is None
+
+
+def test_existing_index_is_not_rebuilt_on_open(collection, messages, tmp_path):
+    enableIndex(collection)
+
+    reopen(collection, tmp_path)
+
+    assert collection.fullTextSearch.active
+    assert not any(title == "Full-text search" for title, _text in messages)
@@ -0,0 +1,137 @@
+import pytest
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QColor, QImage
+from PySide6.QtSql import QSqlQuery
+
+from OpenNumismat.Collection.ImageCache import ImageCache
+from OpenNumismat.Collection.ImageStorage import ImageStorage
+
+
+def makeImage(color):
+    image = QImage(16, 16, QImage.Format_RGB32)
+    image.fill(QColor(color))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'png')
+    return data
+
+
+def photos(db):
+    # Rows of photos table as {hash: refs}
+    query = QSqlQuery("SELECT hash, refs FROM photos", db)
+    result = {}
+    while query.next():
+        result[query.value(0)] = query.value(1)
+    return result
+
+
+@pytest.fixture
+def storage(db):
+    ImageStorage.createTables(db)
+    return ImageStorage(db, ImageCache(1024 * 1024))
+
+
+def test_same_photo_is_stored_once(storage, db):
+    image = makeImage('red')
+
+    first_id = storage.addPhoto('obverse', image)
+    second_id = storage.addPhoto('obverse', image)
+
+    assert first_id == second_id
+    assert list(photos(db).values()) == [2]
+
+
+def test_photo_with_other_title_is_stored_separately(storage, db):
+    image = makeImage('red')
+
+    first_id = storage.addPhoto('obverse', image)
+    second_id = storage.addPhoto('reverse', image)
+
+    assert first_id != second_id
+    assert sorted(photos(db).values()) == [1, 1]
+
+
+def test_photo_is_removed_with_last_reference(storage, db):
+    img_id = storage.addPhoto(None, makeImage('red'))
+    storage.addPhoto(None, makeImage('red'))
+    storage.cache.set('photos', img_id, (b'data', None), 4)
+
+    storage.removePhoto(img_id)
+    assert list(photos(db).values()) == [1]
+    assert storage.cache.get('photos', img_id)
+
+    storage.removePhoto(img_id)
+    assert photos(db) == {}
+    assert storage.cache.get('photos', img_id) is None
+
+
+def addCoin(model, title, obverse=None, reverse=None):
+    record = model.record()
+    record.setValue('title', title)
+    record.setValue('status', 'owned')
+    if obverse is not None:
+        record.setValue('obverseimg', obverse)
+    if reverse is not None:
+        record.setValue('reverseimg', reverse)
+    model.appendRecord(record)
+
+
+def test_delete_coin_releases_photos(collection):
+    model = collection.model()
+    red = makeImage('red')
+    addCoin(model, 'first', red, makeImage('green'))
+    addCoin(model, 'second', red)
+    assert sorted(photos(collection.db).values()) == [1, 2]
+
+    model.removeRow(0)
+    model.submitAll()
+    assert list(photos(collection.db).values()) == [1]
+
+    model.removeRow(0)
+    model.submitAll()
+    assert photos(collection.db) == {}
+
+
+def test_bulk_delete_releases_photos(collection):
+    model = collection.model()
+    red = makeImage('red')
+    addCoin(model, 'first', red, makeImage('green'))
+    addCoin(model, 'second', red)
+    addCoin(model, 'third', red)
+
+    ids = [model.record(row, False).value('id') for row in range(2)]
+    assert model.removeRecords(ids) == 2
+    assert list(photos(collection.db).values()) == [1]
+
+
+def test_update_coin_releases_old_photo(collection):
+    model = collection.model()
+    red = makeImage('red')
+    blue = makeImage('blue')
+    addCoin(model, 'first', red)
+    addCoin(model, 'second', red)
+
+    record = model.record(0)
+    record.setValue('obverseimg', blue)
+    model.setRecord(0, record)
+    model.submitAll()
+    assert sorted(photos(collection.db).values()) == [1, 1]
+
+    record = model.record(1)
+    record.setValue('obverseimg', blue)
+    model.setRecord(1, record)
+    model.submitAll()
+    assert list(photos(collection.db).values()) == [2]
+
+
+def test_unchanged_coin_keeps_photo(collection):
+    model = collection.model()
+    addCoin(model, 'first', makeImage('red'))
+
+    record = model.record(0)
+    record.setValue('title', 'changed')
+    model.setRecord(0, record)
+    model.submitAll()
+
+    assert list(photos(collection.db).values()) == [1]
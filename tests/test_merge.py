@@ -0,0 +1,191 @@
+import shutil
+
+import pytest
+from PySide6.QtCore import Qt
+from PySide6.QtSql import QSqlQuery
+
+from OpenNumismat.Collection import Collection as CollectionModule
+from OpenNumismat.Collection.ChangeJournal import ChangeJournal
+from OpenNumismat.Collection.Merge import Merge
+
+
+@pytest.fixture
+def merges(monkeypatch):
+    # Values of since used by merges
+    sinces = []
+
+    class TracedMerge(Merge):
+        def __init__(self, db, sort_id_step, since=None):
+            sinces.append(since)
+            super().__init__(db, sort_id_step, since)
+
+    monkeypatch.setattr(CollectionModule, 'Merge', TracedMerge)
+
+    return sinces
+
+
+def openCollection(collection, fileName, tmp_path):
+    assert collection.open(str(fileName))
+    collection.loadReference(str(tmp_path / 'reference.ref'))
+
+    model = collection.model()
+    model.setSort(model.fields.sort_id.id, Qt.AscendingOrder)
+    model.select()
+    return model
+
+
+def addCoin(model, title):
+    record = model.record()
+    record.setValue('title', title)
+    record.setValue('status', 'owned')
+    model.appendRecord(record)
+
+
+def rowOf(model, title):
+    for row in range(model.rowCount()):
+        if model.record(row, False).value('title') == title:
+            return row
+
+    raise KeyError(title)
+
+
+def rename(model, title, new_title):
+    row = rowOf(model, title)
+    record = model.record(row)
+    record.setValue('title', new_title)
+    model.setRecord(row, record)
+    model.submitAll()
+
+
+def remove(model, title):
+    model.removeRow(rowOf(model, title))
+    model.submitAll()
+
+
+def titles(db):
+    query = QSqlQuery("SELECT title FROM coins ORDER BY title", db)
+    result = []
+    while query.next():
+        result.append(query.value(0))
+    return result
+
+
+@pytest.fixture
+def copies(collection, tmp_path):
+    # Collection with 3 coins and its 2 copies
+    model = collection.model()
+    for title in ('a', 'b', 'c'):
+        addCoin(model, title)
+
+    fileName = collection.fileName
+    collection.close()
+
+    files = [fileName]
+    for name in ('copy1.db', 'copy2.db'):
+        files.append(tmp_path / name)
+        shutil.copyfile(fileName, files[-1])
+
+    return files
+
+
+def test_merge_inserts_and_updates(collection, copies, merges, tmp_path):
+    main, copy, _ = copies
+
+    model = openCollection(collection, copy, tmp_path)
+    rename(model, 'b', 'b2')
+    addCoin(model, 'd')
+
+    openCollection(collection, main, tmp_path)
+    assert collection.merge(str(copy))
+
+    assert titles(collection.db) == ['a', 'b2', 'c', 'd']
+    # First merge checks all coins
+    assert merges == [None]
+
+
+def test_second_merge_is_incremental(collection, copies, merges, tmp_path):
+    main, copy, _ = copies
+
+    model = openCollection(collection, copy, tmp_path)
+    rename(model, 'b', 'b2')
+
+    openCollection(collection, main, tmp_path)
+    assert collection.merge(str(copy))
+    peer = ChangeJournal(collection.db).uuid()
+    watermark, _fingerprint = ChangeJournal(collection.db).watermark(peer)
+    assert watermark is not None
+
+    model = openCollection(collection, copy, tmp_path)
+    rename(model, 'c', 'c2')
+    remove(model, 'a')
+    addCoin(model, 'e')
+
+    openCollection(collection, main, tmp_path)
+    assert collection.merge(str(copy))
+
+    assert titles(collection.db) == ['b2', 'c2', 'e']
+    assert merges == [None, watermark]
+
+
+def test_merge_without_changes(collection, copies, merges, messages, tmp_path):
+    main, copy, _ = copies
+
+    openCollection(collection, main, tmp_path)
+    assert not collection.merge(str(copy))
+    assert not collection.merge(str(copy))
+
+    assert titles(collection.db) == ['a', 'b', 'c']
+    assert [text for _title, text in messages].count(
+        "Collections looks like identical") == 2
+    # Identical collections are synchronized too
+    assert merges[0] is None
+    assert merges[1] is not None
+
+
+def test_merge_of_other_copy_checks_all_coins(collection, copies, merges, tmp_path):
+    # Copies have the same journal id, but different changes after copying
+    main, copy1, copy2 = copies
+
+    model = openCollection(collection, copy1, tmp_path)
+    rename(model, 'b', 'b2')
+
+    model = openCollection(collection, copy2, tmp_path)
+    rename(model, 'c', 'c2')
+
+    openCollection(collection, main, tmp_path)
+    assert collection.merge(str(copy1))
+    assert collection.merge(str(copy2))
+
+    assert titles(collection.db) == ['a', 'b2', 'c2']
+    assert merges == [None, None]
+
+
+def test_journal_time_has_format_of_updatedat(collection):
+    model = collection.model()
+    addCoin(model, 'a')
+
+    query = QSqlQuery("SELECT coins.updatedat, changes.changedat FROM coins"
+                      " INNER JOIN changes ON changes.row_id=coins.id", collection.db)
+    assert query.first()
+    updatedat, changedat = query.value(0), query.value(1)
+    assert len(updatedat) == len(changedat)
+    assert changedat.endswith('Z')
+
+
+def test_coin_changed_after_delete_in_copy_is_kept(collection, copies, merges, tmp_path):
+    main, copy, _ = copies
+
+    openCollection(collection, main, tmp_path)
+    assert not collection.merge(str(copy))
+
+    model = openCollection(collection, copy, tmp_path)
+    remove(model, 'a')
+    remove(model, 'b')
+
+    model = openCollection(collection, main, tmp_path)
+    rename(model, 'a', 'a2')
+
+    assert collection.merge(str(copy))
+
+    assert titles(collection.db) == ['a2', 'c']
+    assert merges[1] is not None
@@ -0,0 +1,130 @@
+from PySide6.QtCore import Qt
+from PySide6.QtSql import QSqlQuery
+
+
+def addCoins(model, titles):
+    for title in titles:
+        record = model.record()
+        record.setValue('title', title)
+        record.setValue('status', 'owned')
+        model.appendRecord(record)
+
+
+def sortedModel(collection, filter_=''):
+    # Rows in order of sort_id like in list view
+    model = collection.model()
+    model.setSort(model.fields.sort_id.id, Qt.AscendingOrder)
+    model.setFilter(filter_)
+    model.select()
+    return model
+
+
+def coins(db):
+    query = QSqlQuery("SELECT title, sort_id FROM coins ORDER BY sort_id", db)
+    result = []
+    while query.next():
+        result.append((query.value(0), query.value(1)))
+    return result
+
+
+def titles(db):
+    return ''.join(title for title, _sort_id in coins(db))
+
+
+def test_new_coins_have_gaps(collection):
+    model = sortedModel(collection)
+    addCoins(model, 'abc')
+
+    step = model.SORT_ID_STEP
+    assert coins(collection.db) == [('a', step), ('b', 2 * step), ('c', 3 * step)]
+
+
+def test_move_updates_only_moved_coin(collection):
+    model = sortedModel(collection)
+    addCoins(model, 'abcde')
+    before = dict(coins(collection.db))
+
+    model.moveRows(4, 1)
+
+    assert titles(collection.db) == 'aebcd'
+    after = dict(coins(collection.db))
+    assert [title for title in after if after[title] != before[title]] == ['e']
+
+
+def test_move_down(collection):
+    model = sortedModel(collection)
+    addCoins(model, 'abcde')
+
+    model.moveRows(0, 2)
+
+    assert titles(collection.db) == 'bcade'
+
+
+def test_move_in_filtered_view_keeps_hidden_neighbours(collection):
+    model = sortedModel(collection)
+    addCoins(model, 'abcde')
+
+    model = sortedModel(collection, "title IN ('a', 'c', 'e')")
+    model.moveRows(2, 1)
+    # e is placed right before c, hidden b stays before it
+    assert titles(collection.db) == 'abecd'
+
+    model = sortedModel(collection, "title IN ('a', 'c', 'e')")
+    model.moveRows(0, 2)
+    # a is placed right after c, hidden d stays after it
+    assert titles(collection.db) == 'becad'
+
+
+def test_move_to_end(collection):
+    model = sortedModel(collection)
+    addCoins(model, 'abc')
+
+    model.moveRows(0, -1)
+
+    assert titles(collection.db) == 'bca'
+
+
+def test_renumber_when_gap_is_exhausted(collection, monkeypatch):
+    model = sortedModel(collection)
+    addCoins(model, 'abcde')
+
+    renumbered = []
+    renumberSortIds = type(model).renumberSortIds
+
+    def renumber(self):
+        renumbered.append(True)
+        renumberSortIds(self)
+
+    monkeypatch.setattr(type(model), 'renumberSortIds', renumber)
+
+    # Each move halves gap between first and second coins
+    for _ in range(14):
+        model.moveRows(4, 1)
+        model.select()
+
+    assert renumbered
+    assert titles(collection.db) == 'adebc'
+    sort_ids = [sort_id for _title, sort_id in coins(collection.db)]
+    assert len(set(sort_ids)) == len(sort_ids)
+
+
+def test_renumber_with_coins_not_fetched(collection):
+    model = collection.model()
+    records = []
+    for i in range(300):
+        record = model.record()
+        record.setValue('title', 'coin %03d' % i)
+        records.append(record)
+    model.appendRecords(records)
+    # No free position between first and second coins
+    QSqlQuery("UPDATE coins SET sort_id=sort_id+1023 WHERE title='coin 000'", collection.db)
+
+    model = sortedModel(collection)
+    while model.canFetchMore():
+        model.fetchMore()
+    model.moveRows(299, 1)
+
+    order = [title for title, _sort_id in coins(collection.db)]
+    assert order[:3] == ['coin 000', 'coin 299', 'coin 001']
+    assert len(order) == 300
+    assert len({sort_id for _title, sort_id in coins(collection.db)}) == 300